@@ -0,0 +1,200 @@
+"""Нагрузочный тест API заказов: WSGI (gunicorn) против ASGI (uvicorn).
+
+Поднимает каждое развертывание отдельным процессом на общей базе
+бенчмарков и нагружает его смесью запросов (список, заказ, выручка,
+создание) из concurrency постоянных соединений. Сравниваются:
+
+- wsgi: gunicorn с потоками и синхронные представления DRF;
+- asgi-sync: uvicorn и те же синхронные представления (через пул потоков);
+- asgi: uvicorn и асинхронные представления orders.async_views.
+
+Запуск из корня репозитория (нужны gunicorn и uvicorn):
+
+    pip install gunicorn uvicorn
+    python -m benchmarks.bench_asgi_wsgi --rows 20000 --concurrency 200 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from benchmarks.common import ROOT_DIR, percentile, print_table, read_response, setup_django
+
+SYNC_PREFIX = '/orders/api/orders'
+ASYNC_PREFIX = '/orders/api/async/orders'
+
+DEPLOYMENTS = {
+    'wsgi': (
+        ['gunicorn', 'cafe_management.wsgi:application', '--bind', '127.0.0.1:{port}',
+         '--workers', '{workers}', '--threads', '{threads}', '--log-level', 'warning'],
+        SYNC_PREFIX,
+    ),
+    'asgi-sync': (
+        ['uvicorn', 'cafe_management.asgi:application', '--port', '{port}',
+         '--workers', '{workers}', '--log-level', 'warning', '--no-access-log'],
+        SYNC_PREFIX,
+    ),
+    'asgi': (
+        ['uvicorn', 'cafe_management.asgi:application', '--port', '{port}',
+         '--workers', '{workers}', '--log-level', 'warning', '--no-access-log'],
+        ASYNC_PREFIX,
+    ),
+}
+
+# Доля запросов каждого вида в нагрузке.
+MIX = (('list', 40), ('detail', 40), ('revenue', 10), ('create', 10))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Scenario:
+    """Генератор запросов смеси MIX для одного развертывания."""
+
+    def __init__(self, prefix: str, order_ids: List[int], menu_size: int, seed: int):
+        self.prefix = prefix
+        self.order_ids = order_ids
+        self.menu_size = menu_size
+        self.rng = random.Random(seed)
+        self.kinds = [kind for kind, weight in MIX for _ in range(weight)]
+        today = time.strftime('%Y-%m-%d')
+        self.revenue_query = f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59&orders=0'
+
+    def next_request(self) -> Tuple[str, str, str, bytes]:
+        kind = self.rng.choice(self.kinds)
+        if kind == 'list':
+            return kind, 'GET', f'{self.prefix}/?page_size=50', b''
+        if kind == 'detail':
+            return kind, 'GET', f'{self.prefix}/{self.rng.choice(self.order_ids)}/', b''
+        if kind == 'revenue':
+            return kind, 'GET', f'{self.prefix}/revenue/{self.revenue_query}', b''
+        dishes = [self.rng.randint(1, self.menu_size) for _ in range(self.rng.randint(1, 5))]
+        body = json.dumps({'table_number': self.rng.randint(1000, 9999), 'dishes': dishes, 'status': 'paid'})
+        return kind, 'POST', f'{self.prefix}/', body.encode()
+
+
+async def worker(port: int, scenario: Scenario, deadline: float, results: Dict[str, list]) -> None:
+    """Одно постоянное соединение, отправляющее запросы до deadline."""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        kind, method, path, body = scenario.next_request()
+        request = (
+            f'{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n'
+        ).encode() + body
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            status, _ = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            status = 0
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+        results[kind].append((time.perf_counter() - started, status))
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port: int, scenario: Scenario, concurrency: int, duration: float) -> Dict[str, list]:
+    results: Dict[str, list] = defaultdict(list)
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(worker(port, scenario, deadline, results) for _ in range(concurrency)))
+    return results
+
+
+def wait_until_ready(port: int, prefix: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as sock:
+                sock.sendall(f'GET {prefix}/?page_size=1 HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+                if b' 200 ' in sock.recv(64):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not start in time')
+
+
+def bench_deployment(name: str, args, env: dict, order_ids: List[int]) -> List[list]:
+    command, prefix = DEPLOYMENTS[name]
+    port = free_port()
+    argv = [part.format(port=port, workers=args.workers, threads=args.threads) for part in command]
+    process = subprocess.Popen(argv, cwd=ROOT_DIR, env=env)
+    try:
+        wait_until_ready(port, prefix, process)
+        scenario = Scenario(prefix, order_ids, args.menu_size, seed=args.seed)
+        asyncio.run(run_load(port, scenario, min(args.concurrency, 20), 1.0))  # прогрев
+        results = asyncio.run(run_load(port, scenario, args.concurrency, args.duration))
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+    rows = []
+    all_samples = []
+    for kind, _ in MIX + (('total', 0),):
+        samples = all_samples if kind == 'total' else results.get(kind, [])
+        if kind != 'total':
+            all_samples.extend(samples)
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        errors = sum(1 for _, status in samples if status == 0 or status >= 500)
+        rows.append([
+            name, kind, len(samples), f'{len(samples) / args.duration:.0f}',
+            f'{percentile(latencies, 50) * 1000:.1f}', f'{percentile(latencies, 99) * 1000:.1f}', errors,
+        ])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--menu-size', type=int, default=200)
+    parser.add_argument('--db', default=str(ROOT_DIR / 'bench.sqlite3'))
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=1, help='Процессов сервера в каждом развертывании.')
+    parser.add_argument('--threads', type=int, default=32, help='Потоков gunicorn на процесс (WSGI).')
+    parser.add_argument('--deployments', default=','.join(DEPLOYMENTS))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    os.environ['BENCH_DB_PATH'] = args.db
+    setup_django('benchmarks.settings')
+    from django.conf import settings
+    from django.core.management import call_command
+    from benchmarks.data import generate_menu, seed_orders, write_menu
+    from orders.models import Order
+
+    write_menu(settings.ORDERS_MENU_PATH, generate_menu(args.menu_size))
+    call_command('migrate', verbosity=0)
+    if not Order.objects.exists():
+        seed_orders(args.rows, args.menu_size)
+    order_ids = list(Order.objects.order_by('?').values_list('pk', flat=True)[:5000])
+
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'benchmarks.settings', 'PYTHONPATH': str(ROOT_DIR)}
+    rows = []
+    for name in args.deployments.split(','):
+        rows.extend(bench_deployment(name, args, env, order_ids))
+
+    print(f'orders: {Order.objects.count()} rows, concurrency: {args.concurrency}, '
+          f'duration: {args.duration:.0f}s, workers: {args.workers}')
+    print_table(rows, ('deployment', 'endpoint', 'requests', 'req/s', 'p50 ms', 'p99 ms', 'errors'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Бенчмарк расчета стоимости заказа по меню.
+
+Сравнивает прежний путь (разбор JSON и линейный поиск на каждое блюдо)
+с индексированным снимком меню из orders.menu, пересчет пачки заказов
+суммированием float по объектам и выборкой из списка цен в копейках,
+а также память, занимаемую меню.
+
+Запуск: python -m benchmarks.bench_menu [--menu-size 1000] [--order-size 50] [--batch 10000]
+"""
+import argparse
+import json
+import random
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import measure, print_table, setup_django
+
+
+def legacy_total(json_path, dish_ids):
+    """Прежняя реализация Order.calculate_total_price."""
+    from orders.menu import parse_dishes
+
+    def get_by_id(dish_id):
+        return next((dish for dish in parse_dishes(json_path) if dish.id == dish_id), None)
+
+    total = 0.00
+    parse_dishes(json_path)
+    for dish_id in dish_ids:
+        dish = get_by_id(int(dish_id))
+        if dish:
+            total += dish.price
+    return total
+
+
+def float_batch_totals(menu, orders):
+    """Пересчет пачки заказов сложением float-цен по объектам блюд."""
+    totals = []
+    for dish_ids in orders:
+        total = 0.00
+        for dish_id in dish_ids:
+            dish = menu.get(dish_id)
+            if dish:
+                total += dish.price
+        totals.append(total)
+    return totals
+
+
+def allocated_bytes(factory):
+    """Объем памяти, выделенной при построении объекта."""
+    tracemalloc.start()
+    obj = factory()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+class DictDish:
+    """Блюдо без __slots__, как до перехода на компактное меню."""
+    def __init__(self, id, name, price, description=None):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.description = description or ""
+
+
+def dict_backed_menu(dishes):
+    """Прежний снимок меню: объекты с __dict__, индекс по ID и множество строковых ID."""
+    by_id = {dish['id']: DictDish(**dish) for dish in dishes}
+    return by_id, frozenset(str(dish_id) for dish_id in by_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--menu-size', type=int, default=1000)
+    parser.add_argument('--order-size', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from orders.menu import Dish, MenuCatalog, MenuSnapshot
+
+    rng = random.Random(42)
+    dishes = [
+        {'id': i, 'name': f'Блюдо {i}', 'price': round(rng.uniform(1, 50), 2)}
+        for i in range(1, args.menu_size + 1)
+    ]
+    order = [rng.randint(1, args.menu_size) for _ in range(args.order_size)]
+    batch = [
+        [rng.randint(1, args.menu_size) for _ in range(rng.randint(1, args.order_size))]
+        for _ in range(args.batch)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = str(Path(tmp) / 'dishes.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(dishes, f)
+        catalog = MenuCatalog(json_path)
+
+        legacy = measure(lambda: legacy_total(json_path, order), args.repeat, args.number)
+        cached = measure(lambda: catalog.snapshot().price_total(order), args.repeat, args.number * 100)
+        snapshot = catalog.snapshot()
+        by_id = {dish.id: dish for dish in snapshot.dishes}
+        float_batch = measure(lambda: float_batch_totals(by_id, batch), args.repeat, 1)
+        cents_batch = measure(lambda: snapshot.batch_totals_cents(batch), args.repeat, 1)
+
+    rows = [
+        ('legacy: parse + scan', f"{legacy['best_us']:.1f}", '1.0x'),
+        ('snapshot.price_total', f"{cached['best_us']:.1f}", f"{legacy['best_us'] / cached['best_us']:.0f}x"),
+    ]
+    print(f'menu={args.menu_size} dishes, order={args.order_size} items, file parses={catalog.load_count}')
+    print_table(rows, ('path', 'best, us/order', 'speedup'))
+    print()
+
+    rows = [
+        ('float sum per object', f"{float_batch['best_us'] / 1000:.1f}", '1.0x'),
+        ('batch_totals_cents', f"{cents_batch['best_us'] / 1000:.1f}",
+         f"{float_batch['best_us'] / cents_batch['best_us']:.1f}x"),
+    ]
+    print(f'batch={args.batch} orders')
+    print_table(rows, ('path', 'best, ms/batch', 'speedup'))
+    print()
+
+    rows = [
+        ('dict-backed dishes + index', allocated_bytes(lambda: dict_backed_menu(dishes))),
+        ('slots + price list', allocated_bytes(lambda: MenuSnapshot(Dish(**dish) for dish in dishes))),
+    ]
+    print_table(rows, ('menu representation', 'allocated bytes'))
+
+
+if __name__ == '__main__':
+    main()
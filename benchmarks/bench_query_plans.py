@@ -0,0 +1,120 @@
+"""Проверка планов горячих запросов к таблице заказов.
+
+Заполняет отдельную базу SQLite синтетическими заказами (по умолчанию
+1 млн), выполняет EXPLAIN для каждого горячего запроса и завершается
+с ошибкой, если какой-либо из них читает таблицу полным сканированием,
+а постраничный запрос сортирует строки во временном B-дереве вместо
+чтения в порядке индекса.
+
+Запуск: python -m benchmarks.bench_query_plans [--rows 1000000] [--db bench.sqlite3]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+from benchmarks.common import ROOT_DIR, print_table, setup_django
+
+
+def hot_queries():
+    """Горячие запросы приложения в том виде, в каком их строят представления.
+
+    Третий элемент кортежа — должен ли порядок строк браться из индекса
+    (для страниц с LIMIT сортировка всей выборки равносильна полному чтению).
+    """
+    from django.utils import timezone
+    from django.db.models import Sum
+    from orders.models import Order, OrderLine
+    from orders.pagination import ORDERING, REVERSE_ORDERING, keyset_filter
+
+    now = timezone.now()
+    start, end = now - timedelta(hours=8), now
+    deep = Order.objects.order_by(*REVERSE_ORDERING)[100]
+    return [
+        ('revenue: status + paid_at range',
+         Order.objects.filter(status='paid', paid_at__range=(start, end)), False),
+        ('active table check',
+         Order.objects.filter(table_number=7, status__in=['waiting', 'ready']).exclude(pk=None).order_by()[:1],
+         False),
+        ('order list: first page',
+         Order.objects.order_by(*ORDERING)[:51], True),
+        ('order list: deep keyset page',
+         Order.objects.filter(keyset_filter(deep.created_at, deep.pk)).order_by(*ORDERING)[:51], True),
+        ('order list: deep previous page',
+         Order.objects.filter(keyset_filter(deep.created_at, deep.pk, backward=True)).order_by(*REVERSE_ORDERING)[:51],
+         True),
+        ('order list: status filter',
+         Order.objects.filter(status='waiting').order_by(*ORDERING)[:51], True),
+        ('dish sales: ordered_at range',
+         OrderLine.objects.filter(ordered_at__range=(start, end)).values('dish_id')
+         .annotate(quantity_sold=Sum('quantity')).order_by(), False),
+        ('order list: dish filter',
+         Order.objects.filter(pk__in=OrderLine.objects.filter(dish_id=7).values('order_id'))
+         .order_by(*ORDERING)[:51], False),
+    ]
+
+
+def is_full_scan(plan: str) -> bool:
+    """Полное сканирование таблицы без индекса."""
+    return any('SCAN orders_order' in line and 'USING' not in line for line in plan.splitlines())
+
+
+def sorts_in_memory(plan: str) -> bool:
+    """Строки сортируются во временном B-дереве, а не читаются в порядке индекса."""
+    return 'USE TEMP B-TREE FOR ORDER BY' in plan
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--menu-size', type=int, default=1000)
+    parser.add_argument('--db', default=str(ROOT_DIR / 'bench.sqlite3'))
+    args = parser.parse_args(argv)
+
+    os.environ['BENCH_DB_PATH'] = args.db
+    setup_django('benchmarks.settings')
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from benchmarks.data import generate_menu, seed_orders, write_menu
+    from orders.models import Order
+
+    write_menu(settings.ORDERS_MENU_PATH, generate_menu(args.menu_size))
+    call_command('migrate', verbosity=0)
+    existing = Order.objects.count()
+    if existing < args.rows:
+        started = time.perf_counter()
+        seed_orders(
+            args.rows - existing, args.menu_size, seed=existing,
+            progress=lambda n: print(f'\rseeded {existing + n} / {args.rows}', end='', file=sys.stderr),
+        )
+        print(f'\nseeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    rows, failures = [], 0
+    for name, queryset, index_order in hot_queries():
+        plan = queryset.explain()
+        started = time.perf_counter()
+        list(queryset)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if is_full_scan(plan):
+            access = 'FULL SCAN'
+        elif index_order and sorts_in_memory(plan):
+            access = 'FULL SORT'
+        else:
+            access = 'index'
+        failures += access != 'index'
+        rows.append((name, access, f'{elapsed_ms:.2f}',
+                     ' / '.join(line.split(None, 3)[-1] for line in plan.splitlines())))
+
+    print(f'orders: {Order.objects.count()} rows, db: {args.db}')
+    print_table(rows, ('query', 'access', 'ms', 'plan'))
+    if failures:
+        print(f'{failures} hot quer{"y reads" if failures == 1 else "ies read"} the whole table', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
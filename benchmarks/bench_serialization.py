@@ -0,0 +1,93 @@
+"""Сериализация страниц списка заказов: OrderSerializer против order_rows_data.
+
+Для каждого размера страницы отдельно измеряются выборка строк (объекты
+модели против values_list) и сериализация в JSON через JSONRenderer
+(OrderSerializer(many=True) против order_rows_data), а также быстрый путь
+с урезанным набором полей (--fields, как ?fields= в API). Перед замером
+проверяется, что пути дают побайтно одинаковый JSON.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_serialization --rows 20000 --page-sizes 50,500,1000
+"""
+import argparse
+import os
+
+from benchmarks.common import ROOT_DIR, measure, print_table, setup_django
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--menu-size', type=int, default=200)
+    parser.add_argument('--page-sizes', default='50,500,1000')
+    parser.add_argument('--legacy-share', type=float, default=0.0,
+                        help='Доля заказов без снимка состава (названия берутся из меню).')
+    parser.add_argument('--fields', default='id,table_number,status', help='Поля строки «sparse».')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--db', default=str(ROOT_DIR / 'bench.sqlite3'))
+    args = parser.parse_args(argv)
+
+    os.environ['BENCH_DB_PATH'] = args.db
+    setup_django('benchmarks.settings')
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import transaction
+    from rest_framework.renderers import JSONRenderer
+    from benchmarks.data import generate_menu, seed_orders, write_menu
+    from orders.models import Order
+    from orders.serializers import OrderSerializer, order_rows, order_rows_data, parse_fieldset
+
+    write_menu(settings.ORDERS_MENU_PATH, generate_menu(args.menu_size))
+    call_command('migrate', verbosity=0)
+    existing = Order.objects.count()
+    if existing < args.rows:
+        seed_orders(args.rows - existing, args.menu_size, seed=42 + existing)
+    queryset = Order.objects.order_by('-created_at', 'id')
+    renderer = JSONRenderer()
+    fields = parse_fieldset({'fields': args.fields})
+    rows = []
+    # Снимки стираются внутри транзакции, которая в конце откатывается.
+    with transaction.atomic():
+        if args.legacy_share:
+            legacy = list(queryset.values_list('pk', flat=True)[:int(args.rows * args.legacy_share)])
+            Order.objects.filter(pk__in=legacy).update(dish_names='')
+
+        for size in (int(value) for value in args.page_sizes.split(',')):
+            orders = list(queryset[:size])
+            tuples = list(order_rows(queryset)[:size])
+            legacy_json = renderer.render(OrderSerializer(orders, many=True).data)
+            fast_json = renderer.render(order_rows_data(tuples))
+            sparse = list(order_rows(queryset, fields)[:size])
+            sparse_json = renderer.render(order_rows_data(sparse, fields))
+            if legacy_json != fast_json or sparse_json != renderer.render(
+                    OrderSerializer(orders, many=True, fields=fields).data):
+                raise SystemExit(f'page {size}: JSON differs')
+
+            number = max(1, 2000 // size)
+            timings = {
+                'fetch_serializer': measure(lambda: list(queryset[:size]), args.repeat, number),
+                'fetch_fast': measure(lambda: list(order_rows(queryset)[:size]), args.repeat, number),
+                'render_serializer': measure(
+                    lambda: renderer.render(OrderSerializer(orders, many=True).data), args.repeat, number),
+                'render_fast': measure(lambda: renderer.render(order_rows_data(tuples)), args.repeat, number),
+                'fetch_sparse': measure(lambda: list(order_rows(queryset, fields)[:size]), args.repeat, number),
+                'render_sparse': measure(
+                    lambda: renderer.render(order_rows_data(sparse, fields)), args.repeat, number),
+            }
+            sizes = {'serializer': len(legacy_json), 'fast': len(fast_json), 'sparse': len(sparse_json)}
+            for path in ('serializer', 'fast', 'sparse'):
+                fetch, render = timings[f'fetch_{path}']['best_us'], timings[f'render_{path}']['best_us']
+                baseline = timings['fetch_serializer']['best_us'] + timings['render_serializer']['best_us']
+                rows.append([
+                    size, path, f'{fetch / 1000:.2f}', f'{render / 1000:.2f}', f'{(fetch + render) / 1000:.2f}',
+                    f'{baseline / (fetch + render):.1f}x', sizes[path],
+                ])
+        transaction.set_rollback(True)
+
+    print(f'orders: {Order.objects.count()}, menu: {args.menu_size}, legacy share: {args.legacy_share:.0%}')
+    print_table(rows, ('page', 'path', 'fetch ms', 'serialize ms', 'total ms', 'speedup', 'bytes'))
+
+
+if __name__ == '__main__':
+    main()
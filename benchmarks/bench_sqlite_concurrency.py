@@ -0,0 +1,174 @@
+"""Конкурентные чтение и запись в SQLite: настройки по умолчанию против профиля orders/sqlite.py.
+
+Каждый профиль работает с собственной базой в отдельном процессе
+(прагмы задаются переменными окружения SQLITE_*). Писатели создают
+оплаченные заказы через ORM, читатели запрашивают страницу списка,
+карточку заказа и отчет о выручке без кэша. Для каждого профиля и вида
+операции выводятся пропускная способность, задержки p50/p99 и число
+ошибок «database is locked».
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_sqlite_concurrency --rows 20000 --writers 4 --readers 8 --duration 10
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.common import ROOT_DIR, percentile, print_table, setup_django
+
+# Профиль default повторяет поведение без orders/sqlite.py: журнал
+# отката, synchronous=FULL и таймаут ожидания блокировки модуля sqlite3.
+PROFILES = {
+    'default': {
+        'SQLITE_JOURNAL_MODE': 'delete', 'SQLITE_SYNCHRONOUS': 'full', 'SQLITE_BUSY_TIMEOUT': '',
+        'SQLITE_MMAP_SIZE': '0', 'SQLITE_CACHE_SIZE': '-2000', 'SQLITE_TEMP_STORE': 'default',
+    },
+    'tuned': {},
+}
+
+
+def writer(deadline: float, menu_size: int, seed: int, results: Dict[str, list]) -> None:
+    from django.db import OperationalError, connections
+    from orders.models import Order
+
+    rng = random.Random(seed)
+    try:
+        while time.perf_counter() < deadline:
+            dishes = [rng.randint(1, menu_size) for _ in range(rng.randint(1, 5))]
+            started = time.perf_counter()
+            try:
+                Order.objects.create(table_number=rng.randint(1000, 9999), dishes=dishes, status='paid')
+                ok = True
+            except OperationalError:
+                ok = False
+            results['write'].append((time.perf_counter() - started, ok))
+    finally:
+        connections.close_all()
+
+
+def reader(deadline: float, order_ids: List[int], seed: int, results: Dict[str, list]) -> None:
+    from datetime import timedelta
+    from django.db import OperationalError, connections
+    from django.utils import timezone
+    from orders.models import Order
+    from orders.pagination import paginate_keyset
+    from orders.reports import revenue_summary
+
+    rng = random.Random(seed)
+    kinds = ('list', 'detail', 'revenue')
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choice(kinds)
+            started = time.perf_counter()
+            try:
+                if kind == 'list':
+                    paginate_keyset(Order.objects.all(), None, 50)
+                elif kind == 'detail':
+                    Order.objects.get(pk=rng.choice(order_ids))
+                else:
+                    now = timezone.now()
+                    revenue_summary(now - timedelta(hours=8), now)
+                ok = True
+            except OperationalError:
+                ok = False
+            results[kind].append((time.perf_counter() - started, ok))
+    finally:
+        connections.close_all()
+
+
+def run_profile(args) -> dict:
+    """Запуск одного профиля в дочернем процессе; печатает результаты в JSON."""
+    os.environ['BENCH_DB_PATH'] = args.db
+    setup_django('benchmarks.settings')
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection, connections
+    from benchmarks.data import generate_menu, seed_orders, write_menu
+    from orders.models import Order
+
+    settings.ORDERS_REVENUE_CACHE = None
+    write_menu(settings.ORDERS_MENU_PATH, generate_menu(args.menu_size))
+    call_command('migrate', verbosity=0)
+    if not Order.objects.exists():
+        seed_orders(args.rows, args.menu_size)
+    order_ids = list(Order.objects.order_by('?').values_list('pk', flat=True)[:5000])
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+    connections.close_all()
+
+    results: Dict[str, list] = defaultdict(list)
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=writer, args=(deadline, args.menu_size, args.seed + i, results))
+        for i in range(args.writers)
+    ] + [
+        threading.Thread(target=reader, args=(deadline, order_ids, args.seed + 100 + i, results))
+        for i in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'journal_mode': journal_mode, 'results': results}
+
+
+def summarize(profile: str, data: dict, duration: float) -> List[list]:
+    rows = []
+    for kind in ('write', 'list', 'detail', 'revenue'):
+        samples = data['results'].get(kind, [])
+        latencies = sorted(elapsed for elapsed, ok in samples if ok)
+        errors = sum(1 for _, ok in samples if not ok)
+        rows.append([
+            profile, data['journal_mode'], kind, len(latencies), f'{len(latencies) / duration:.0f}',
+            f'{percentile(latencies, 50) * 1000:.1f}', f'{percentile(latencies, 99) * 1000:.1f}', errors,
+        ])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--menu-size', type=int, default=200)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='База для одного профиля (используется дочерним процессом).')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_profile(args)))
+        return
+
+    rows = []
+    for profile in args.profiles.split(','):
+        db = ROOT_DIR / f'bench_sqlite_{profile}.sqlite3'
+        env = {**os.environ, **PROFILES[profile], 'PYTHONPATH': str(ROOT_DIR)}
+        child_args = [
+            '--child', '--db', str(db), '--rows', str(args.rows), '--menu-size', str(args.menu_size),
+            '--writers', str(args.writers), '--readers', str(args.readers),
+            '--duration', str(args.duration), '--seed', str(args.seed),
+        ]
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_sqlite_concurrency', *child_args],
+            cwd=ROOT_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        rows.extend(summarize(profile, json.loads(output.splitlines()[-1]), args.duration))
+
+    print(f'writers: {args.writers}, readers: {args.readers}, duration: {args.duration:.0f}s')
+    print_table(rows, ('profile', 'journal', 'operation', 'ok', 'ops/s', 'p50 ms', 'p99 ms', 'locked'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+"""Набор бенчмарков горячих путей приложения заказов с результатами в JSON.
+
+Заполняет базу бенчмарков синтетическими заказами (размер меню, число
+заказов и блюд в заказе задаются параметрами) и измеряет в одном
+процессе через тестовый клиент Django:
+
+- HTML: список заказов и отчет о выручке;
+- API: список, карточка, создание, изменение и отчет о выручке;
+- revenue_summary по сводке RevenueRollup (целые часы), по самим заказам
+  (период короче часа) и через кэш отчетов;
+- методы Dish и Order.
+
+Для каждой операции записываются медиана, лучшее время и p95 вызова,
+число SQL-запросов и пик выделенной памяти (tracemalloc). Результаты
+пишутся в JSON с сортированными ключами, чтобы их можно было сравнивать
+diff'ом; с --baseline операции сравниваются с прошлым прогоном, и
+команда завершается с ошибкой при замедлении больше --threshold или
+росте числа запросов.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.bench_suite --rows 100000 --menu-size 200 --output bench_results.json
+    python -m benchmarks.bench_suite --rows 100000 --baseline bench_results.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.common import ROOT_DIR, percentile, print_table, setup_django
+
+Operation = Tuple[str, Callable[[], object]]
+
+
+def expect(response, status: int = 200):
+    if response.status_code != status:
+        raise RuntimeError(f'{response.request["PATH_INFO"]}: {response.status_code} {response.content[:200]!r}')
+    return response
+
+
+def operations(menu_size: int, dishes_per_order: int, seed: int) -> List[Operation]:
+    """Измеряемые операции; у каждой один вызов — одна операция приложения."""
+    from django.test import Client
+    from django.utils import timezone
+    from orders.menu import Dish
+    from orders.models import Order
+    from orders.reports import revenue_summary
+    from orders.revenue_cache import RevenueCache
+
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST='localhost')
+    order_ids = list(Order.objects.order_by('?').values_list('pk', flat=True)[:1000])
+    order = Order.objects.get(pk=order_ids[0])
+    updated = Order.objects.create(table_number=rng.randint(100000, 999999), dishes=[1, 2], status='paid')
+
+    now = timezone.now()
+    day = {'start_date': f'{now - timedelta(days=1):%Y-%m-%d}', 'end_date': f'{now:%Y-%m-%d}',
+           'start_time': '00:00', 'end_time': '23:59'}
+    month_start, month_end = now - timedelta(days=30), now
+    short_start, short_end = now - timedelta(hours=2, minutes=50), now - timedelta(hours=2, minutes=30)
+    cache = RevenueCache(alias='default')
+
+    def dishes():
+        return [rng.randint(1, menu_size) for _ in range(rng.randint(1, dishes_per_order))]
+
+    def api_create():
+        body = {'table_number': rng.randint(100000, 999999), 'dishes': dishes(), 'status': 'paid'}
+        expect(client.post('/orders/api/orders/', body, content_type='application/json'), 201)
+
+    def api_update():
+        body = {'table_number': updated.table_number, 'dishes': dishes(), 'status': 'paid'}
+        expect(client.put(f'/orders/api/orders/{updated.pk}/', body, content_type='application/json'))
+
+    return [
+        ('html.order_list', lambda: expect(client.get('/orders/'))),
+        ('html.revenue_report', lambda: expect(client.get('/orders/revenue/', day))),
+        ('api.list', lambda: expect(client.get('/orders/api/orders/', {'page_size': 50}))),
+        ('api.list_status_filter', lambda: expect(client.get('/orders/api/orders/', {'status': 'paid', 'page_size': 50}))),
+        ('api.retrieve', lambda: expect(client.get(f'/orders/api/orders/{rng.choice(order_ids)}/'))),
+        ('api.create', api_create),
+        ('api.update', api_update),
+        ('api.revenue', lambda: expect(client.get('/orders/api/orders/revenue/', {**day, 'bucket': 'hour'}))),
+        ('reports.revenue_summary_rollup', lambda: revenue_summary(month_start, month_end, 'day')),
+        ('reports.revenue_summary_orders', lambda: revenue_summary(short_start, short_end)),
+        ('reports.revenue_summary_cached', lambda: cache.get_or_compute(
+            month_start, month_end, 'day', lambda: revenue_summary(month_start, month_end, 'day'))),
+        ('model.Dish.load_dishes', Dish.load_dishes),
+        ('model.Dish.get_by_id', lambda: Dish.get_by_id(rng.randint(1, menu_size))),
+        ('model.Order.get_dish_names', order.get_dish_names),
+        ('model.Order.is_table_number_unique', order.is_table_number_unique),
+        ('model.Order.calculate_total_price', order.calculate_total_price),
+    ]
+
+
+def run_operation(func: Callable[[], object], iterations: int, warmup: int) -> Dict[str, float]:
+    """Время вызова (мс), число запросов и пик памяти (КиБ) одной операции."""
+    from django.db import connection
+
+    for _ in range(warmup):
+        func()
+    # CaptureQueriesContext не подходит: тестовый клиент сбрасывает
+    # журнал запросов соединения в начале каждого запроса.
+    queries = []
+    with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+        func()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Быстрые операции вызываются пачкой на замер, чтобы время замера
+    # было не меньше ~1 мс и не тонуло в погрешности таймера.
+    started = time.perf_counter()
+    func()
+    batch = max(1, int(0.001 / max(time.perf_counter() - started, 1e-9)))
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for _ in range(batch):
+            func()
+        timings.append((time.perf_counter() - started) * 1000 / batch)
+    timings.sort()
+    return {
+        'median_ms': round(percentile(timings, 50), 6),
+        'best_ms': round(timings[0], 6),
+        'p95_ms': round(percentile(timings, 95), 6),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'iterations': iterations,
+        'calls_per_iteration': batch,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> Tuple[List[list], List[str]]:
+    """Строки сравнения с прошлым прогоном и список регрессий."""
+    rows, regressions = [], []
+    for name, current in results['operations'].items():
+        previous = baseline.get('operations', {}).get(name)
+        if not previous:
+            rows.append([name, '-', f"{current['median_ms']:.3f}", 'new', '-', current['queries']])
+            continue
+        change = current['median_ms'] / previous['median_ms'] - 1 if previous['median_ms'] else 0.0
+        rows.append([
+            name, f"{previous['median_ms']:.3f}", f"{current['median_ms']:.3f}", f'{change:+.0%}',
+            previous['queries'], current['queries'],
+        ])
+        if change > threshold:
+            regressions.append(f'{name}: median {previous["median_ms"]:.3f} -> {current["median_ms"]:.3f} ms ({change:+.0%})')
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: queries {previous["queries"]} -> {current["queries"]}')
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help='Число заказов в базе (до миллионов).')
+    parser.add_argument('--menu-size', type=int, default=200)
+    parser.add_argument('--dishes-per-order', type=int, default=5, help='Наибольшее число блюд в заказе.')
+    parser.add_argument('--db', default=str(ROOT_DIR / 'bench.sqlite3'))
+    parser.add_argument('--fresh', action='store_true', help='Пересоздать базу перед прогоном.')
+    parser.add_argument('--iterations', type=int, default=50, help='Замеров на операцию.')
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', default='', help='Префиксы операций через запятую, например api.,reports.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=str(ROOT_DIR / 'bench_results.json'))
+    parser.add_argument('--baseline', help='JSON прошлого прогона для сравнения.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Допустимое замедление медианы относительно --baseline (0.25 = 25%%).')
+    args = parser.parse_args(argv)
+
+    if args.fresh:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    os.environ['BENCH_DB_PATH'] = args.db
+    setup_django('benchmarks.settings')
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from benchmarks.data import generate_menu, seed_orders, write_menu
+    from orders.models import Order
+
+    # HTTP-операции измеряют расчет отчета, а не попадание в кэш.
+    settings.ORDERS_REVENUE_CACHE = None
+    write_menu(settings.ORDERS_MENU_PATH, generate_menu(args.menu_size))
+    call_command('migrate', verbosity=0)
+    existing = Order.objects.count()
+    if existing < args.rows:
+        started = time.perf_counter()
+        seed_orders(
+            args.rows - existing, args.menu_size, args.dishes_per_order, seed=args.seed + existing,
+            progress=lambda n: print(f'\rseeded {existing + n} / {args.rows}', end='', file=sys.stderr),
+        )
+        print(f'\nseeded in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    prefixes = tuple(prefix for prefix in args.only.split(',') if prefix)
+    results = {
+        'params': {
+            'rows': args.rows, 'menu_size': args.menu_size, 'dishes_per_order': args.dishes_per_order,
+            'iterations': args.iterations, 'seed': args.seed,
+        },
+        'environment': {
+            'python': platform.python_version(), 'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version, 'machine': platform.machine(),
+        },
+        'operations': {},
+    }
+    for name, func in operations(args.menu_size, args.dishes_per_order, args.seed):
+        if prefixes and not name.startswith(prefixes):
+            continue
+        results['operations'][name] = run_operation(func, args.iterations, args.warmup)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+    print(f'orders: {Order.objects.count()} rows, menu: {args.menu_size}, results: {args.output}')
+    print_table(
+        [[name, f"{r['median_ms']:.4f}", f"{r['p95_ms']:.4f}", r['queries'], r['peak_kib']]
+         for name, r in results['operations'].items()],
+        ('operation', 'median ms', 'p95 ms', 'queries', 'peak KiB'),
+    )
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            rows, regressions = compare(results, json.load(f), args.threshold)
+        print()
+        print_table(rows, ('operation', 'baseline ms', 'current ms', 'change', 'baseline queries', 'queries'))
+        if regressions:
+            print('\nregressions:\n  ' + '\n  '.join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Общие утилиты для бенчмарков."""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(settings_module: str = 'cafe_management.settings') -> None:
+    """Настраивает Django для запуска бенчмарка как отдельного скрипта."""
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def measure(func: Callable[[], object], repeat: int = 5, number: int = 100) -> Dict[str, float]:
+    """Запускает func number раз в каждой из repeat серий и возвращает время одного вызова в мкс."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - started) / number * 1e6)
+    return {'best_us': min(timings), 'mean_us': sum(timings) / len(timings)}
+
+
+def print_table(rows, headers) -> None:
+    """Печатает результаты в виде выровненной таблицы."""
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(h)), *(len(row[i]) for row in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(cell.ljust(w) for cell, w in zip(row, widths)))
+
+
+def percentile(values: List[float], p: float) -> float:
+    """p-й процентиль (0..100) по отсортированному списку."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """Читает ответ HTTP/1.1 (Content-Length или chunked) и возвращает код статуса и тело."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    body = b''
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunks.append((await reader.readexactly(size + 2))[:-2])
+            if size == 0:
+                break
+        body = b''.join(chunks)
+    return status, body
@@ -0,0 +1,84 @@
+"""Генератор синтетических данных для бенчмарков."""
+import json
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterator, List
+
+ACTIVE_STATUSES = ('waiting', 'ready')
+
+
+def generate_menu(size: int, seed: int = 42) -> List[dict]:
+    """Меню из size блюд с ценами от 1 до 50."""
+    rng = random.Random(seed)
+    return [
+        {'id': i, 'name': f'Блюдо {i}', 'price': round(rng.uniform(1, 50), 2)}
+        for i in range(1, size + 1)
+    ]
+
+
+def write_menu(path, menu: List[dict]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(menu, f, ensure_ascii=False)
+
+
+def generate_order_rows(count: int, menu_size: int, dishes_per_order: int = 5,
+                        active_tables: int = 50, days: int = 365, seed: int = 42) -> Iterator[dict]:
+    """Поток записей заказов: оплаченная история за days дней и active_tables активных столов.
+
+    Записи совпадают по формату с JSONL для команды import_orders.
+    """
+    rng = random.Random(seed)
+    end = datetime.now(dt_timezone.utc).replace(microsecond=0)
+    start = end - timedelta(days=days)
+    span = int((end - start).total_seconds())
+    active = min(active_tables, count)
+    for i in range(count):
+        created_at = start + timedelta(seconds=span * i // max(count, 1))
+        dishes = [rng.randint(1, menu_size) for _ in range(rng.randint(1, dishes_per_order))]
+        if i >= count - active:
+            table_number = count - i
+            yield {'table_number': table_number, 'dishes': dishes, 'status': rng.choice(ACTIVE_STATUSES),
+                   'created_at': created_at.isoformat()}
+        else:
+            paid_at = created_at + timedelta(minutes=rng.randint(10, 120))
+            yield {'table_number': rng.randint(1, 100), 'dishes': dishes, 'status': 'paid',
+                   'created_at': created_at.isoformat(), 'paid_at': paid_at.isoformat()}
+
+
+def seed_orders(count: int, menu_size: int, dishes_per_order: int = 5, batch_size: int = 10000,
+                seed: int = 42, progress=None) -> int:
+    """Заполняет таблицу заказов синтетическими данными пачками bulk_create."""
+    from django.utils.dateparse import parse_datetime
+    from orders.menu import menu_catalog
+    from orders.models import Order
+
+    menu = menu_catalog.snapshot()
+    created = 0
+    batch = []
+    for row in generate_order_rows(count, menu_size, dishes_per_order, seed=seed):
+        batch.append(Order(
+            table_number=row['table_number'],
+            dishes=row['dishes'],
+            status=row['status'],
+            created_at=parse_datetime(row['created_at']),
+            paid_at=parse_datetime(row['paid_at']) if row.get('paid_at') else None,
+        ))
+        if len(batch) >= batch_size:
+            created += _flush(batch, menu)
+            batch = []
+            if progress:
+                progress(created)
+    created += _flush(batch, menu)
+    return created
+
+
+def _flush(batch, menu) -> int:
+    from django.db import transaction
+    from orders.models import Order
+
+    if not batch:
+        return 0
+    Order.prepare_for_bulk_create(batch, menu)
+    with transaction.atomic():
+        Order.objects.bulk_create(batch)
+    return len(batch)
@@ -0,0 +1,160 @@
+"""Воспроизведение трафика из generate_traffic на запущенном сервере.
+
+Записи JSONL отправляются по их меткам времени (ускоренным в --speed
+раз) или с постоянной частотой --rate пулом из --workers постоянных
+соединений. Подстановки {ref} в пути заменяются ID заказов, созданных
+записями с этим ref: запрос ждет, пока создающий ответ не вернется.
+Задержка считается от запланированного момента отправки, поэтому
+очередь перед перегруженным сервером тоже попадает в процентили.
+
+Запуск из корня репозитория (сервер уже запущен):
+
+    python manage.py generate_traffic --duration 600 --tables 40 --output traffic.jsonl
+    python -m benchmarks.replay_traffic traffic.jsonl --base-url http://127.0.0.1:8000 --workers 50 --speed 2
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.common import percentile, print_table, read_response
+from orders.management.commands.generate_traffic import path_refs, resolve_path
+
+# Статус 0 — ошибка соединения, таймаут или неразрешенная ссылка.
+Sample = Tuple[str, float, int]
+
+
+class Replay:
+    """Общее состояние воспроизведения: ID созданных заказов и результаты."""
+
+    def __init__(self, host: str, port: int, prefix: str, timeout: float):
+        self.host, self.port, self.prefix, self.timeout = host, port, prefix, timeout
+        self.values: Dict[str, object] = {'today': date.today().isoformat()}
+        self.waiters: Dict[str, asyncio.Event] = defaultdict(asyncio.Event)
+        self.samples: List[Sample] = []
+
+    async def resolve(self, path: str) -> Optional[str]:
+        for ref in path_refs(path):
+            if ref not in self.values:
+                try:
+                    await asyncio.wait_for(self.waiters[ref].wait(), self.timeout)
+                except asyncio.TimeoutError:
+                    return None
+            if self.values[ref] is None:
+                return None
+        return resolve_path(path, self.values)
+
+    def remember(self, ref: str, status: int, body: bytes) -> None:
+        order_id = None
+        if status == 201:
+            try:
+                order_id = json.loads(body)['id']
+            except (ValueError, KeyError, TypeError):
+                pass
+        # None означает, что заказ не создан и зависимые запросы — ошибки.
+        self.values[ref] = order_id
+        self.waiters[ref].set()
+
+
+async def worker(replay: Replay, queue: asyncio.Queue) -> None:
+    reader = writer = None
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        scheduled, record = item
+        status, body = 0, b''
+        path = await replay.resolve(record['path'])
+        if path is not None:
+            payload = json.dumps(record['body']).encode() if 'body' in record else b''
+            request = (
+                f"{record['method']} {replay.prefix}{path} HTTP/1.1\r\nHost: {replay.host}\r\n"
+                f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'
+            ).encode() + payload
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(replay.host, replay.port)
+                writer.write(request)
+                await writer.drain()
+                status, body = await asyncio.wait_for(read_response(reader), replay.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError, IndexError):
+                status = 0
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+        if record.get('ref'):
+            replay.remember(record['ref'], status, body)
+        replay.samples.append((record['endpoint'], time.perf_counter() - scheduled, status))
+    if writer is not None:
+        writer.close()
+
+
+async def run(records: List[dict], replay: Replay, workers: int, speed: float, rate: Optional[float]) -> Tuple[float, float]:
+    """Отправляет записи по расписанию; возвращает длительность и наибольшее отставание планировщика."""
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks = [asyncio.create_task(worker(replay, queue)) for _ in range(workers)]
+    started = time.perf_counter()
+    max_lag = 0.0
+    for index, record in enumerate(records):
+        offset = index / rate if rate else record['at'] / speed
+        scheduled = started + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        max_lag = max(max_lag, time.perf_counter() - scheduled)
+        queue.put_nowait((scheduled, record))
+    for _ in tasks:
+        queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started, max_lag
+
+
+def report(samples: List[Sample], elapsed: float) -> List[list]:
+    by_endpoint: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample[0]].append(sample)
+    rows = []
+    for endpoint in sorted(by_endpoint) + ['total']:
+        group = samples if endpoint == 'total' else by_endpoint[endpoint]
+        latencies = sorted(latency for _, latency, _ in group)
+        errors = sum(1 for _, _, status in group if status == 0 or status >= 400)
+        rows.append([
+            endpoint, len(group), f'{len(group) / elapsed:.1f}', errors, f'{errors / len(group):.1%}',
+            *(f'{percentile(latencies, p) * 1000:.1f}' for p in (50, 95, 99)),
+        ])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='JSONL из python manage.py generate_traffic.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--workers', type=int, default=50, help='Параллельных соединений.')
+    parser.add_argument('--speed', type=float, default=1.0, help='Ускорение расписания из файла.')
+    parser.add_argument('--rate', type=float, help='Постоянная частота запросов в секунду вместо расписания.')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Таймаут ответа и ожидания ссылки, с.')
+    parser.add_argument('--limit', type=int, help='Воспроизвести только первые N записей.')
+    args = parser.parse_args(argv)
+
+    with open(args.path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if args.limit:
+        records = records[:args.limit]
+    url = urlsplit(args.base_url)
+    replay = Replay(url.hostname or '127.0.0.1', url.port or 80, url.path.rstrip('/'), args.timeout)
+
+    elapsed, max_lag = asyncio.run(run(records, replay, args.workers, args.speed, args.rate))
+    target = args.rate or (len(records) / (records[-1]['at'] / args.speed) if records and records[-1]['at'] else 0)
+    print(f'requests: {len(replay.samples)}, elapsed: {elapsed:.1f}s, target: {target:.1f} req/s, '
+          f'achieved: {len(replay.samples) / elapsed:.1f} req/s, workers: {args.workers}, '
+          f'max scheduler lag: {max_lag * 1000:.1f} ms')
+    print_table(report(replay.samples, elapsed), ('endpoint', 'requests', 'req/s', 'errors', 'error rate',
+                                                  'p50 ms', 'p95 ms', 'p99 ms'))
+
+
+if __name__ == '__main__':
+    main()
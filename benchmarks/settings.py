@@ -0,0 +1,18 @@
+"""Настройки Django для бенчмарков: отдельная база SQLite вместо db.sqlite3."""
+import os
+
+from cafe_management.settings import *  # noqa: F401,F403
+from cafe_management.settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DB_PATH', str(BASE_DIR / 'bench.sqlite3')),
+    }
+}
+
+DEBUG = False
+
+ORDERS_MENU_PATH = os.environ.get('BENCH_MENU_PATH', str(BASE_DIR / 'bench_dishes.json'))
+
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost']
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,20 +48,25 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы время запроса включало остальные слои.
+    'orders.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'orders.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'orders.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'cafe_management.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для метрик запросов.
+        'BACKEND': 'orders.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -87,6 +93,37 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения отчетов и списков заказов (orders/routers.py): пути
+# к файлам SQLite через запятую в DATABASE_REPLICAS становятся псевдонимами
+# replica_1, replica_2, ...; для другой СУБД добавьте записи в DATABASES и
+# перечислите их в ORDERS_READ_REPLICAS. После записи клиент читает из
+# основной базы еще ORDERS_REPLICA_PIN_SECONDS секунд.
+for _number, _path in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica_{_number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _path,
+        'TEST': {'MIRROR': 'default'},
+    }
+ORDERS_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+ORDERS_REPLICA_PIN_SECONDS = 10
+DATABASE_ROUTERS = ['orders.routers.ReplicaRouter']
+
+# Прагмы SQLite, выполняемые на каждом соединении (orders/sqlite.py):
+# WAL, чтобы читатели не блокировали писателя; ожидание блокировки в мс
+# вместо немедленного «database is locked»; synchronous=NORMAL (в режиме
+# WAL безопасно для целостности, теряются лишь последние транзакции при
+# отключении питания); mmap и кэш страниц (отрицательное значение — в КиБ);
+# временные таблицы в памяти. Каждое значение переопределяется переменной
+# окружения SQLITE_<ПРАГМА>, пустое значение отключает прагму.
+ORDERS_SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    'busy_timeout': os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    'mmap_size': os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    'cache_size': os.environ.get('SQLITE_CACHE_SIZE', str(-64 * 1024)),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'memory'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -112,6 +149,46 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Orders app
+# Размер страницы списка заказов (HTML и API) и верхняя граница для ?page_size=.
+
+ORDERS_PAGE_SIZE = 50
+ORDERS_MAX_PAGE_SIZE = 500
+
+# Поток событий заказов (Server-Sent Events): размер истории для
+# Last-Event-ID, очередь одного подписчика, пульс и время жизни потока
+# в секундах, порог массовой вставки, после которого шлется reset.
+ORDERS_EVENTS_HISTORY = 1000
+ORDERS_EVENTS_QUEUE_SIZE = 1000
+ORDERS_EVENTS_HEARTBEAT = 15
+ORDERS_EVENTS_MAX_AGE = 300
+ORDERS_EVENTS_BULK_LIMIT = 100
+
+# Кэш отчетов о выручке: псевдоним из CACHES (None — без кэша) и время
+# жизни записи в секундах. Для нескольких процессов сервера на одной
+# машине подойдет FileBasedCache: записи и поколения станут общими.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cafe-orders',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+ORDERS_REVENUE_CACHE = 'default'
+ORDERS_REVENUE_CACHE_TIMEOUT = 300
+
+# Метрики запросов (время, SQL, шаблоны, загрузки меню) по именам URL
+# приложения: /orders/metrics/ для Prometheus и заголовок Server-Timing.
+ORDERS_METRICS = True
+
+# Выборочное профилирование запросов: заголовок для сотрудников, доли
+# запросов по именам URL (например {'revenue_report': 0.01}), каталог
+# профилей .prof и число хранимых файлов.
+ORDERS_PROFILE_HEADER = 'X-Orders-Profile'
+ORDERS_PROFILE_RATES = {}
+ORDERS_PROFILE_DIR = BASE_DIR / 'profiles'
+ORDERS_PROFILE_MAX_FILES = 100
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -9,7 +9,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'table_number', 'total_price', 'status', 'created_at')
     list_filter = ('status',)
     search_fields = ('table_number',)
-    readonly_fields = ('created_at', 'total_price')
+    readonly_fields = ('created_at', 'total_price', 'dish_names')
 
     def has_add_permission(self, request):
         """Отключаем добавление заказов через админку, если нужно."""
@@ -2,68 +2,206 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.utils import timezone
-from datetime import datetime, date, time
-from .models import Order
-from .serializers import OrderSerializer
+from django.db import IntegrityError, transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .conditional import order_etag, order_updated_at, orders_etag, orders_last_modified, revenue_etag
+from .menu import menu_catalog
+from .models import ACTIVE_TABLE_MESSAGE, Order, OrderLine, is_active_table_violation
+from .pagination import OrderKeysetPagination
+from .reports import (
+    cached_revenue_summary, dish_sales, paid_orders, parse_bucket, parse_dish_sales_params, parse_revenue_range,
+)
+from .revenue_cache import revenue_cache
+from .routers import read_from_replica
+from .serializers import (
+    ORDER_DEFAULT_FIELDS, OrderSerializer, order_columns, order_rows, order_rows_data, parse_fieldset,
+)
+
+
+def filter_orders(queryset, params):
+    """Фильтрация заказов по номеру стола, статусу или блюду из параметров запроса."""
+    table_number = params.get('table_number', None)
+    status = params.get('status', None)
+    dish = params.get('dish', None)
+    if table_number:
+        queryset = queryset.filter(table_number=table_number)
+    if status:
+        queryset = queryset.filter(status=status)
+    if dish and dish.isdigit():
+        queryset = queryset.filter(pk__in=OrderLine.objects.filter(dish_id=int(dish)).values('order_id'))
+    return queryset
+
+
+def revenue_data(summary, start_datetime, end_datetime, bucket=None) -> dict:
+    """Тело ответа отчета о выручке без списка заказов."""
+    data = {
+        'total_revenue': summary.total_revenue,
+        'order_count': summary.order_count,
+        'average_ticket': summary.average_ticket,
+        'start_datetime': start_datetime.isoformat(),
+        'end_datetime': end_datetime.isoformat(),
+    }
+    if bucket:
+        data['bucket'] = bucket
+        data['buckets'] = [
+            {**row, 'start': row['start'].isoformat()} for row in summary.buckets
+        ]
+    return data
 
 
 class OrderViewSet(viewsets.ModelViewSet):
-    """ViewSet для CRUD-операций с заказами."""
+    """ViewSet для CRUD-операций с заказами.
+
+    Чтения (list, retrieve, revenue) принимают ?fields=, ?exclude= и
+    ?expand= (см. parse_fieldset): из базы выбираются только нужные
+    полям столбцы.
+    """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = OrderKeysetPagination
+    fieldset = ORDER_DEFAULT_FIELDS
 
     def get_queryset(self):
-        """Фильтрация заказов по номеру стола или статусу."""
-        queryset = super().get_queryset()
-        table_number = self.request.query_params.get('table_number', None)
-        status = self.request.query_params.get('status', None)
-        if table_number:
-            queryset = queryset.filter(table_number=table_number)
-        if status:
-            queryset = queryset.filter(status=status)
+        """Фильтрация заказов по номеру стола, статусу или блюду."""
+        queryset = filter_orders(super().get_queryset(), self.request.query_params)
+        if self.action == 'retrieve':
+            queryset = queryset.only(*order_columns(self.fieldset))
         return queryset
 
+    @method_decorator(read_from_replica)
+    @method_decorator(condition(etag_func=orders_etag, last_modified_func=orders_last_modified))
+    def list(self, request, *args, **kwargs):
+        """Список заказов; при неизменной таблице отвечает 304.
+
+        Строки читаются через values_list и сериализуются order_rows_data
+        без OrderSerializer на каждую строку; JSON тот же.
+        """
+        try:
+            fields = parse_fieldset(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(order_rows(self.filter_queryset(self.get_queryset()), fields))
+        return self.get_paginated_response(order_rows_data(page, fields))
+
+    @method_decorator(read_from_replica)
+    @method_decorator(condition(etag_func=order_etag, last_modified_func=order_updated_at))
+    def retrieve(self, request, *args, **kwargs):
+        """Один заказ; при неизменном заказе отвечает 304."""
+        try:
+            self.fieldset = parse_fieldset(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(self.get_object(), fields=self.fieldset).data)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Пакетное создание заказов одной транзакцией.
+
+        Все заказы проверяются по одному снимку меню и одному запросу
+        активных столов; при ошибке хотя бы в одном заказе ничего не
+        создается, а ошибки возвращаются списком по позициям.
+        """
+        if not isinstance(request.data, list):
+            return Response({'error': 'Ожидается список заказов.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        menu = menu_catalog.snapshot()
+        active_tables = set(Order.objects.filter(
+            status__in=['waiting', 'ready']
+        ).values_list('table_number', flat=True))
+        context = {**self.get_serializer_context(), 'menu': menu, 'active_tables': active_tables}
+
+        orders, errors = [], []
+        for item in request.data:
+            serializer = self.get_serializer_class()(data=item, context=context)
+            if serializer.is_valid():
+                order = Order(**serializer.validated_data)
+                if order.status in ('waiting', 'ready'):
+                    active_tables.add(order.table_number)
+                orders.append(order)
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        Order.prepare_for_bulk_create(orders, menu)
+        try:
+            with transaction.atomic():
+                created = Order.objects.bulk_create(orders)
+        except IntegrityError as e:
+            if not is_active_table_violation(e):
+                raise
+            # Стол заняли параллельным запросом после проверки.
+            return Response({'errors': self._active_table_errors(orders)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.get_serializer(created, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _active_table_errors(orders):
+        """Ошибки по позициям для активных заказов на уже занятых столах."""
+        active = [order.status in ('waiting', 'ready') for order in orders]
+        occupied = set(Order.objects.filter(
+            status__in=['waiting', 'ready'],
+            table_number__in={order.table_number for order, is_active in zip(orders, active) if is_active},
+        ).values_list('table_number', flat=True))
+        # Если занявший стол заказ уже закрыт, отмечаются все активные позиции.
+        conflicts = [is_active and order.table_number in occupied for order, is_active in zip(orders, active)]
+        return [{'table_number': [ACTIVE_TABLE_MESSAGE]} if conflict else {}
+                for conflict in (conflicts if any(conflicts) else active)]
+
     @action(detail=False, methods=['get'])
+    @method_decorator(read_from_replica)
+    @method_decorator(condition(etag_func=revenue_etag, last_modified_func=orders_last_modified))
     def revenue(self, request):
-        """Расчет выручки за указанный период."""
-        start_date_str = request.query_params.get('start_date', '')
-        start_time_str = request.query_params.get('start_time', '09:00')
-        end_date_str = request.query_params.get('end_date', '')
-        end_time_str = request.query_params.get('end_time', '17:00')
+        """Расчет выручки за указанный период.
 
+        Итоги (выручка, число заказов, средний чек и разбивка по ?bucket=)
+        считаются одним агрегирующим запросом. Список заказов отдается
+        постранично и отключается параметром orders=0; его поля задаются
+        как в списке заказов.
+        """
         try:
-            if start_date_str and end_date_str:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                start_time = datetime.strptime(start_time_str, '%H:%M').time()
-                end_time = datetime.strptime(end_time_str, '%H:%M').time()
+            start_datetime, end_datetime = parse_revenue_range(request.query_params)
+            bucket = parse_bucket(request.query_params.get('bucket'))
+            fields = parse_fieldset(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-                start_datetime = datetime.combine(start_date, start_time)
-                end_datetime = datetime.combine(end_date, end_time)
+        data = revenue_data(cached_revenue_summary(start_datetime, end_datetime, bucket), start_datetime, end_datetime, bucket)
 
-                if start_datetime > end_datetime:
-                    raise ValueError("Дата начала должна быть раньше даты окончания.")
-            else:
-                start_datetime = datetime.combine(date.today(), time(9, 0))
-                end_datetime = datetime.combine(date.today(), time(17, 0))
-
-            start_datetime = timezone.make_aware(start_datetime)
-            end_datetime = timezone.make_aware(end_datetime)
-
-            paid_orders = Order.objects.filter(
-                status='paid',
-                paid_at__range=(start_datetime, end_datetime)
-            )
-            total_revenue = sum(order.total_price for order in paid_orders)
-            serializer = self.get_serializer(paid_orders, many=True)
-
-            return Response({
-                'total_revenue': total_revenue,
-                'orders': serializer.data,
-                'start_datetime': start_datetime.isoformat(),
-                'end_datetime': end_datetime.isoformat()
-            }, status=status.HTTP_200_OK)
+        headers = {}
+        if request.query_params.get('orders', '1') not in ('0', 'false'):
+            page = self.paginate_queryset(order_rows(paid_orders(start_datetime, end_datetime), fields))
+            data['orders'] = order_rows_data(page, fields)
+            link = self.paginator.get_link_header()
+            if link:
+                headers['Link'] = link
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+    @action(detail=False, methods=['get'], url_path='dish-sales')
+    def dish_sales(self, request):
+        """Продажи по блюдам за период.
 
+        Считается группировкой строк заказов в SQL. Параметры: период как у
+        revenue, status, ordering (revenue, quantity, orders) и limit. По
+        умолчанию учитываются оплаченные заказы с paid_at в периоде, как в
+        revenue; с status=waiting или ready — заказы, созданные в периоде.
+        """
+        try:
+            start_datetime, end_datetime = parse_revenue_range(request.query_params)
+            order_status, ordering, limit = parse_dish_sales_params(request.query_params)
         except ValueError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'start_datetime': start_datetime.isoformat(),
+            'end_datetime': end_datetime.isoformat(),
+            'ordering': ordering,
+            'dishes': dish_sales(start_datetime, end_datetime, order_status, ordering, limit),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='revenue/cache')
+    def revenue_cache_stats(self, request):
+        """Счетчики кэша отчетов о выручке в текущем процессе."""
+        return Response(revenue_cache.stats(), status=status.HTTP_200_OK)
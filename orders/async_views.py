@@ -0,0 +1,179 @@
+"""Асинхронные представления API заказов для запуска под ASGI.
+
+Повторяют ответы OrderViewSet (тот же JSON и заголовок Link), но читают
+базу асинхронными методами ORM и не занимают поток на время запроса.
+Как и OrderViewSet, доступны без аутентификации.
+
+Декораторы представлений в Django 4.2 не поддерживают корутины, поэтому
+метод запроса проверяется в самих представлениях, а csrf_exempt задается
+атрибутом (как это делает APIView в DRF).
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .api_views import filter_orders, revenue_data
+from .events import RESET, Subscription, order_events
+from .menu import menu_catalog
+from .models import Order
+from .pagination import InvalidCursor, apaginate_keyset, get_page_size, link_header
+from .reports import acached_revenue_summary, paid_orders, parse_bucket, parse_revenue_range
+from .routers import read_from_replica, replica_reads
+from .serializers import OrderSerializer, order_columns, order_rows, order_rows_data, parse_fieldset
+
+renderer = JSONRenderer()
+
+
+def json_response(data, status: int = 200, headers=None) -> HttpResponse:
+    """Ответ в том же виде, что отдает JSONRenderer в DRF."""
+    return HttpResponse(renderer.render(data), content_type='application/json', status=status, headers=headers)
+
+
+def method_not_allowed(request, allowed) -> HttpResponse:
+    """Ответ 405 в формате DRF."""
+    response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    response['Allow'] = ', '.join(allowed)
+    return response
+
+
+async def paginated_orders(request, queryset, fields):
+    """Страница заказов по курсору из запроса и заголовки со ссылками."""
+    cursor = request.GET.get('cursor')
+    page = await apaginate_keyset(order_rows(queryset, fields), cursor, get_page_size(request.GET.get('page_size')))
+    link = link_header(request.build_absolute_uri(), page, bool(cursor))
+    return order_rows_data(page.items, fields), ({'Link': link} if link else {})
+
+
+async def order_list(request):
+    """Список заказов постранично (GET) или создание заказа (POST)."""
+    if request.method == 'POST':
+        return await order_create(request)
+    if request.method != 'GET':
+        return method_not_allowed(request, ['GET', 'POST'])
+    try:
+        fields = parse_fieldset(request.GET)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+    try:
+        with replica_reads():
+            data, headers = await paginated_orders(request, filter_orders(Order.objects.all(), request.GET), fields)
+    except InvalidCursor:
+        return json_response({'detail': 'Некорректный курсор.'}, status=404)
+    return json_response(data, headers=headers)
+
+
+order_list.csrf_exempt = True
+
+
+async def order_create(request):
+    """Создание заказа: проверка по снимку меню и одна запись в базу."""
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError) as e:
+        return json_response({'detail': f'JSON parse error - {e}'}, status=400)
+    serializer = OrderSerializer(data=payload, context={'menu': await menu_catalog.asnapshot()})
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+    order = Order(**serializer.validated_data)
+    try:
+        await order.asave()
+    except ValidationError as e:
+        return json_response(e.message_dict, status=400)
+    return json_response(OrderSerializer(order).data, status=201)
+
+
+@read_from_replica
+async def order_detail(request, order_id: int):
+    """Один заказ по ID."""
+    if request.method != 'GET':
+        return method_not_allowed(request, ['GET'])
+    try:
+        fields = parse_fieldset(request.GET)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+    try:
+        order = await Order.objects.only(*order_columns(fields)).aget(pk=order_id)
+    except Order.DoesNotExist:
+        return json_response({'detail': f'No {Order._meta.object_name} matches the given query.'}, status=404)
+    return json_response(OrderSerializer(order, fields=fields).data)
+
+
+@read_from_replica
+async def revenue(request):
+    """Отчет о выручке за период с теми же параметрами, что и OrderViewSet.revenue."""
+    if request.method != 'GET':
+        return method_not_allowed(request, ['GET'])
+    try:
+        start_datetime, end_datetime = parse_revenue_range(request.GET)
+        bucket = parse_bucket(request.GET.get('bucket'))
+        fields = parse_fieldset(request.GET)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+
+    summary = await acached_revenue_summary(start_datetime, end_datetime, bucket)
+    data = revenue_data(summary, start_datetime, end_datetime, bucket)
+    headers = {}
+    if request.GET.get('orders', '1') not in ('0', 'false'):
+        try:
+            data['orders'], headers = await paginated_orders(request, paid_orders(start_datetime, end_datetime), fields)
+        except InvalidCursor:
+            return json_response({'detail': 'Некорректный курсор.'}, status=404)
+    return json_response(data, headers=headers)
+
+
+async def order_event_stream(request):
+    """Поток событий заказов (Server-Sent Events) вместо опроса списка.
+
+    Фильтры: status (через запятую) и table_number. Переподключившийся
+    клиент передает заголовок Last-Event-ID (или ?last_event_id=) и
+    получает пропущенные события. Работает только под ASGI.
+    """
+    if request.method != 'GET':
+        return method_not_allowed(request, ['GET'])
+    statuses = [value for value in request.GET.get('status', '').split(',') if value]
+    unknown = [value for value in statuses if value not in dict(Order.STATUS_CHOICES)]
+    if unknown:
+        return json_response({'error': f'Неизвестный статус: {", ".join(unknown)}.'}, status=400)
+    table_number = request.GET.get('table_number') or None
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or None
+    if (table_number and not table_number.isdigit()) or (last_event_id and not last_event_id.isdigit()):
+        return json_response({'error': 'table_number и last_event_id должны быть числами.'}, status=400)
+
+    subscription = order_events.subscribe(
+        statuses, int(table_number) if table_number else None, int(last_event_id) if last_event_id else None,
+    )
+    response = StreamingHttpResponse(event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def event_stream(subscription: Subscription):
+    """Записи text/event-stream для подписки с пульсом и ограниченным временем жизни.
+
+    Django 4.2 не сообщает потоку об отключении клиента, поэтому поток
+    закрывается через ORDERS_EVENTS_MAX_AGE секунд; EventSource сам
+    переподключается и продолжает с последнего события.
+    """
+    heartbeat = getattr(settings, 'ORDERS_EVENTS_HEARTBEAT', 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, 'ORDERS_EVENTS_MAX_AGE', 300)
+    with subscription:
+        yield f'retry: {getattr(settings, "ORDERS_EVENTS_RETRY_MS", 3000)}\n\n'
+        if subscription.reset:
+            yield f'id: {subscription.start_id}\nevent: {RESET}\ndata: {{}}\n\n'
+        for event in subscription.backlog:
+            yield event.encode()
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if event is None:
+                break
+            yield event.encode()
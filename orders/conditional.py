@@ -0,0 +1,76 @@
+"""ETag и Last-Modified для условных GET-запросов к заказам.
+
+Валидаторы строятся по версии таблицы заказов (TableVersion) или по
+updated_at одного заказа, поэтому ответ 304 обходится одним легким
+запросом без основного запроса и сериализации. В ETag входит хэш
+параметров запроса и формата ответа: у разных фильтров, страниц, полей
+и форматов одной версии данных разные ETag.
+"""
+import hashlib
+from datetime import datetime
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from django.contrib import messages
+
+from .models import Order, TableVersion
+from .reports import parse_revenue_range
+
+
+def orders_version(request) -> Tuple[int, Optional[datetime]]:
+    """Версия таблицы заказов; читается один раз за запрос."""
+    version = getattr(request, '_orders_version', None)
+    if version is None:
+        version = request._orders_version = TableVersion.current()
+    return version
+
+
+def representation(request) -> str:
+    """Хэш нормализованных параметров запроса и выбранного формата ответа."""
+    params = urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+    media_type = getattr(request, 'accepted_media_type', '')
+    return hashlib.sha1(f'{params}|{media_type}'.encode()).hexdigest()[:16]
+
+
+def orders_etag(request, *args, **kwargs) -> str:
+    return f'orders-{orders_version(request)[0]}-{representation(request)}'
+
+
+def orders_last_modified(request, *args, **kwargs) -> Optional[datetime]:
+    return orders_version(request)[1]
+
+
+def _has_pending_messages(request) -> bool:
+    # Непоказанные сообщения должны попасть на страницу, поэтому 304 не отдается.
+    return bool(len(messages.get_messages(request)))
+
+
+def order_list_page_etag(request, *args, **kwargs) -> Optional[str]:
+    return None if _has_pending_messages(request) else orders_etag(request)
+
+
+def order_list_page_last_modified(request, *args, **kwargs) -> Optional[datetime]:
+    return None if _has_pending_messages(request) else orders_last_modified(request)
+
+
+def order_updated_at(request, pk=None, **kwargs) -> Optional[datetime]:
+    """updated_at заказа без загрузки всей строки; None, если заказа нет."""
+    if not hasattr(request, '_order_updated_at'):
+        request._order_updated_at = (
+            Order.objects.filter(pk=pk).values_list('updated_at', flat=True).first() if str(pk).isdigit() else None
+        )
+    return request._order_updated_at
+
+
+def order_etag(request, pk=None, **kwargs) -> Optional[str]:
+    updated_at = order_updated_at(request, pk)
+    return f'order-{pk}-{updated_at.timestamp()}-{representation(request)}' if updated_at else None
+
+
+def revenue_etag(request, *args, **kwargs) -> Optional[str]:
+    """Версия таблицы и фактический период (период по умолчанию зависит от даты)."""
+    try:
+        start, end = parse_revenue_range(request.GET)
+    except ValueError:
+        return None
+    return f'revenue-{orders_version(request)[0]}-{start.isoformat()}-{end.isoformat()}-{representation(request)}'
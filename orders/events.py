@@ -0,0 +1,220 @@
+"""События изменения заказов и их рассылка подписчикам внутри процесса.
+
+Сигналы заказа публикуют события в EventHub после фиксации транзакции;
+потоковое представление (Server-Sent Events) подписывается на хаб и
+отдает события экранам кухни и зала. Хаб живет в памяти процесса: при
+нескольких процессах сервера каждый видит только свои записи.
+"""
+import asyncio
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+CREATED = 'created'
+UPDATED = 'updated'
+STATUS_CHANGED = 'status_changed'
+DELETED = 'deleted'
+# Подписчику нужно заново загрузить список: пропущенных событий уже нет
+# в истории или его очередь переполнилась.
+RESET = 'reset'
+
+
+@dataclass(frozen=True)
+class OrderEvent:
+    """Событие заказа с уже сериализованными данными."""
+    id: int
+    type: str
+    order_id: int
+    table_number: int
+    status: str
+    previous_status: Optional[str]
+    data: str
+
+    def matches(self, statuses: Optional[Set[str]], table_number: Optional[int]) -> bool:
+        """Подходит ли событие под фильтры подписчика.
+
+        Смена статуса видна экранам и прежнего, и нового статуса, чтобы
+        заказ мог исчезнуть с экрана, который его показывал.
+        """
+        if self.type == RESET:
+            return True
+        if table_number is not None and self.table_number != table_number:
+            return False
+        return not statuses or self.status in statuses or self.previous_status in statuses
+
+    def encode(self) -> str:
+        """Запись события в формате text/event-stream."""
+        return f'id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n'
+
+
+class Subscription:
+    """Подписка на события хаба с очередью в цикле событий подписчика."""
+
+    def __init__(self, hub: 'EventHub', statuses: Optional[Set[str]], table_number: Optional[int],
+                 queue_size: int):
+        self.hub = hub
+        self.statuses = statuses
+        self.table_number = table_number
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.backlog: List[OrderEvent] = []
+        self.reset = False
+        self.start_id = 0
+        self.overflowed = False
+
+    def deliver(self, event: OrderEvent) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Медленный клиент: закрываем поток, при переподключении он
+            # дочитает историю по Last-Event-ID или получит reset.
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[OrderEvent]:
+        """Следующее событие или None, если очередь переполнилась и поток нужно закрыть."""
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class EventHub:
+    """Рассылка событий заказов подписчикам с короткой историей для возобновления.
+
+    Публикация идет из синхронного кода (сигналы, потоки WSGI/ASGI), а
+    подписчики читают в цикле событий, поэтому доставка выполняется через
+    call_soon_threadsafe. История последних событий позволяет клиенту,
+    переподключившемуся с Last-Event-ID, получить пропущенное.
+    """
+
+    def __init__(self, history_size: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._history: Deque[OrderEvent] = deque(
+            maxlen=history_size or getattr(settings, 'ORDERS_EVENTS_HISTORY', 1000)
+        )
+        self._subscribers: Set[Subscription] = set()
+        self._last_id = 0
+        self._listened = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    @property
+    def listened(self) -> bool:
+        """Подписывался ли кто-нибудь на хаб в этом процессе.
+
+        До первой подписки событиям некому доставляться, а история не
+        нужна: возобновлять поток по Last-Event-ID тоже некому.
+        """
+        return self._listened
+
+    def publish(self, event_type: str, order_id: int, table_number: int, status: str,
+                previous_status: Optional[str], data: str) -> OrderEvent:
+        """Добавляет событие в историю и рассылает его подходящим подписчикам."""
+        with self._lock:
+            self._last_id += 1
+            event = OrderEvent(self._last_id, event_type, order_id, table_number, status, previous_status, data)
+            self._history.append(event)
+            subscribers = [s for s in self._subscribers if event.matches(s.statuses, s.table_number)]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Цикл событий подписчика уже закрыт.
+                self.unsubscribe(subscriber)
+        return event
+
+    def subscribe(self, statuses: Optional[Iterable[str]] = None, table_number: Optional[int] = None,
+                  last_event_id: Optional[int] = None, queue_size: Optional[int] = None) -> Subscription:
+        """Подписывает текущий цикл событий на события заказов.
+
+        С last_event_id в backlog попадают пропущенные события из истории;
+        если история их уже не содержит, выставляется reset.
+        """
+        subscription = Subscription(
+            self, set(statuses) if statuses else None, table_number,
+            queue_size or getattr(settings, 'ORDERS_EVENTS_QUEUE_SIZE', 1000),
+        )
+        with self._lock:
+            self._listened = True
+            self._subscribers.add(subscription)
+            subscription.start_id = self._last_id
+            if last_event_id is not None:
+                oldest = self._history[0].id if self._history else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest - 1:
+                    subscription.reset = True
+                else:
+                    subscription.backlog = [
+                        event for event in self._history
+                        if event.id > last_event_id and event.matches(subscription.statuses, table_number)
+                    ]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+order_events = EventHub()
+
+
+def order_data(order) -> str:
+    """Данные заказа для события в том же JSON, что отдает API."""
+    from .serializers import OrderSerializer
+    return JSONRenderer().render(OrderSerializer(order).data).decode()
+
+
+def publish_on_commit(event_type: str, orders: Iterable, previous_status: Optional[str] = None,
+                      using: Optional[str] = None) -> None:
+    """Публикует события заказов после фиксации текущей транзакции.
+
+    Данные сериализуются сразу, чтобы событие отражало заказ на момент
+    записи; при откате транзакции события не публикуются. Вместо сотен
+    событий массовой вставки публикуется одно событие reset. Пока на хаб
+    никто не подписывался (например, под WSGI), запись ничего не
+    сериализует и не публикует.
+    """
+    if not order_events.listened:
+        return
+    orders = list(orders)
+    if not orders:
+        return
+    if len(orders) > getattr(settings, 'ORDERS_EVENTS_BULK_LIMIT', 100):
+        events = [(RESET, 0, 0, '', None, JSONRenderer().render({'count': len(orders)}).decode())]
+    else:
+        events = [
+            (event_type, order.pk, order.table_number, order.status, previous_status,
+             deleted_data(order) if event_type == DELETED else order_data(order))
+            for order in orders
+        ]
+
+    def publish():
+        for event in events:
+            order_events.publish(*event)
+
+    transaction.on_commit(publish, using=using)
+
+
+def deleted_data(order) -> str:
+    """Данные удаленного заказа: только то, что нужно, чтобы убрать его с экрана."""
+    return JSONRenderer().render({'id': order.pk, 'table_number': order.table_number, 'status': order.status}).decode()
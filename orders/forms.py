@@ -1,7 +1,8 @@
 """Формы для управления заказами в кафе."""
 from django import forms
 from django.core.exceptions import ValidationError
-from .models import Order, Dish
+from .menu import menu_catalog
+from .models import Order
 
 
 class OrderForm(forms.ModelForm):
@@ -23,25 +24,26 @@ class OrderForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['dishes'].choices = [(str(dish.id), f"{dish.name} - {dish.price}") for dish in Dish.load_dishes()]
+        self.menu = menu_catalog.snapshot()
+        self.fields['dishes'].choices = [(str(dish.id), f"{dish.name} - {dish.price}") for dish in self.menu.dishes]
 
     def clean_table_number(self):
         table_number = self.cleaned_data['table_number']
         if table_number <= 0:
             raise ValidationError('Номер стола должен быть положительным числом.')
-        instance = self.instance if self.instance.pk else None
-        if Order.objects.filter(
-            table_number=table_number,
-            status__in=['waiting', 'ready']
-        ).exclude(pk=instance.pk if instance else None).exists():
-            raise ValidationError('Этот номер стола уже используется в активном заказе.')
         return table_number
 
+    def _get_validation_exclusions(self):
+        # Занятость стола проверяет ограничение базы при сохранении,
+        # поэтому validate_constraints() не делает для нее отдельный запрос.
+        exclude = super()._get_validation_exclusions()
+        exclude.add('table_number')
+        return exclude
+
     def clean_dishes(self):
         dish_ids = self.cleaned_data['dishes']
-        valid_ids = {str(dish.id) for dish in Dish.load_dishes()}
         if dish_ids:
-            invalid_ids = set(dish_ids) - valid_ids
+            invalid_ids = self.menu.invalid_ids(dish_ids)
             if invalid_ids:
                 raise ValidationError(f'Некорректные ID блюд: {", ".join(invalid_ids)}')
         return [int(dish_id) for dish_id in dish_ids] if dish_ids else []
@@ -50,8 +52,9 @@ class OrderForm(forms.ModelForm):
         instance = super().save(commit=False)
         instance.dishes = self.cleaned_data['dishes']
         if commit:
-            instance.save()
-            instance.calculate_total_price()
-            if instance.status == 'paid' and not instance.paid_at:
-                instance.mark_as_paid()
+            try:
+                instance.save()
+            except ValidationError as e:
+                self.add_error(None, e)
+                raise
         return instance
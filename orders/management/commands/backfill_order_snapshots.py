@@ -0,0 +1,53 @@
+"""Заполнение снимка позиций (названия и цены блюд) у существующих заказов."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from orders.menu import menu_catalog
+from orders.models import Order, OrderLine
+
+
+class Command(BaseCommand):
+    help = 'Пачками заполняет line_items, dish_names и строки OrderLine у заказов без снимка позиций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Псевдоним базы данных (по умолчанию default).')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Число заказов в одной транзакции (по умолчанию 1000).')
+        parser.add_argument('--all', action='store_true',
+                            help='Пересчитать снимок у всех заказов, а не только у незаполненных.')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Пауза между пачками в секундах, чтобы не мешать рабочей нагрузке.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size должен быть положительным числом.')
+        using = options['database']
+
+        queryset = Order.objects.using(using).only('pk', 'dishes', 'created_at').order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(dish_names='')
+
+        menu = menu_catalog.snapshot()
+        started = time.perf_counter()
+        updated = last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for order in batch:
+                order.refresh_line_items(menu)
+            with transaction.atomic(using=using):
+                Order.objects.using(using).bulk_update(batch, ['line_items', 'dish_names'])
+                OrderLine.sync(batch, using=using)
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Снимок позиций заполнен у заказов: {updated} за {time.perf_counter() - started:.2f} с.'
+        ))
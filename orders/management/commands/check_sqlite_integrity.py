@@ -0,0 +1,26 @@
+"""Проверка целостности базы SQLite перед запуском сервера или после сбоя."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from orders.sqlite import check_integrity
+
+
+class Command(BaseCommand):
+    help = 'Выполняет PRAGMA quick_check (или integrity_check) для базы SQLite.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Псевдоним базы данных (по умолчанию default).')
+        parser.add_argument('--full', action='store_true',
+                            help='Полная проверка integrity_check вместо быстрой quick_check.')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'База {alias} не SQLite.')
+        with connection.cursor() as cursor:
+            problems = check_integrity(cursor, 'full' if options['full'] else 'quick')
+        if problems:
+            raise CommandError(f'База {alias} повреждена: {"; ".join(problems[:10])}')
+        self.stdout.write(self.style.SUCCESS(f'{alias}: ok'))
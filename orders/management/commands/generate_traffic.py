@@ -0,0 +1,158 @@
+"""Генерация трафика «вечернего наплыва» в JSONL для benchmarks/replay_traffic.py."""
+import json
+import random
+import re
+from collections import Counter
+from typing import Dict, List
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.menu import menu_catalog
+
+API_PREFIX = '/orders/api/orders/'
+# Подстановки в path: {ссылка на заказ} — ID заказа, созданного записью
+# с этим ref; {today} — дата воспроизведения.
+PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+
+def resolve_path(path: str, values: Dict[str, object]) -> str:
+    """Подставляет значения ссылок в path; KeyError, если ссылка еще не известна."""
+    return PLACEHOLDER_RE.sub(lambda match: str(values[match.group(1)]), path)
+
+
+def path_refs(path: str) -> List[str]:
+    """Имена подстановок в path."""
+    return PLACEHOLDER_RE.findall(path)
+
+
+class TrafficGenerator:
+    """Модель зала: столы с оборотом гостей, экраны кухни и зала, отчеты менеджера.
+
+    Каждый стол проходит цикл «заказ (waiting) -> готово (ready) ->
+    иногда дозаказ -> оплата (paid) -> пауза до следующих гостей»;
+    длительности этапов распределены экспоненциально.
+    """
+
+    def __init__(self, dish_ids: List[int], options: dict):
+        self.dish_ids = dish_ids
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.records: List[dict] = []
+        self.created: List[tuple] = []
+
+    def record(self, at: float, endpoint: str, method: str, path: str, body=None, ref=None) -> None:
+        record = {'at': round(at, 3), 'endpoint': endpoint, 'method': method, 'path': path}
+        if body is not None:
+            record['body'] = body
+        if ref:
+            record['ref'] = ref
+        self.records.append(record)
+
+    def dishes(self) -> List[int]:
+        return [self.rng.choice(self.dish_ids) for _ in range(self.rng.randint(1, self.options['dishes_per_order']))]
+
+    def pause(self, mean: float) -> float:
+        return self.rng.expovariate(1 / mean) if mean > 0 else 0.0
+
+    def tables(self) -> None:
+        duration, opts = self.options['duration'], self.options
+        for table_number in range(opts['first_table'], opts['first_table'] + opts['tables']):
+            clock, session = self.rng.uniform(0, opts['turnover_seconds']), 0
+            while clock < duration:
+                ref = f't{table_number}s{session}'
+                dishes = self.dishes()
+                self.record(clock, 'create', 'POST', API_PREFIX,
+                            {'table_number': table_number, 'dishes': dishes, 'status': 'waiting'}, ref)
+                self.created.append((clock, ref))
+                detail = f'{API_PREFIX}{{{ref}}}/'
+                ready = clock + self.pause(opts['prep_seconds'])
+                paid = ready + self.pause(opts['dining_seconds'])
+                if ready < duration:
+                    self.record(ready, 'set_ready', 'PATCH', detail, {'status': 'ready'})
+                if self.rng.random() < opts['reorder_share']:
+                    reorder = self.rng.uniform(ready, paid)
+                    if reorder < duration:
+                        self.record(reorder, 'add_dishes', 'PATCH', detail, {'dishes': dishes + self.dishes()})
+                if paid < duration:
+                    self.record(paid, 'set_paid', 'PATCH', detail, {'status': 'paid'})
+                clock = paid + self.pause(opts['turnover_seconds'])
+                session += 1
+
+    def screens(self) -> None:
+        interval = self.options['screen_interval']
+        for screen in range(self.options['screens']):
+            status = ('waiting', 'ready')[screen % 2]
+            clock = self.rng.uniform(0, interval)
+            while clock < self.options['duration']:
+                self.record(clock, f'list_{status}', 'GET', f'{API_PREFIX}?status={status}&page_size=50')
+                clock += interval
+
+    def lookups(self) -> None:
+        """Карточки заказов (официанты) и отчеты о выручке (менеджер)."""
+        created = sorted(self.created)
+        clock = self.pause(1 / self.options['retrieve_rate']) if self.options['retrieve_rate'] > 0 else None
+        while clock is not None and clock < self.options['duration']:
+            known = [ref for at, ref in created if at < clock]
+            if known:
+                self.record(clock, 'retrieve', 'GET', f'{API_PREFIX}{{{self.rng.choice(known)}}}/')
+            clock += self.pause(1 / self.options['retrieve_rate'])
+        interval = self.options['revenue_interval']
+        clock = self.rng.uniform(0, interval) if interval > 0 else None
+        while clock is not None and clock < self.options['duration']:
+            self.record(clock, 'revenue', 'GET',
+                        f'{API_PREFIX}revenue/?start_date={{today}}&end_date={{today}}'
+                        '&start_time=00:00&end_time=23:59&bucket=hour&orders=0')
+            clock += interval
+
+    def generate(self) -> List[dict]:
+        self.tables()
+        self.screens()
+        self.lookups()
+        # Устойчивая сортировка сохраняет порядок этапов одного заказа при равном времени.
+        return sorted(self.records, key=lambda record: record['at'])
+
+
+class Command(BaseCommand):
+    help = 'Генерирует JSONL с HTTP-трафиком наплыва гостей для benchmarks/replay_traffic.py.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='traffic.jsonl', help='Путь к JSONL-файлу или "-" для stdout.')
+        parser.add_argument('--duration', type=float, default=600, help='Длительность трафика в секундах.')
+        parser.add_argument('--tables', type=int, default=40, help='Число столов.')
+        parser.add_argument('--first-table', type=int, default=1, help='Номер первого стола.')
+        parser.add_argument('--dishes-per-order', type=int, default=5)
+        parser.add_argument('--prep-seconds', type=float, default=60, help='Среднее время waiting -> ready.')
+        parser.add_argument('--dining-seconds', type=float, default=180, help='Среднее время ready -> paid.')
+        parser.add_argument('--turnover-seconds', type=float, default=20, help='Средняя пауза до следующих гостей.')
+        parser.add_argument('--reorder-share', type=float, default=0.3, help='Доля столов, дозаказывающих блюда.')
+        parser.add_argument('--screens', type=int, default=2, help='Экраны кухни и зала, опрашивающие список.')
+        parser.add_argument('--screen-interval', type=float, default=2, help='Период опроса экрана, с.')
+        parser.add_argument('--retrieve-rate', type=float, default=5, help='Запросов карточки заказа в секунду.')
+        parser.add_argument('--revenue-interval', type=float, default=15, help='Период отчета о выручке, с.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['duration'] <= 0 or options['tables'] <= 0 or options['first_table'] <= 0:
+            raise CommandError('--duration, --tables и --first-table должны быть положительными.')
+        if options['screens'] and options['screen_interval'] <= 0:
+            raise CommandError('--screen-interval должен быть положительным.')
+        dish_ids = [dish.id for dish in menu_catalog.dishes()]
+        if not dish_ids:
+            raise CommandError('Меню пустое: трафику не из чего составлять заказы.')
+
+        records = TrafficGenerator(dish_ids, options).generate()
+        stream = self.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        try:
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+
+        if options['output'] != '-':
+            counts = Counter(record['endpoint'] for record in records)
+            self.stdout.write(self.style.SUCCESS(
+                f'Записано запросов: {len(records)} за {options["duration"]:.0f} с '
+                f'({len(records) / options["duration"]:.1f} в секунду): '
+                + ', '.join(f'{endpoint} {count}' for endpoint, count in sorted(counts.items()))
+            ))
@@ -0,0 +1,175 @@
+"""Потоковый импорт заказов из JSONL-файла."""
+import json
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Set, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from orders.menu import MenuSnapshot, from_cents, menu_catalog, to_cents
+from orders.models import ACTIVE_STATUSES, ACTIVE_TABLE_MESSAGE, Order, is_active_table_violation
+
+STATUSES = {value for value, _ in Order.STATUS_CHOICES}
+MAX_PRICE_CENTS = 10 ** 10 - 1  # max_digits=10, decimal_places=2 у Order.total_price
+
+
+class RecordError(ValueError):
+    """Ошибка в отдельной записи JSONL-файла."""
+
+
+def iter_records(stream) -> Iterator[Tuple[int, object]]:
+    """Построчно читает JSONL и возвращает пары (номер строки, запись)."""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, RecordError(f'некорректный JSON: {e.msg}')
+
+
+def parse_timestamp(value, field: str) -> Optional[datetime]:
+    """Разбирает дату ISO 8601; наивные даты считаются в текущем часовом поясе."""
+    if value in (None, ''):
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise RecordError(f'{field}: некорректная дата {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_price(value) -> Optional[Decimal]:
+    """Разбирает сумму заказа (число или строка) с округлением до 0.01."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise RecordError(f'total_price: некорректная сумма {value!r}')
+    try:
+        cents = to_cents(value)
+    except (ArithmeticError, ValueError):
+        raise RecordError(f'total_price: некорректная сумма {value!r}')
+    if not 0 <= cents <= MAX_PRICE_CENTS:
+        raise RecordError(f'total_price: сумма вне допустимого диапазона {value!r}')
+    return from_cents(cents)
+
+
+def build_order(record, menu: MenuSnapshot, active_tables: Set[int]) -> Tuple[Order, Optional[Decimal]]:
+    """Проверяет запись и строит несохраненный заказ и сумму из записи (None, если ее нет)."""
+    if isinstance(record, RecordError):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError('запись должна быть JSON-объектом')
+
+    table_number = record.get('table_number')
+    if isinstance(table_number, bool) or not isinstance(table_number, int) or table_number <= 0:
+        raise RecordError('table_number: номер стола должен быть положительным числом')
+
+    dishes = record.get('dishes', [])
+    if not isinstance(dishes, list) or not all(isinstance(d, int) and not isinstance(d, bool) for d in dishes):
+        raise RecordError('dishes: ожидается список целых ID блюд')
+    invalid_ids = menu.invalid_ids(dishes)
+    if invalid_ids:
+        raise RecordError(f'dishes: некорректные ID блюд: {", ".join(invalid_ids)}')
+
+    status = record.get('status', 'waiting')
+    if status not in STATUSES:
+        raise RecordError(f'status: неизвестный статус {status!r}')
+    if status in ACTIVE_STATUSES:
+        if table_number in active_tables:
+            raise RecordError('table_number: этот номер стола уже используется в активном заказе')
+        active_tables.add(table_number)
+
+    total_price = parse_price(record.get('total_price'))
+    order = Order(table_number=table_number, dishes=dishes, status=status)
+    created_at = parse_timestamp(record.get('created_at'), 'created_at')
+    if created_at:
+        order.created_at = created_at
+    if status == 'paid':
+        # Без paid_at заказ считается оплаченным в момент создания, а не импорта.
+        order.paid_at = parse_timestamp(record.get('paid_at'), 'paid_at') or order.created_at
+    return order, total_price
+
+
+class Command(BaseCommand):
+    help = 'Потоково импортирует заказы из JSONL-файла пачками внутри транзакций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к JSONL-файлу или "-" для stdin.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Число заказов в одной транзакции (по умолчанию 1000).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только проверить записи, ничего не сохраняя.')
+        parser.add_argument('--max-errors-shown', type=int, default=20,
+                            help='Сколько ошибок вывести подробно.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0:
+            raise CommandError('--chunk-size должен быть положительным числом.')
+
+        path = options['path']
+        try:
+            stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Не удалось открыть {path}: {e}')
+
+        menu = menu_catalog.snapshot()
+        active_tables = set(Order.objects.filter(
+            status__in=ACTIVE_STATUSES
+        ).values_list('table_number', flat=True))
+
+        started = time.perf_counter()
+        imported = errors = 0
+        chunk: List[Tuple[Order, Optional[Decimal]]] = []
+        try:
+            for line_number, record in iter_records(stream):
+                try:
+                    chunk.append(build_order(record, menu, active_tables))
+                except RecordError as e:
+                    errors += 1
+                    if errors <= options['max_errors_shown']:
+                        self.stderr.write(f'Строка {line_number}: {e}')
+                    continue
+                if len(chunk) >= chunk_size:
+                    imported += self._flush(chunk, menu, options['dry_run'])
+                    chunk = []
+            imported += self._flush(chunk, menu, options['dry_run'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано заказов: {imported}, ошибок: {errors}, '
+            f'время: {elapsed:.2f} с, скорость: {rate:.0f} строк/с'
+            + (' (пробный запуск)' if options['dry_run'] else '')
+        ))
+
+    @staticmethod
+    def _flush(chunk: List[Tuple[Order, Optional[Decimal]]], menu: MenuSnapshot, dry_run: bool) -> int:
+        if not chunk:
+            return 0
+        orders = Order.prepare_for_bulk_create([order for order, _ in chunk], menu)
+        # Сумма из записи (например, со скидкой или по старым ценам) важнее
+        # расчета по текущему меню.
+        for order, total_price in chunk:
+            if total_price is not None:
+                order.total_price = total_price
+        if not dry_run:
+            try:
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders)
+            except IntegrityError as e:
+                if not is_active_table_violation(e):
+                    raise
+                raise CommandError(f'{ACTIVE_TABLE_MESSAGE} Стол заняли во время импорта; пачка не сохранена.')
+        return len(chunk)
@@ -0,0 +1,64 @@
+"""Список и сводка профилей запросов, снятых ProfilingMiddleware."""
+import os
+import pstats
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.profiling import list_profiles, profile_dir
+
+SORT_KEYS = {'cumulative': 3, 'tottime': 2, 'calls': 1}
+
+
+def short_location(func) -> str:
+    """file:line(function) с путем относительно проекта или site-packages."""
+    filename, line, name = func
+    if filename == '~':
+        return name
+    for root in (*(p for p in sys.path if p.endswith('site-packages')), str(settings.BASE_DIR)):
+        if filename.startswith(root + os.sep):
+            filename = os.path.relpath(filename, root)
+            break
+    return f'{filename}:{line}({name})'
+
+
+class Command(BaseCommand):
+    help = 'Выводит профили запросов и самые затратные функции по суммарному времени.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Каталог профилей (по умолчанию ORDERS_PROFILE_DIR).')
+        parser.add_argument('--view', help='Только профили этого имени URL.')
+        parser.add_argument('--last', type=int, help='Только N последних профилей.')
+        parser.add_argument('--top', type=int, default=20, help='Число функций в сводке (0 — без сводки).')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='cumulative')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or profile_dir()
+        profiles = [info for info in list_profiles(directory) if not options['view'] or info.view == options['view']]
+        if options['last']:
+            profiles = profiles[-options['last']:]
+        if not profiles:
+            raise CommandError(f'В {directory} нет подходящих профилей.')
+
+        for info in profiles:
+            self.stdout.write(
+                f'{info.created_at:%Y-%m-%d %H:%M:%S}  {info.method:<6} {info.duration_ms:>9.1f} ms  '
+                f'{info.view:<24} {os.path.basename(info.path)}'
+            )
+        total_ms = sum(info.duration_ms for info in profiles)
+        self.stdout.write(self.style.SUCCESS(
+            f'Профилей: {len(profiles)}, среднее время запроса {total_ms / len(profiles):.1f} ms.'
+        ))
+        if options['top'] <= 0:
+            return
+
+        stats = pstats.Stats(*(info.path for info in profiles))
+        index = SORT_KEYS[options['sort']]
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][index], reverse=True)[:options['top']]
+        self.stdout.write(f'\n{"cumtime s":>10} {"tottime s":>10} {"ms/запрос":>10} {"calls":>9}  функция')
+        for func, (_, calls, tottime, cumtime, _) in rows:
+            self.stdout.write(
+                f'{cumtime:>10.3f} {tottime:>10.3f} {cumtime * 1000 / len(profiles):>10.2f} {calls:>9}  '
+                f'{short_location(func)}'
+            )
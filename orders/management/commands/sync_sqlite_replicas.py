@@ -0,0 +1,29 @@
+"""Копирование основной базы SQLite в файлы реплик для локальной проверки чтения с реплик."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from orders.routers import read_replicas, sync_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite во все реплики из ORDERS_READ_REPLICAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Псевдоним исходной базы данных (по умолчанию default).')
+
+    def handle(self, *args, **options):
+        replicas = read_replicas()
+        if not replicas:
+            raise CommandError('Реплики не настроены: задайте DATABASE_REPLICAS или ORDERS_READ_REPLICAS.')
+        for alias in [options['database'], *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'База {alias} не SQLite: реплики других СУБД синхронизирует сама СУБД.')
+        for replica in replicas:
+            started = time.perf_counter()
+            sync_sqlite_replica(replica, options['database'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{options["database"]} -> {replica}: {time.perf_counter() - started:.2f} с.'
+            ))
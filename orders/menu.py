@@ -0,0 +1,282 @@
+"""Каталог меню кафе с кэшированием в памяти процесса."""
+import json
+import os
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .metrics import record_menu_load
+
+
+CENT = Decimal('0.01')
+
+
+def to_cents(price) -> int:
+    """Переводит цену в целое число копеек с округлением до 0.01."""
+    return int(Decimal(str(price)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents: int) -> Decimal:
+    """Переводит целое число копеек в Decimal с двумя знаками."""
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+class Dish:
+    """Класс для представления блюда, загружаемого из JSON."""
+    __slots__ = ('id', 'name', 'price', 'description')
+
+    def __init__(self, id: int, name: str, price: float, description: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.price = price
+        self.description = description or ""
+
+    def __str__(self) -> str:
+        return f"{self.name} - {self.price}"
+
+    @staticmethod
+    def load_dishes() -> List['Dish']:
+        """Возвращает список блюд из общего каталога меню."""
+        return list(menu_catalog.dishes())
+
+    @staticmethod
+    def get_by_id(dish_id: int) -> Optional['Dish']:
+        """Получает блюдо по ID."""
+        return menu_catalog.snapshot().get(dish_id)
+
+
+class MenuSnapshot:
+    """Неизменяемый снимок меню.
+
+    Помимо кортежа блюд хранит список цен в копейках и индекс позиций по
+    ID. Стоимость заказа считается суммированием целых копеек, поэтому
+    не накапливает ошибок float и совпадает с Decimal до копейки.
+    """
+
+    def __init__(self, dishes: Iterable[Dish] = ()):
+        self.dishes: Tuple[Dish, ...] = tuple(dishes)
+        self.prices: List[int] = [to_cents(dish.price) for dish in self.dishes]
+        self.positions: Dict[int, int] = {dish.id: pos for pos, dish in enumerate(self.dishes)}
+
+    def __len__(self) -> int:
+        return len(self.dishes)
+
+    def __contains__(self, dish_id) -> bool:
+        return dish_id in self.positions
+
+    def get(self, dish_id) -> Optional[Dish]:
+        """Возвращает блюдо по ID или None."""
+        pos = self.positions.get(dish_id)
+        return None if pos is None else self.dishes[pos]
+
+    def gather(self, dish_ids) -> List[int]:
+        """Возвращает позиции блюд заказа в списке цен меню; неизвестные ID пропускаются."""
+        if not isinstance(dish_ids, list):
+            return []
+        positions = self.positions
+        try:
+            found = list(map(positions.get, dish_ids))
+        except TypeError:
+            found = [None] * len(dish_ids)
+        if None not in found:
+            return found
+        gathered = []
+        for dish_id, pos in zip(dish_ids, found):
+            if pos is None:
+                try:
+                    pos = positions.get(int(dish_id))
+                except (ValueError, TypeError):
+                    continue
+                if pos is None:
+                    continue
+            gathered.append(pos)
+        return gathered
+
+    def total_cents(self, dish_ids) -> int:
+        """Стоимость заказа в копейках."""
+        if not isinstance(dish_ids, list):
+            return 0
+        try:
+            return sum(map(self.prices.__getitem__, map(self.positions.__getitem__, dish_ids)))
+        except (KeyError, TypeError):
+            return sum(map(self.prices.__getitem__, self.gather(dish_ids)))
+
+    def price_total(self, dish_ids) -> Decimal:
+        """Стоимость заказа как Decimal с двумя знаками."""
+        return from_cents(self.total_cents(dish_ids))
+
+    def batch_totals_cents(self, orders_dish_ids: Iterable[Sequence]) -> List[int]:
+        """Стоимости набора заказов в копейках по общему списку цен."""
+        get_price = self.prices.__getitem__
+        get_position = self.positions.__getitem__
+        totals = []
+        for dish_ids in orders_dish_ids:
+            try:
+                if isinstance(dish_ids, list):
+                    totals.append(sum(map(get_price, map(get_position, dish_ids))))
+                    continue
+            except (KeyError, TypeError):
+                pass
+            totals.append(self.total_cents(dish_ids))
+        return totals
+
+    def line_items(self, dish_ids) -> List[dict]:
+        """Снимок позиций заказа: ID, название и цена каждого блюда на текущий момент."""
+        dishes, prices = self.dishes, self.prices
+        return [
+            {'id': dishes[pos].id, 'name': dishes[pos].name, 'price': str(from_cents(prices[pos]))}
+            for pos in self.gather(dish_ids)
+        ]
+
+    def dish_names(self, dish_ids) -> str:
+        """Возвращает строку с названиями и ценами блюд."""
+        positions = self.positions
+        dishes = self.dishes
+        dish_names = []
+        for dish_id in dish_ids:
+            if isinstance(dish_id, int):
+                pos = positions.get(dish_id)
+                if pos is not None:
+                    dish = dishes[pos]
+                    dish_names.append(f"{dish.name} - {dish.price:.2f}")
+        return ', '.join(dish_names) if dish_names else 'Нет блюд'
+
+    def invalid_ids(self, dish_ids) -> List[str]:
+        """Возвращает ID блюд, отсутствующие в меню, в порядке следования."""
+        positions = self.positions
+        invalid = []
+        for dish_id in dish_ids:
+            key = str(dish_id)
+            try:
+                known = int(key) in positions and str(int(key)) == key
+            except ValueError:
+                known = False
+            if not known and key not in invalid:
+                invalid.append(key)
+        return invalid
+
+
+def format_dish_names(line_items: Iterable[dict]) -> str:
+    """Строка «Название - цена» по позициям заказа."""
+    names = [f"{item['name']} - {item['price']}" for item in line_items]
+    return ', '.join(names) if names else 'Нет блюд'
+
+
+def default_menu_path() -> str:
+    """Путь к файлу меню: ORDERS_MENU_PATH или static/orders/dishes.json."""
+    return str(getattr(
+        settings,
+        'ORDERS_MENU_PATH',
+        f"{settings.BASE_DIR}/static/orders/dishes.json",
+    ))
+
+
+def parse_dish(row) -> Optional[Dish]:
+    """Блюдо из записи файла меню или None, если ID не целое число или цена не число."""
+    if not isinstance(row, dict):
+        return None
+    dish_id, price = row.get('id'), row.get('price')
+    if isinstance(dish_id, bool) or not isinstance(dish_id, int):
+        return None
+    if isinstance(price, bool) or not isinstance(price, (int, float)):
+        return None
+    try:
+        to_cents(price)
+        return Dish(**row)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+
+
+def parse_dishes(json_path: str) -> Tuple['Dish', ...]:
+    """Читает и разбирает файл меню.
+
+    Записи с некорректными ID или ценой пропускаются; если файл не
+    читается или не является списком, меню пустое.
+    """
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            dishes_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, ValueError):
+        return ()
+    if not isinstance(dishes_data, list):
+        return ()
+    return tuple(dish for dish in map(parse_dish, dishes_data) if dish is not None)
+
+
+class MenuCatalog:
+    """Общий для процесса каталог меню.
+
+    Файл разбирается один раз и перечитывается только при изменении его
+    mtime/размера или по явному вызову reload(). Читатели получают
+    неизменяемый снимок меню, поэтому блокировка нужна только на время
+    перезагрузки.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._snapshot = MenuSnapshot()
+        self.load_count = 0
+
+    @property
+    def path(self) -> str:
+        return self._path or default_menu_path()
+
+    @staticmethod
+    def _stat_signature(json_path: str):
+        """Подпись файла для проверки изменений: путь, mtime, размер, inode."""
+        try:
+            stat = os.stat(json_path)
+        except OSError:
+            return (json_path, None)
+        return (json_path, stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def snapshot(self) -> MenuSnapshot:
+        """Возвращает актуальный снимок меню, перечитывая файл при изменении."""
+        json_path = self.path
+        signature = self._stat_signature(json_path)
+        if signature == self._signature:
+            return self._snapshot
+        with self._lock:
+            if signature != self._signature:
+                self._load(json_path, signature)
+            return self._snapshot
+
+    async def asnapshot(self) -> MenuSnapshot:
+        """Асинхронный вариант snapshot().
+
+        Перечитывание файла и ожидание блокировки выполняются в потоке,
+        чтобы не останавливать цикл событий.
+        """
+        signature = self._stat_signature(self.path)
+        if signature == self._signature:
+            return self._snapshot
+        return await sync_to_async(self.snapshot, thread_sensitive=False)()
+
+    def dishes(self) -> Tuple[Dish, ...]:
+        """Возвращает актуальный кортеж блюд."""
+        return self.snapshot().dishes
+
+    def reload(self) -> MenuSnapshot:
+        """Принудительно перечитывает файл меню."""
+        json_path = self.path
+        with self._lock:
+            self._load(json_path, self._stat_signature(json_path))
+            return self._snapshot
+
+    def _load(self, json_path: str, signature) -> None:
+        if signature[1] is None:
+            snapshot = MenuSnapshot()
+        else:
+            snapshot = MenuSnapshot(parse_dishes(json_path))
+            self.load_count += 1
+            record_menu_load()
+        self._snapshot = snapshot
+        self._signature = signature
+
+
+menu_catalog = MenuCatalog()
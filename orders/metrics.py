@@ -0,0 +1,231 @@
+"""Метрики производительности запросов в памяти процесса и их экспорт для Prometheus.
+
+RequestMetricsMiddleware (orders/middleware.py) заводит на каждый запрос
+RequestTimer в contextvar; время SQL-запросов, рендеринга шаблонов и
+число перечитываний файла меню добавляются к нему из обертки execute
+соединения, шаблонного бэкенда TimedDjangoTemplates и MenuCatalog.
+После ответа итоги запроса одним захватом блокировки переносятся в
+счетчики и гистограммы по имени URL из orders/urls.py.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+# Границы гистограмм в секундах.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current: ContextVar[Optional['RequestTimer']] = ContextVar('orders_request_timer', default=None)
+
+
+class RequestTimer:
+    """Показатели одного запроса."""
+    __slots__ = ('started', 'queries', 'sql_seconds', 'template_seconds', 'menu_loads')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.menu_loads = 0
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing."""
+        return (
+            f'app;dur={total * 1000:.1f}, '
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template_seconds * 1000:.1f}, '
+            f'menu;desc="{self.menu_loads} loads"'
+        )
+
+
+def start_request() -> Tuple[RequestTimer, object]:
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def finish_request(token) -> None:
+    _current.reset(token)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами (без собственной блокировки)."""
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Пары (le, накопленное число) в формате Prometheus, включая +Inf."""
+        total, result = 0, []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append(('+Inf' if bound == float('inf') else repr(bound), total))
+        return result
+
+
+class ViewStats:
+    """Накопленные показатели одного имени URL."""
+    __slots__ = ('responses', 'duration', 'sql', 'queries', 'template_seconds', 'menu_loads')
+
+    def __init__(self):
+        self.responses: Dict[Tuple[str, str], int] = {}
+        self.duration = Histogram()
+        self.sql = Histogram()
+        self.queries = 0
+        self.template_seconds = 0.0
+        self.menu_loads = 0
+
+
+class MetricsRegistry:
+    """Потокобезопасный реестр метрик запросов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Dict[str, ViewStats] = {}
+
+    def record(self, view: str, method: str, status: int, elapsed: float, timer: RequestTimer) -> None:
+        key = (method, f'{status // 100}xx')
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = ViewStats()
+            stats.responses[key] = stats.responses.get(key, 0) + 1
+            stats.duration.observe(elapsed)
+            stats.sql.observe(timer.sql_seconds)
+            stats.queries += timer.queries
+            stats.template_seconds += timer.template_seconds
+            stats.menu_loads += timer.menu_loads
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views = {}
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        with self._lock:
+            snapshot = [
+                (view, dict(stats.responses), stats.duration.cumulative(), stats.duration.sum,
+                 stats.duration.count, stats.sql.cumulative(), stats.sql.sum, stats.sql.count,
+                 stats.queries, stats.template_seconds, stats.menu_loads)
+                for view, stats in sorted(self._views.items())
+            ]
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        family('orders_http_requests_total', 'counter', 'Requests by URL name, method and status class.')
+        for view, responses, *_ in snapshot:
+            for (method, status), count in sorted(responses.items()):
+                lines.append(f'orders_http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+        for name, offset, help_text in (
+            ('orders_http_request_duration_seconds', 2, 'Wall time of a request.'),
+            ('orders_db_duration_seconds', 5, 'SQL time per request.'),
+        ):
+            family(name, 'histogram', help_text)
+            for row in snapshot:
+                view, buckets, total, count = row[0], row[offset], row[offset + 1], row[offset + 2]
+                for le, value in buckets:
+                    lines.append(f'{name}_bucket{{view="{view}",le="{le}"}} {value}')
+                lines.append(f'{name}_sum{{view="{view}"}} {total:.6f}')
+                lines.append(f'{name}_count{{view="{view}"}} {count}')
+        for name, index, help_text, fmt in (
+            ('orders_db_queries_total', 8, 'SQL queries executed.', '{}'),
+            ('orders_template_render_seconds_total', 9, 'Template render time.', '{:.6f}'),
+            ('orders_menu_loads_total', 10, 'Menu file loads during requests.', '{}'),
+        ):
+            family(name, 'counter', help_text)
+            for row in snapshot:
+                lines.append(f'{name}{{view="{row[0]}"}} {fmt.format(row[index])}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка execute: время SQL-запроса текущего запроса."""
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.queries += 1
+        timer.sql_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_timing(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_menu_load() -> None:
+    """Учитывает перечитывание файла меню в текущем запросе."""
+    timer = _current.get()
+    if timer is not None:
+        timer.menu_loads += 1
+
+
+class TimedTemplate:
+    """Шаблон бэкенда Django, замеряющий время рендеринга."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timer = _current.get()
+        if timer is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timer.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates с замером рендеринга для метрик запросов."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def render_metrics() -> str:
+    """Метрики запросов, кэша выручки и каталога меню в формате Prometheus."""
+    from .menu import menu_catalog
+    from .revenue_cache import revenue_cache
+
+    cache_stats = revenue_cache.stats()
+    return request_metrics.render() + (
+        '# HELP orders_revenue_cache_lookups_total Revenue cache lookups by result.\n'
+        '# TYPE orders_revenue_cache_lookups_total counter\n'
+        f'orders_revenue_cache_lookups_total{{result="hit"}} {cache_stats["hits"]}\n'
+        f'orders_revenue_cache_lookups_total{{result="miss"}} {cache_stats["misses"]}\n'
+        '# HELP orders_menu_file_loads Menu file loads since process start.\n'
+        '# TYPE orders_menu_file_loads gauge\n'
+        f'orders_menu_file_loads {menu_catalog.load_count}\n'
+    )
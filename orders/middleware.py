@@ -0,0 +1,168 @@
+"""Промежуточные слои приложения заказов."""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .metrics import finish_request, request_metrics, start_request
+from .profiling import RequestProfile, header_name, is_async_view, sampled_url_name, url_name
+from .routers import is_pinned_to_primary, primary_pin, read_replicas
+
+UNSAFE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет за основной базой запросы, которые пишут, и недавние запросы того же клиента.
+
+    Запрос, изменивший данные, ставит cookie на ORDERS_REPLICA_PIN_SECONDS
+    секунд; пока она действует, чтения клиента не уходят на реплику. Без
+    настроенных реплик слой ничего не делает.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = getattr(settings, 'ORDERS_REPLICA_PIN_COOKIE', 'orders_primary')
+        self.pin_seconds = getattr(settings, 'ORDERS_REPLICA_PIN_SECONDS', 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not read_replicas():
+            return self.get_response(request)
+        with primary_pin(self.cookie_name in request.COOKIES):
+            response = self.get_response(request)
+            return self.remember_write(request, response)
+
+    async def __acall__(self, request):
+        if not read_replicas():
+            return await self.get_response(request)
+        with primary_pin(self.cookie_name in request.COOKIES):
+            response = await self.get_response(request)
+            return self.remember_write(request, response)
+
+    def remember_write(self, request, response):
+        if request.method in UNSAFE_METHODS or is_pinned_to_primary():
+            response.set_cookie(self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class RequestMetricsMiddleware:
+    """Собирает время запроса, SQL, рендеринга шаблонов и загрузок меню.
+
+    Итоги записываются в orders.metrics.request_metrics по имени URL
+    приложения orders и отдаются клиенту заголовком Server-Timing.
+    Отключается настройкой ORDERS_METRICS = False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'ORDERS_METRICS', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        timer, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timer)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        timer, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timer)
+
+    def finish(self, request, response, timer):
+        elapsed = time.perf_counter() - timer.started
+        match = request.resolver_match
+        if match is not None and 'orders' in match.app_names and match.url_name:
+            request_metrics.record(match.url_name, request.method, response.status_code, elapsed, timer)
+        response['Server-Timing'] = timer.server_timing(elapsed)
+        return response
+
+
+def staff_requested_profile(request) -> bool:
+    return bool(request.META.get(header_name())) and request.user.is_staff
+
+
+class ProfilingMiddleware:
+    """Снимает профиль cProfile с выбранных запросов (см. orders/profiling.py).
+
+    Стоит после AuthenticationMiddleware: заголовок профилирования
+    учитывается только у сотрудников. Имя сохраненного файла
+    возвращается в том же заголовке ответа.
+
+    Под ASGI синхронное представление выполняется не в потоке цикла
+    событий, а в потоке thread_sensitive-кода запроса, поэтому профиль
+    включается и выключается через sync_to_async в этом же потоке;
+    представление по-прежнему вызывает обработчик Django. Профиль
+    асинхронного представления снимается в цикле событий.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'ORDERS_PROFILE_HEADER', 'X-Orders-Profile')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = self.select(request, staff_requested_profile(request))
+        if profile is None or not profile.start():
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            name = profile.stop(time.perf_counter() - started)
+        response[self.header] = name
+        return response
+
+    async def __acall__(self, request):
+        requested = bool(request.META.get(header_name())) and await sync_to_async(staff_requested_profile)(request)
+        profile = self.select(request, requested)
+        if profile is None:
+            return await self.get_response(request)
+        in_view_thread = not is_async_view(request)
+        if not await self.run(profile.start, in_view_thread):
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            name = await self.run(profile.stop, in_view_thread, time.perf_counter() - started)
+        response[self.header] = name
+        return response
+
+    @staticmethod
+    async def run(func, in_view_thread: bool, *args):
+        """Вызывает func в потоке синхронного представления или в цикле событий."""
+        if in_view_thread:
+            return await sync_to_async(func, thread_sensitive=True)(*args)
+        return func(*args)
+
+    def select(self, request, requested: bool):
+        """Профиль запроса (еще не запущенный) или None, если запрос не профилируется."""
+        view = (url_name(request) or 'unresolved') if requested else sampled_url_name(request)
+        if view is None:
+            return None
+        return RequestProfile(view, request.method)
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:36
+
+from django.db import migrations, models
+
+# Частичные индексы создаются только там, где планировщик использует их
+# для параметризованных запросов Django. SQLite подставляет параметры уже
+# после планирования и не выбирает частичный индекс для status = ?,
+# поэтому на SQLite работают составные индексы выше.
+PARTIAL_INDEXES = [
+    ('order_paid_at_partial_idx', "(paid_at) WHERE status = 'paid'"),
+    ('order_active_table_idx', "(table_number) WHERE status IN ('waiting', 'ready')"),
+]
+
+
+def create_partial_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in PARTIAL_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON orders_order {definition}')
+
+
+def drop_partial_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in PARTIAL_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['-created_at', 'id'], name='order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'paid_at'], name='order_status_paid_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+        ),
+        migrations.RunPython(create_partial_indexes, drop_partial_indexes),
+    ]
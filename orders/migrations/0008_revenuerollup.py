@@ -0,0 +1,53 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:41
+
+from datetime import timezone as dt_timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+
+def backfill_rollup(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    RevenueRollup = apps.get_model('orders', 'RevenueRollup')
+    db = schema_editor.connection.alias
+    rows = (
+        Order.objects.using(db)
+        .filter(status='paid', paid_at__isnull=False)
+        .annotate(bucket=TruncHour('paid_at', tzinfo=dt_timezone.utc))
+        .values('bucket')
+        .annotate(revenue=Sum('total_price'), order_count=Count('id'))
+        .order_by('bucket')
+    )
+    batch = []
+    for row in rows.iterator():
+        batch.append(RevenueRollup(bucket_start=row['bucket'], revenue=row['revenue'], order_count=row['order_count']))
+        if len(batch) >= 1000:
+            RevenueRollup.objects.using(db).bulk_create(batch)
+            batch = []
+    RevenueRollup.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(unique=True, verbose_name='Начало часа')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('order_count', models.IntegerField(default=0, verbose_name='Число заказов')),
+            ],
+            options={
+                'verbose_name': 'Сводка выручки за час',
+                'verbose_name_plural': 'Сводка выручки по часам',
+                'ordering': ['bucket_start'],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
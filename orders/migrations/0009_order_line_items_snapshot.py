@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_revenuerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='dish_names',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Состав заказа'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_items',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Позиции на момент заказа'),
+        ),
+    ]
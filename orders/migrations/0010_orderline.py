@@ -0,0 +1,85 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:45
+
+import json
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def menu_prices():
+    """Цены блюд из файла меню на момент миграции (без импорта orders.menu)."""
+    path = getattr(settings, 'ORDERS_MENU_PATH', f"{settings.BASE_DIR}/static/orders/dishes.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    prices = {}
+    for row in rows if isinstance(rows, list) else []:
+        if not isinstance(row, dict):
+            continue
+        dish_id, price = row.get('id'), row.get('price')
+        if isinstance(dish_id, int) and not isinstance(dish_id, bool) \
+                and isinstance(price, (int, float)) and not isinstance(price, bool):
+            prices[dish_id] = str(Decimal(str(price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    return prices
+
+
+def backfill_lines(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderLine = apps.get_model('orders', 'OrderLine')
+    db = schema_editor.connection.alias
+    prices = menu_prices()
+    orders = Order.objects.using(db).only('pk', 'dishes', 'line_items', 'created_at').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(orders.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        lines = []
+        for order in batch:
+            quantities = {}
+            items = order.line_items or [
+                {'id': dish_id, 'price': prices[dish_id]} for dish_id in order.dishes or [] if dish_id in prices
+            ]
+            for item in items:
+                key = (item['id'], item['price'])
+                quantities[key] = quantities.get(key, 0) + 1
+            lines.extend(
+                OrderLine(order_id=order.pk, dish_id=dish_id, quantity=quantity,
+                          unit_price=Decimal(price), ordered_at=order.created_at)
+                for (dish_id, price), quantity in quantities.items()
+            )
+        OrderLine.objects.using(db).bulk_create(lines, batch_size=BATCH_SIZE)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_line_items_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dish_id', models.PositiveIntegerField(verbose_name='ID блюда')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Количество')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена за единицу')),
+                ('ordered_at', models.DateTimeField(verbose_name='Дата заказа')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='orders.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Строка заказа',
+                'verbose_name_plural': 'Строки заказов',
+                'indexes': [models.Index(fields=['dish_id', 'ordered_at'], name='orderline_dish_time_idx'), models.Index(fields=['ordered_at', 'dish_id'], name='orderline_time_dish_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:49
+
+from django.core.management.base import CommandError
+from django.db import migrations, models
+
+
+def check_active_table_duplicates(apps, schema_editor):
+    """Останавливает миграцию, если у стола больше одного активного заказа."""
+    Order = apps.get_model('orders', 'Order')
+    active = Order.objects.using(schema_editor.connection.alias).filter(status__in=('waiting', 'ready'))
+    tables = list(
+        active.values('table_number').annotate(count=models.Count('pk')).filter(count__gt=1)
+        .values_list('table_number', flat=True).order_by('table_number')
+    )
+    if not tables:
+        return
+    duplicates = {}
+    for table_number, pk in active.filter(table_number__in=tables).values_list('table_number', 'pk').order_by('pk'):
+        duplicates.setdefault(table_number, []).append(str(pk))
+    raise CommandError(
+        'Несколько активных заказов на одном столе; переведите лишние в статус paid и повторите migrate: '
+        + '; '.join(f'стол {table}: заказы {", ".join(pks)}' for table, pks in duplicates.items())
+    )
+
+
+# Уникальный частичный индекс заменяет обычный order_active_table_idx
+# из 0007, созданный только на PostgreSQL.
+def drop_active_table_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS order_active_table_idx')
+
+
+def create_active_table_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS order_active_table_idx ON orders_order (table_number) "
+            "WHERE status IN ('waiting', 'ready')"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_orderline'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_active_table_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('waiting', 'ready'))), fields=('table_number',), name='order_active_table_uniq', violation_error_message='Этот номер стола уже используется в активном заказе.'),
+        ),
+        migrations.RunPython(drop_active_table_index, create_active_table_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.19 on 2026-10-18 08:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_orders_version(apps, schema_editor):
+    TableVersion = apps.get_model('orders', 'TableVersion')
+    TableVersion.objects.using(schema_editor.connection.alias).get_or_create(name='orders')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_active_table_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Таблица')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия таблицы',
+                'verbose_name_plural': 'Версии таблиц',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(create_orders_version, migrations.RunPython.noop),
+    ]
@@ -1,40 +1,111 @@
 """Модели для управления заказами в кафе."""
-from django.db import models
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
 from django.utils import timezone
-from django.conf import settings
-import json
-from typing import List, Optional
 
+from .events import CREATED, publish_on_commit
+from .menu import Dish, MenuSnapshot, format_dish_names, from_cents, menu_catalog
+from .revenue_cache import revenue_cache
 
-class Dish:
-    """Класс для представления блюда, загружаемого из JSON."""
-    def __init__(self, id: int, name: str, price: float, description: Optional[str] = None):
-        self.id = id
-        self.name = name
-        self.price = price
-        self.description = description or ""
+ACTIVE_STATUSES = ('waiting', 'ready')
+ACTIVE_TABLE_CONSTRAINT = 'order_active_table_uniq'
+ACTIVE_TABLE_MESSAGE = 'Этот номер стола уже используется в активном заказе.'
 
-    def __str__(self) -> str:
-        return f"{self.name} - {self.price}"
+# Поля заказа, от которых зависят отчеты о выручке.
+REVENUE_FIELDS = frozenset(('status', 'paid_at', 'total_price'))
 
-    @staticmethod
-    def load_dishes() -> List['Dish']:
-        """Загружает список блюд из JSON-файла."""
-        json_path = f"{settings.BASE_DIR}/static/orders/dishes.json"
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                dishes_data = json.load(f)
-                if not isinstance(dishes_data, list):
-                    return []
-                return [Dish(**dish) for dish in dishes_data if isinstance(dish, dict)]
-        except (FileNotFoundError, json.JSONDecodeError, ValueError):
-            return []
+# Вклад оплаченного заказа в сводку выручки: (начало часа в UTC, сумма).
+RevenueContribution = Optional[Tuple[datetime, Decimal]]
 
-    @staticmethod
-    def get_by_id(dish_id: int) -> Optional['Dish']:
-        """Получает блюдо по ID."""
-        dishes = Dish.load_dishes()
-        return next((dish for dish in dishes if dish.id == dish_id), None)
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Начало часа в UTC, к которому относится момент времени."""
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def is_active_table_violation(error: IntegrityError) -> bool:
+    """Нарушено ли ограничение «один активный заказ на стол».
+
+    PostgreSQL (psycopg 2 и 3) сообщает имя ограничения в diag, и решение
+    принимается только по нему. SQLite имени частичного индекса не
+    сообщает, а перечисляет столбцы; текст его ошибок не локализуется,
+    и другого уникального ограничения на table_number нет.
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None:
+        return getattr(diag, 'constraint_name', None) == ACTIVE_TABLE_CONSTRAINT
+    message = str(error)
+    return ACTIVE_TABLE_CONSTRAINT in message or 'UNIQUE constraint failed: orders_order.table_number' in message
+
+
+class OrderQuerySet(models.QuerySet):
+    """QuerySet заказов, учитывающий массовую вставку в сводке выручки, строках заказов и событиях."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            contributions = [order.revenue_contribution() for order in objs]
+            RevenueRollup.apply([(None, contribution) for contribution in contributions], using=self.db)
+            revenue_cache.invalidate([contribution[0] for contribution in contributions if contribution], using=self.db)
+            OrderLine.objects.using(self.db).bulk_create(
+                OrderLine.for_orders([order for order in objs if order.pk is not None])
+            )
+            publish_on_commit(CREATED, [order for order in objs if order.pk is not None], using=self.db)
+            if objs:
+                TableVersion.bump(using=self.db)
+        return objs
+
+    def update(self, **kwargs):
+        """Массовое изменение с отметкой updated_at и версии таблицы заказов.
+
+        При изменении оплаты или суммы в той же транзакции читаются прежние
+        вклады затронутых заказов в выручку, а после записи — новые, и
+        разница переносится в RevenueRollup. Уже после исправления сводки
+        сбрасывается кэш отчетов для прежних и новых часов оплаты: paid_at
+        мог сдвинуться и внутри часа.
+        """
+        kwargs.setdefault('updated_at', timezone.now())
+        revenue = bool(REVENUE_FIELDS.intersection(kwargs))
+        with transaction.atomic(using=self.db, savepoint=False):
+            if revenue:
+                previous = self._revenue_contributions(self)
+            rows = super().update(**kwargs)
+            if rows:
+                TableVersion.bump(using=self.db)
+                if revenue:
+                    changes = self._revenue_changes(previous)
+                    RevenueRollup.apply(changes, using=self.db)
+                    revenue_cache.invalidate(
+                        [contribution[0] for pair in changes for contribution in pair if contribution], using=self.db
+                    )
+        return rows
+
+    def _revenue_contributions(self, queryset) -> Dict[int, RevenueContribution]:
+        """Вклады заказов queryset в выручку по ID."""
+        if connections[self.db].features.has_select_for_update:
+            queryset = queryset.select_for_update()
+        return {
+            row.pop('pk'): Order(**row).revenue_contribution()
+            for row in queryset.values('pk', 'status', 'paid_at', 'total_price').iterator()
+        }
+
+    def _revenue_changes(self, previous: Dict[int, RevenueContribution], batch_size: int = 500):
+        """Пары (прежний вклад, новый вклад) заказов, прочитанных до update()."""
+        pks = list(previous)
+        changes = []
+        for start in range(0, len(pks), batch_size):
+            batch = self.model._base_manager.using(self.db).filter(pk__in=pks[start:start + batch_size])
+            current = self._revenue_contributions(batch)
+            changes.extend((previous[pk], contribution) for pk, contribution in current.items())
+        return changes
 
 
 class Order(models.Model):
@@ -49,34 +120,142 @@ class Order(models.Model):
     dishes = models.JSONField(default=list, verbose_name='Блюда')
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name='Общая стоимость')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting', verbose_name='Статус')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Дата создания')
     paid_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата оплаты')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    line_items = models.JSONField(default=list, blank=True, editable=False, verbose_name='Позиции на момент заказа')
+    dish_names = models.TextField(blank=True, default='', editable=False, verbose_name='Состав заказа')
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-created_at']
+        indexes = [
+            # Список заказов и курсорная пагинация: ORDER BY created_at DESC, id.
+            models.Index(fields=['-created_at', 'id'], name='order_created_id_idx'),
+            # Список с фильтром по статусу (экраны кухни и зала).
+            models.Index(fields=['status', '-created_at', 'id'], name='order_status_created_idx'),
+            # Отчеты о выручке: status = 'paid' AND paid_at BETWEEN ...
+            models.Index(fields=['status', 'paid_at'], name='order_status_paid_at_idx'),
+            # Проверка активного стола: table_number = ... AND status IN ('waiting', 'ready').
+            models.Index(fields=['table_number', 'status'], name='order_table_status_idx'),
+        ]
+        constraints = [
+            # Один активный заказ на стол; проверяется базой при записи,
+            # а не отдельным запросом перед ней.
+            models.UniqueConstraint(
+                fields=['table_number'],
+                condition=Q(status__in=ACTIVE_STATUSES),
+                name=ACTIVE_TABLE_CONSTRAINT,
+                violation_error_message=ACTIVE_TABLE_MESSAGE,
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'Заказ #{self.id} - Стол {self.table_number}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'status', 'paid_at', 'total_price'}.issubset(field_names):
+            instance._loaded_revenue = instance.revenue_contribution()
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        if 'dishes' in field_names:
+            instance._loaded_dishes = list(instance.dishes) if isinstance(instance.dishes, list) else instance.dishes
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет заказ одной записью вместе со всеми производными данными.
+
+        До записи в базу рассчитываются стоимость и снимок позиций (при
+        изменении состава заказа; у заказа без снимка заполняется только
+        снимок) и дата оплаты (для оплаченного заказа без нее). Строки
+        OrderLine и сводка выручки обновляются в той же транзакции.
+        Нарушение уникальности активного стола превращается в
+        ValidationError с привычным сообщением.
+        """
+        update_fields = kwargs.get('update_fields')
+        changed = set()
+        lines_changed = False
+        if update_fields is None or 'dishes' in update_fields:
+            if self._dishes_changed():
+                menu = menu_catalog.snapshot()
+                self.refresh_line_items(menu)
+                self.total_price = menu.price_total(self.dishes)
+                changed |= {'line_items', 'dish_names', 'total_price'}
+                lines_changed = True
+            elif self._snapshot_missing():
+                # Заказ сохранен до появления снимка: позиции заполняются
+                # по текущему меню, а сохраненная стоимость не меняется.
+                self.refresh_line_items()
+                changed |= {'line_items', 'dish_names'}
+                lines_changed = True
+        if self.status == 'paid' and not self.paid_at:
+            self.paid_at = timezone.now()
+            changed.add('paid_at')
+        changed.add('updated_at')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *changed}
+
+        adding = self._state.adding
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+                if lines_changed:
+                    OrderLine.sync([self], using=using, replace=not adding)
+        except IntegrityError as e:
+            if is_active_table_violation(e):
+                raise ValidationError({'table_number': ACTIVE_TABLE_MESSAGE}, code='unique') from e
+            raise
+        self._loaded_dishes = list(self.dishes) if isinstance(self.dishes, list) else self.dishes
+
+    def _dishes_changed(self) -> bool:
+        if 'dishes' in self.get_deferred_fields():
+            return False
+        if self._state.adding:
+            return True
+        return self.dishes != getattr(self, '_loaded_dishes', None)
+
+    def _snapshot_missing(self) -> bool:
+        deferred = self.get_deferred_fields()
+        return 'dishes' not in deferred and 'dish_names' not in deferred and not self.dish_names
+
+    def refresh_line_items(self, menu: Optional[MenuSnapshot] = None) -> None:
+        """Фиксирует названия и цены блюд заказа по текущему меню."""
+        menu = menu or menu_catalog.snapshot()
+        self.line_items = menu.line_items(self.dishes)
+        self.dish_names = format_dish_names(self.line_items)
+
+    def revenue_contribution(self) -> RevenueContribution:
+        """Вклад заказа в сводку выручки или None, если заказ не оплачен."""
+        if self.status != 'paid' or not self.paid_at:
+            return None
+        return hour_bucket(self.paid_at), Decimal(str(self.total_price or 0))
+
     def calculate_total_price(self) -> None:
         """Рассчитывает общую стоимость заказа."""
-        total = 0.00
-        dishes = Dish.load_dishes()
         if not isinstance(self.dishes, list):
             self.dishes = []
-        for dish_id in self.dishes:
-            try:
-                dish_id = int(dish_id)
-                dish = Dish.get_by_id(dish_id)
-                if dish:
-                    total += dish.price
-            except (ValueError, TypeError):
-                continue
-        self.total_price = total
+        self.total_price = menu_catalog.snapshot().price_total(self.dishes)
         self.save()
 
+    @staticmethod
+    def prepare_for_bulk_create(orders: List['Order'], menu: Optional[MenuSnapshot] = None) -> List['Order']:
+        """Рассчитывает стоимость, снимок позиций и дату оплаты заказов перед bulk_create."""
+        menu = menu or menu_catalog.snapshot()
+        now = timezone.now()
+        totals = menu.batch_totals_cents([order.dishes for order in orders])
+        for order, total in zip(orders, totals):
+            order.total_price = from_cents(total)
+            order.refresh_line_items(menu)
+            if order.status == 'paid' and not order.paid_at:
+                order.paid_at = now
+        return orders
+
     def mark_as_paid(self) -> None:
         """Отмечает заказ как оплаченный."""
         if self.status == 'paid' and not self.paid_at:
@@ -84,19 +263,202 @@ class Order(models.Model):
             self.save()
 
     def get_dish_names(self) -> str:
-        """Возвращает строку с названиями и ценами блюд."""
-        all_dishes = {dish.id: dish for dish in Dish.load_dishes()}
-        dish_names = []
-        for dish_id in self.dishes:
-            if isinstance(dish_id, int):
-                dish = all_dishes.get(dish_id)
-                if dish:
-                    dish_names.append(f"{dish.name} - {dish.price:.2f}")
-        return ', '.join(dish_names) if dish_names else 'Нет блюд'
+        """Возвращает строку с названиями и ценами блюд из снимка заказа.
+
+        Для заказов без снимка (еще не обработанных backfill_order_snapshots)
+        строка строится по текущему меню.
+        """
+        if self.dish_names:
+            return self.dish_names
+        return menu_catalog.snapshot().dish_names(self.dishes)
 
     def is_table_number_unique(self):
         """Проверяет уникальность номера стола для активных заказов."""
         return not Order.objects.filter(
             table_number=self.table_number,
-            status__in=['waiting', 'ready']
+            status__in=ACTIVE_STATUSES
         ).exclude(pk=self.pk).exists()
+
+
+def group_line_items(line_items: Iterable[dict]) -> List[Tuple[int, int, Decimal]]:
+    """Сворачивает позиции заказа в строки (ID блюда, количество, цена за единицу)."""
+    quantities: Dict[Tuple[int, str], int] = {}
+    for item in line_items:
+        key = (item['id'], item['price'])
+        quantities[key] = quantities.get(key, 0) + 1
+    return [(dish_id, quantity, Decimal(price)) for (dish_id, price), quantity in quantities.items()]
+
+
+class OrderLine(models.Model):
+    """Строка заказа: блюдо, количество и цена за единицу на момент заказа.
+
+    Дублирует Order.dishes в нормализованном виде, чтобы продажи по блюдам
+    считались группировкой в SQL. Строки пересобираются при каждом
+    изменении состава заказа и удаляются вместе с заказом.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='lines', verbose_name='Заказ')
+    dish_id = models.PositiveIntegerField(verbose_name='ID блюда')
+    quantity = models.PositiveIntegerField(default=1, verbose_name='Количество')
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Цена за единицу')
+    ordered_at = models.DateTimeField(verbose_name='Дата заказа')
+
+    class Meta:
+        verbose_name = 'Строка заказа'
+        verbose_name_plural = 'Строки заказов'
+        indexes = [
+            # Заказы с блюдом и история продаж одного блюда.
+            models.Index(fields=['dish_id', 'ordered_at'], name='orderline_dish_time_idx'),
+            # Продажи всех блюд за период: ordered_at BETWEEN ... GROUP BY dish_id.
+            models.Index(fields=['ordered_at', 'dish_id'], name='orderline_time_dish_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Заказ #{self.order_id}: блюдо {self.dish_id} x {self.quantity}'
+
+    @classmethod
+    def for_orders(cls, orders: Iterable[Order]) -> List['OrderLine']:
+        """Строит несохраненные строки по снимкам позиций заказов."""
+        return [
+            cls(order=order, dish_id=dish_id, quantity=quantity, unit_price=unit_price, ordered_at=order.created_at)
+            for order in orders
+            for dish_id, quantity, unit_price in group_line_items(order.line_items)
+        ]
+
+    @classmethod
+    def sync(cls, orders: List[Order], using: Optional[str] = None, replace: bool = True) -> None:
+        """Заменяет строки заказов на построенные по их текущим снимкам позиций.
+
+        Для только что созданных заказов (replace=False) старых строк нет,
+        и удаление пропускается.
+        """
+        manager = cls.objects.using(using)
+        if replace:
+            manager.filter(order_id__in=[order.pk for order in orders]).delete()
+        manager.bulk_create(cls.for_orders(orders))
+
+
+class TableVersion(models.Model):
+    """Счетчик изменений таблицы для условных GET-запросов (ETag, Last-Modified).
+
+    Увеличивается после фиксации любого изменения заказов, поэтому
+    проверить, изменилось ли что-нибудь, можно одним запросом к строке
+    счетчика, не выполняя основной запрос. Между COMMIT и увеличением
+    счетчика проходят доли миллисекунды; в это окно читатель может
+    получить 304 на уже устаревшую копию.
+    """
+    ORDERS = 'orders'
+
+    name = models.CharField(max_length=50, unique=True, verbose_name='Таблица')
+    version = models.BigIntegerField(default=0, verbose_name='Версия')
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name='Дата изменения')
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.version}'
+
+    @classmethod
+    def bump(cls, name: str = ORDERS, using: Optional[str] = None) -> None:
+        """Отмечает изменение таблицы после фиксации текущей транзакции.
+
+        Строка счетчика обновляется отдельным запросом уже после COMMIT
+        пишущей транзакции, поэтому параллельные записи заказов не ждут
+        друг друга на блокировке этой строки.
+        """
+        using = using or router.db_for_write(cls)
+        transaction.on_commit(partial(cls._increment, name, using), using=using)
+
+    @classmethod
+    def _increment(cls, name: str, using: str) -> None:
+        manager = cls.objects.using(using)
+        now = timezone.now()
+        if manager.filter(name=name).update(version=F('version') + 1, changed_at=now):
+            return
+        try:
+            with transaction.atomic(using=using):
+                manager.create(name=name, version=1, changed_at=now)
+        except IntegrityError:
+            manager.filter(name=name).update(version=F('version') + 1, changed_at=now)
+
+    @classmethod
+    def current(cls, name: str = ORDERS, using: Optional[str] = None) -> Tuple[int, Optional[datetime]]:
+        """Текущие версия и время последнего изменения таблицы."""
+        row = cls.objects.using(using).filter(name=name).values_list('version', 'changed_at').first()
+        return row or (0, None)
+
+
+class RevenueRollup(models.Model):
+    """Выручка и число оплаченных заказов за час (по paid_at, в UTC).
+
+    Поддерживается инкрементально при сохранении и удалении заказов
+    (см. orders/signals.py) и пересобирается командой rebuild_revenue_rollup.
+    """
+    bucket_start = models.DateTimeField(unique=True, verbose_name='Начало часа')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Выручка')
+    order_count = models.IntegerField(default=0, verbose_name='Число заказов')
+
+    class Meta:
+        verbose_name = 'Сводка выручки за час'
+        verbose_name_plural = 'Сводка выручки по часам'
+        ordering = ['bucket_start']
+
+    def __str__(self) -> str:
+        return f'{self.bucket_start:%Y-%m-%d %H:00}: {self.revenue} ({self.order_count})'
+
+    @classmethod
+    def apply(cls, changes: Iterable[Tuple[RevenueContribution, RevenueContribution]], using: Optional[str] = None) -> None:
+        """Применяет пары (старый вклад, новый вклад) заказов к часовым строкам."""
+        deltas: Dict[datetime, List] = defaultdict(lambda: [Decimal('0'), 0])
+        for old, new in changes:
+            if old == new:
+                continue
+            if old:
+                deltas[old[0]][0] -= old[1]
+                deltas[old[0]][1] -= 1
+            if new:
+                deltas[new[0]][0] += new[1]
+                deltas[new[0]][1] += 1
+        manager = cls.objects.db_manager(using)
+        for bucket_start, (amount, count) in deltas.items():
+            if not amount and not count:
+                continue
+            updated = manager.filter(bucket_start=bucket_start).update(
+                revenue=F('revenue') + amount,
+                order_count=F('order_count') + count,
+            )
+            if updated:
+                continue
+            try:
+                with transaction.atomic(using=manager.db):
+                    manager.create(bucket_start=bucket_start, revenue=amount, order_count=count)
+            except IntegrityError:
+                manager.filter(bucket_start=bucket_start).update(
+                    revenue=F('revenue') + amount,
+                    order_count=F('order_count') + count,
+                )
+
+    @classmethod
+    def rebuild(cls, using: Optional[str] = None, batch_size: int = 1000) -> int:
+        """Пересчитывает сводку целиком по оплаченным заказам; возвращает число часов."""
+        manager = cls.objects.db_manager(using)
+        rows = (
+            Order.objects.db_manager(using)
+            .filter(status='paid', paid_at__isnull=False)
+            .annotate(bucket=TruncHour('paid_at', tzinfo=dt_timezone.utc))
+            .values('bucket')
+            .annotate(revenue=Sum('total_price'), order_count=Count('id'))
+            .order_by('bucket')
+        )
+        with transaction.atomic(using=manager.db):
+            manager.all().delete()
+            batch, created = [], 0
+            for row in rows.iterator():
+                batch.append(cls(bucket_start=row['bucket'], revenue=row['revenue'], order_count=row['order_count']))
+                if len(batch) >= batch_size:
+                    created += len(manager.bulk_create(batch))
+                    batch = []
+            created += len(manager.bulk_create(batch))
+        revenue_cache.invalidate_all(using=manager.db)
+        return created
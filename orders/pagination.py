@@ -0,0 +1,167 @@
+"""Курсорная (keyset) пагинация заказов по (-created_at, id)."""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+ORDERING = ('-created_at', 'id')
+REVERSE_ORDERING = ('created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+@dataclass
+class KeysetPage:
+    """Страница результатов с курсорами соседних страниц."""
+    items: List
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+
+
+def get_page_size(requested=None) -> int:
+    """Размер страницы: запрошенный, но не больше ORDERS_MAX_PAGE_SIZE."""
+    default = getattr(settings, 'ORDERS_PAGE_SIZE', 50)
+    maximum = getattr(settings, 'ORDERS_MAX_PAGE_SIZE', 500)
+    try:
+        size = int(requested) if requested not in (None, '') else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(created_at: datetime, pk: int, backward: bool = False) -> str:
+    """Кодирует позицию (created_at, id) и направление в строку для URL."""
+    raw = f"{'p' if backward else 'n'}|{created_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, bool]:
+    """Разбирает курсор, созданный encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(pk), direction == 'p'
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def keyset_filter(created_at: datetime, pk: int, backward: bool = False) -> Q:
+    """Условие «строки после позиции (created_at, id)» в порядке ORDERING.
+
+    Первое слагаемое по created_at отдельно от OR нужно, чтобы база могла
+    начать чтение индекса сразу с позиции, а не просматривать его с начала.
+    """
+    if backward:
+        return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk))
+    return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+
+def paginate_keyset(queryset: QuerySet, cursor: Optional[str], page_size: int) -> KeysetPage:
+    """Возвращает страницу заказов после (или перед) позицией курсора.
+
+    Стоимость запроса не зависит от глубины страницы: позиция задается
+    условием по (created_at, id), а не OFFSET, и COUNT(*) не выполняется.
+    """
+    query, backward = keyset_query(queryset, cursor, page_size)
+    return keyset_page(list(query), page_size, cursor, backward)
+
+
+async def apaginate_keyset(queryset: QuerySet, cursor: Optional[str], page_size: int) -> KeysetPage:
+    """Асинхронный вариант paginate_keyset для async-представлений."""
+    query, backward = keyset_query(queryset, cursor, page_size)
+    return keyset_page([row async for row in query], page_size, cursor, backward)
+
+
+def keyset_query(queryset: QuerySet, cursor: Optional[str], page_size: int) -> Tuple[QuerySet, bool]:
+    """Запрос страницы (на одну строку больше page_size) и направление курсора."""
+    if not cursor:
+        return queryset.order_by(*ORDERING)[:page_size + 1], False
+    created_at, pk, backward = decode_cursor(cursor)
+    queryset = queryset.filter(keyset_filter(created_at, pk, backward))
+    queryset = queryset.order_by(*(REVERSE_ORDERING if backward else ORDERING))
+    return queryset[:page_size + 1], backward
+
+
+def keyset_page(rows: List, page_size: int, cursor: Optional[str], backward: bool) -> KeysetPage:
+    """Собирает страницу и курсоры соседних страниц из строк keyset_query."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if not cursor:
+        return KeysetPage(rows, next_cursor=_cursor(rows[-1]) if has_more else None)
+    if backward:
+        rows.reverse()
+        return KeysetPage(
+            rows,
+            next_cursor=_cursor(rows[-1]) if rows else None,
+            previous_cursor=_cursor(rows[0], backward=True) if has_more else None,
+        )
+    return KeysetPage(
+        rows,
+        next_cursor=_cursor(rows[-1]) if has_more else None,
+        previous_cursor=_cursor(rows[0], backward=True) if rows else None,
+    )
+
+
+def _cursor(order, backward: bool = False) -> str:
+    return encode_cursor(order.created_at, order.pk, backward)
+
+
+def link_header(url: str, page: KeysetPage, has_cursor: bool, cursor_param: str = 'cursor') -> str:
+    """Заголовок Link со ссылками на соседние страницы (rel="next"/"prev"/"first")."""
+    links = []
+    if page.next_cursor:
+        links.append(f'<{replace_query_param(url, cursor_param, page.next_cursor)}>; rel="next"')
+    if page.previous_cursor:
+        links.append(f'<{replace_query_param(url, cursor_param, page.previous_cursor)}>; rel="prev"')
+    elif has_cursor:
+        links.append(f'<{remove_query_param(url, cursor_param)}>; rel="first"')
+    return ', '.join(links)
+
+
+class OrderKeysetPagination(BasePagination):
+    """Курсорная пагинация для API.
+
+    Тело ответа остается списком заказов, а ссылки на соседние страницы
+    передаются в заголовке Link (rel="next"/"prev").
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = paginate_keyset(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                get_page_size(request.query_params.get(self.page_size_query_param)),
+            )
+        except InvalidCursor:
+            raise NotFound('Некорректный курсор.')
+        return self.page.items
+
+    def get_link_header(self) -> str:
+        return link_header(
+            self.request.build_absolute_uri(),
+            self.page,
+            bool(self.request.query_params.get(self.cursor_query_param)),
+            self.cursor_query_param,
+        )
+
+    def get_paginated_response(self, data):
+        headers = {}
+        link = self.get_link_header()
+        if link:
+            headers['Link'] = link
+        return Response(data, headers=headers)
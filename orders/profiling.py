@@ -0,0 +1,143 @@
+"""Выборочное профилирование живых запросов через cProfile.
+
+Запрос профилируется, если сотрудник (is_staff) прислал заголовок
+ORDERS_PROFILE_HEADER или если имени URL приложения выпала доля из
+ORDERS_PROFILE_RATES. Профиль сохраняется в ORDERS_PROFILE_DIR в формате
+pstats (.prof), который читают snakeviz, tuna, flameprof и gprof2dot;
+в каталоге остаются ORDERS_PROFILE_MAX_FILES последних файлов.
+"""
+import cProfile
+import os
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import List, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+PROFILE_SUFFIX = '.prof'
+STAMP_FORMAT = '%Y%m%dT%H%M%S%f'
+
+# Одновременно профилируется один запрос процесса: cProfile в 3.12+
+# не допускает двух активных профилировщиков, а в асинхронном сервере
+# профиль в цикле событий и так захватывает все его корутины. Профиль
+# снимается только с потока, в котором включен.
+_busy = threading.Lock()
+
+
+def profile_dir() -> str:
+    return str(getattr(settings, 'ORDERS_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def profile_rates() -> dict:
+    return getattr(settings, 'ORDERS_PROFILE_RATES', {})
+
+
+def header_name() -> str:
+    """Заголовок запроса в виде ключа request.META."""
+    header = getattr(settings, 'ORDERS_PROFILE_HEADER', 'X-Orders-Profile')
+    return 'HTTP_' + header.upper().replace('-', '_')
+
+
+def url_name(request) -> Optional[str]:
+    """Имя URL приложения orders для пути запроса."""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    return match.url_name if 'orders' in match.app_names else None
+
+
+def is_async_view(request) -> bool:
+    """Выполняется ли представление пути запроса в цикле событий."""
+    try:
+        return iscoroutinefunction(resolve(request.path_info).func)
+    except Resolver404:
+        return False
+
+
+def sampled_url_name(request) -> Optional[str]:
+    """Имя URL, если запрос попал в выборку по ORDERS_PROFILE_RATES."""
+    rates = profile_rates()
+    if not rates:
+        return None
+    name = url_name(request)
+    return name if name and random.random() < rates.get(name, 0) else None
+
+
+@dataclass(frozen=True)
+class ProfileInfo:
+    """Сохраненный профиль; метаданные берутся из имени файла."""
+    path: str
+    created_at: datetime
+    method: str
+    duration_ms: float
+    view: str
+
+    @classmethod
+    def from_path(cls, path: str) -> Optional['ProfileInfo']:
+        name = os.path.basename(path)
+        if not name.endswith(PROFILE_SUFFIX):
+            return None
+        try:
+            stamp, method, duration, view = name[:-len(PROFILE_SUFFIX)].split('-', 3)
+            created_at = datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=dt_timezone.utc)
+            duration_ms = float(duration.removesuffix('ms'))
+        except ValueError:
+            return None
+        return cls(path, created_at, method, duration_ms, view)
+
+
+def list_profiles(directory: Optional[str] = None) -> List[ProfileInfo]:
+    """Профили каталога от старых к новым."""
+    directory = directory or profile_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    profiles = (ProfileInfo.from_path(os.path.join(directory, name)) for name in names)
+    return sorted((info for info in profiles if info), key=lambda info: info.created_at)
+
+
+class RequestProfile:
+    """Профиль одного запроса; start() возвращает False, если профилировщик занят."""
+
+    def __init__(self, view: str, method: str):
+        self.view, self.method = view, method
+        self.profiler = cProfile.Profile()
+
+    def start(self) -> bool:
+        if not _busy.acquire(blocking=False):
+            return False
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Профилировщик уже включен кем-то другим в этом потоке.
+            _busy.release()
+            return False
+        return True
+
+    def stop(self, duration: float) -> str:
+        """Сохраняет профиль и возвращает имя файла."""
+        self.profiler.disable()
+        _busy.release()
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(dt_timezone.utc).strftime(STAMP_FORMAT)
+        name = f'{stamp}-{self.method}-{duration * 1000:.1f}ms-{self.view}{PROFILE_SUFFIX}'
+        self.profiler.dump_stats(os.path.join(directory, name))
+        rotate(directory)
+        return name
+
+
+def rotate(directory: str) -> None:
+    """Удаляет самые старые профили сверх ORDERS_PROFILE_MAX_FILES."""
+    limit = getattr(settings, 'ORDERS_PROFILE_MAX_FILES', 100)
+    for info in list_profiles(directory)[:-limit or None]:
+        try:
+            os.remove(info.path)
+        except FileNotFoundError:
+            pass
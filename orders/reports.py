@@ -0,0 +1,252 @@
+"""Отчеты о выручке, считаемые агрегатами на стороне базы данных."""
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+from django.db.models import Count, DateTimeField, DecimalField, F, Q, QuerySet, Sum, Value
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+
+from .menu import CENT, menu_catalog
+from .models import Order, OrderLine, RevenueRollup, hour_bucket
+from .revenue_cache import revenue_cache
+from .routers import primary_reads
+
+BUCKETS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+}
+
+DISH_SALES_ORDERING = {
+    'revenue': '-total_revenue',
+    'quantity': '-total_quantity',
+    'orders': '-order_count',
+}
+
+
+class InvalidRangeOrder(ValueError):
+    """Начало периода позже его окончания."""
+
+
+@dataclass
+class RevenueSummary:
+    """Итоги выручки за период и, при необходимости, разбивка по интервалам."""
+    total_revenue: Decimal
+    order_count: int
+    average_ticket: Decimal
+    buckets: List[dict] = field(default_factory=list)
+
+
+def default_revenue_range() -> Tuple[datetime, datetime]:
+    """Период по умолчанию: сегодня с 09:00 до 17:00."""
+    return (
+        timezone.make_aware(datetime.combine(date.today(), time(9, 0))),
+        timezone.make_aware(datetime.combine(date.today(), time(17, 0))),
+    )
+
+
+def parse_revenue_range(params) -> Tuple[datetime, datetime]:
+    """Разбирает start_date/start_time/end_date/end_time из параметров запроса.
+
+    Без дат возвращает период по умолчанию. Бросает ValueError при неверном
+    формате и InvalidRangeOrder, если начало позже окончания.
+    """
+    start_date_str = params.get('start_date', '')
+    start_time_str = params.get('start_time', '09:00')
+    end_date_str = params.get('end_date', '')
+    end_time_str = params.get('end_time', '17:00')
+
+    if not (start_date_str and end_date_str):
+        return default_revenue_range()
+
+    start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+    end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+    start_time = datetime.strptime(start_time_str, '%H:%M').time()
+    end_time = datetime.strptime(end_time_str, '%H:%M').time()
+
+    start_datetime = datetime.combine(start_date, start_time)
+    end_datetime = datetime.combine(end_date, end_time)
+    if start_datetime > end_datetime:
+        raise InvalidRangeOrder('Дата начала должна быть раньше даты окончания.')
+    return timezone.make_aware(start_datetime), timezone.make_aware(end_datetime)
+
+
+def parse_bucket(value: Optional[str]) -> Optional[str]:
+    """Проверяет интервал группировки: hour, day, week или пусто."""
+    if not value:
+        return None
+    if value not in BUCKETS:
+        raise ValueError(f'Неизвестный интервал группировки: {value}. Допустимо: {", ".join(BUCKETS)}.')
+    return value
+
+
+def paid_orders(start: datetime, end: datetime) -> QuerySet:
+    """Оплаченные заказы за период."""
+    return Order.objects.filter(status='paid', paid_at__range=(start, end))
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _average(total: Decimal, count: int) -> Decimal:
+    return (total / count).quantize(CENT) if count else Decimal('0.00')
+
+
+def split_by_whole_hours(start: datetime, end: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """Границы [first_hour, last_hour) целых часов внутри [start, end] или None."""
+    first_hour = hour_bucket(start)
+    if first_hour < start:
+        first_hour += timedelta(hours=1)
+    last_hour = hour_bucket(end)
+    return (first_hour, last_hour) if first_hour < last_hour else None
+
+
+def _grouped(queryset: QuerySet, time_field: str, bucket: Optional[str], total, count) -> QuerySet:
+    key = BUCKETS[bucket](time_field) if bucket else Value(None, output_field=DateTimeField())
+    return queryset.order_by().annotate(bucket=key).values('bucket').annotate(total=total, count=count)
+
+
+def revenue_summary(start: datetime, end: datetime, bucket: Optional[str] = None) -> RevenueSummary:
+    """Выручка, число заказов и средний чек за период одним запросом.
+
+    Целые часы берутся из часовой сводки RevenueRollup, а неполные часы
+    на границах периода — из самих заказов; обе части объединяются через
+    UNION ALL. С bucket строки группируются по часу/дню/неделе, а итоги
+    складываются из строк группировки.
+    """
+    return summarize_revenue(list(revenue_rows(start, end, bucket)), start, bucket)
+
+
+async def arevenue_summary(start: datetime, end: datetime, bucket: Optional[str] = None) -> RevenueSummary:
+    """Асинхронный вариант revenue_summary для async-представлений."""
+    rows = [row async for row in revenue_rows(start, end, bucket)]
+    return summarize_revenue(rows, start, bucket)
+
+
+def cached_revenue_summary(start: datetime, end: datetime, bucket: Optional[str] = None) -> RevenueSummary:
+    """revenue_summary через кэш отчетов (см. orders/revenue_cache.py).
+
+    При промахе отчет считается по основной базе даже внутри
+    read_from_replica: отстающая реплика иначе положила бы в кэш старые
+    итоги под новым поколением на весь таймаут записи.
+    """
+    def compute():
+        with primary_reads():
+            return revenue_summary(start, end, bucket)
+
+    return revenue_cache.get_or_compute(start, end, bucket, compute)
+
+
+async def acached_revenue_summary(start: datetime, end: datetime, bucket: Optional[str] = None) -> RevenueSummary:
+    """Асинхронный вариант cached_revenue_summary."""
+    async def compute():
+        with primary_reads():
+            return await arevenue_summary(start, end, bucket)
+
+    return await revenue_cache.aget_or_compute(start, end, bucket, compute)
+
+
+def revenue_rows(start: datetime, end: datetime, bucket: Optional[str] = None) -> QuerySet:
+    """Запрос строк (bucket, total, count) для revenue_summary."""
+    whole_hours = split_by_whole_hours(start, end)
+    if whole_hours is None:
+        return _grouped(paid_orders(start, end), 'paid_at', bucket, Sum('total_price'), Count('id'))
+    first_hour, last_hour = whole_hours
+    edges = Order.objects.filter(
+        Q(paid_at__gte=start, paid_at__lt=first_hour) | Q(paid_at__gte=last_hour, paid_at__lte=end),
+        status='paid',
+    )
+    rollup = RevenueRollup.objects.filter(
+        bucket_start__gte=first_hour, bucket_start__lt=last_hour, order_count__gt=0,
+    )
+    return _grouped(rollup, 'bucket_start', bucket, Sum('revenue'), Sum('order_count')).union(
+        _grouped(edges, 'paid_at', bucket, Sum('total_price'), Count('id')),
+        all=True,
+    )
+
+
+def summarize_revenue(rows: List[dict], start: datetime, bucket: Optional[str] = None) -> RevenueSummary:
+    """Сводит строки revenue_rows по интервалам и считает итоги."""
+    merged = {}
+    for row in rows:
+        if not row['count']:
+            continue
+        entry = merged.setdefault(row['bucket'], [Decimal('0.00'), 0])
+        entry[0] += _money(row['total'])
+        entry[1] += row['count']
+
+    buckets = [
+        {
+            'start': bucket_start,
+            'total_revenue': total,
+            'order_count': count,
+            'average_ticket': _average(total, count),
+        }
+        for bucket_start, (total, count) in sorted(merged.items(), key=lambda item: item[0] or start)
+    ]
+    total = sum((b['total_revenue'] for b in buckets), Decimal('0.00'))
+    count = sum(b['order_count'] for b in buckets)
+    return RevenueSummary(total, count, _average(total, count), buckets if bucket else [])
+
+
+def parse_dish_sales_params(params) -> Tuple[Optional[str], str, Optional[int]]:
+    """Разбирает status (по умолчанию paid), ordering и limit для отчета о продажах блюд."""
+    status = params.get('status') or 'paid'
+    if status and status not in dict(Order.STATUS_CHOICES):
+        raise ValueError(f'Неизвестный статус: {status}.')
+    ordering = params.get('ordering') or 'revenue'
+    if ordering not in DISH_SALES_ORDERING:
+        raise ValueError(f'Неизвестная сортировка: {ordering}. Допустимо: {", ".join(DISH_SALES_ORDERING)}.')
+    limit = params.get('limit')
+    if limit in (None, ''):
+        return status, ordering, None
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('limit должен быть положительным числом.')
+    if limit <= 0:
+        raise ValueError('limit должен быть положительным числом.')
+    return status, ordering, limit
+
+
+def dish_sales(start: datetime, end: datetime, status: str = 'paid',
+               ordering: str = 'revenue', limit: Optional[int] = None) -> List[dict]:
+    """Продажи по блюдам за период одним группирующим запросом по OrderLine.
+
+    Для каждого блюда возвращает проданное количество, выручку по ценам на
+    момент заказа и число заказов; название берется из текущего меню.
+    Оплаченные заказы отбираются по paid_at, как в отчете о выручке, и
+    суммы блюд за период сходятся с его итогом. У неоплаченных заказов
+    даты оплаты нет, они отбираются по дате заказа.
+    """
+    if status == 'paid':
+        lines = OrderLine.objects.filter(order__status='paid', order__paid_at__range=(start, end))
+    else:
+        lines = OrderLine.objects.filter(order__status=status, ordered_at__range=(start, end))
+    rows = (
+        lines.values('dish_id')
+        .annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            order_count=Count('order_id', distinct=True),
+        )
+        .order_by(DISH_SALES_ORDERING[ordering], 'dish_id')
+    )
+    if limit:
+        rows = rows[:limit]
+
+    menu = menu_catalog.snapshot()
+    sales = []
+    for row in rows:
+        dish = menu.get(row['dish_id'])
+        sales.append({
+            'dish_id': row['dish_id'],
+            'name': dish.name if dish else None,
+            'quantity': row['total_quantity'],
+            'revenue': _money(row['total_revenue']),
+            'order_count': row['order_count'],
+        })
+    return sales
@@ -0,0 +1,217 @@
+"""Кэш отчетов о выручке с инвалидацией при записи оплаченных заказов.
+
+Результат revenue_summary хранится в кэше Django (ORDERS_REVENUE_CACHE)
+под ключом нормализованного периода (границы в UTC и интервал
+группировки). Удалять записи по диапазону кэш Django не умеет, поэтому
+в ключ входят токены поколений блоков времени, покрывающих период:
+целых месяцев, целых дней и оставшихся часов в UTC. Запись оплаченного
+заказа меняет токены своего часа, дня и месяца, и старые записи
+перестают находиться только у отчетов, чей период включает этот час;
+устаревшие записи вытесняются по таймауту.
+"""
+import hashlib
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_PREFIX = 'orders:revenue'
+# Общее поколение: меняется при пересборке сводки и массовых изменениях.
+ALL_BLOCK = 'all'
+HOUR = timedelta(hours=1)
+
+_MISSING = object()
+
+
+def floor_hour(moment: datetime) -> datetime:
+    """Начало часа в UTC."""
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _next_month(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return moment.replace(year=moment.year + 1, month=1)
+    return moment.replace(month=moment.month + 1)
+
+
+def range_blocks(start: datetime, end: datetime) -> List[str]:
+    """Блоки времени, покрывающие часы периода [start, end].
+
+    Целые месяцы и дни берутся одним блоком, остальное — часами, поэтому
+    даже годовой период дает немного ключей.
+    """
+    hour, stop = floor_hour(start), floor_hour(end) + HOUR
+    blocks = [ALL_BLOCK]
+    while hour < stop:
+        if hour.hour == 0 and hour.day == 1 and _next_month(hour) <= stop:
+            blocks.append(f'm{hour:%Y%m}')
+            hour = _next_month(hour)
+        elif hour.hour == 0 and hour + timedelta(days=1) <= stop:
+            blocks.append(f'd{hour:%Y%m%d}')
+            hour += timedelta(days=1)
+        else:
+            blocks.append(f'h{hour:%Y%m%d%H}')
+            hour += HOUR
+    return blocks
+
+
+def hour_blocks(moment: datetime) -> List[str]:
+    """Блоки, в которые входит час момента: час, его день и месяц."""
+    hour = floor_hour(moment)
+    return [f'h{hour:%Y%m%d%H}', f'd{hour:%Y%m%d}', f'm{hour:%Y%m}']
+
+
+class RevenueCache:
+    """Кэш итогов выручки по периодам со счетчиками попаданий и промахов.
+
+    Счетчики ведутся в памяти процесса. Без ORDERS_REVENUE_CACHE
+    (None) отчеты считаются без кэша.
+    """
+
+    def __init__(self, alias: Optional[str] = None, timeout: Optional[int] = None):
+        self._alias = alias
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.invalidations = 0
+
+    @property
+    def alias(self) -> Optional[str]:
+        return self._alias or getattr(settings, 'ORDERS_REVENUE_CACHE', 'default')
+
+    @property
+    def timeout(self) -> int:
+        return self._timeout or getattr(settings, 'ORDERS_REVENUE_CACHE_TIMEOUT', 300)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def _block_key(block: str) -> str:
+        return f'{KEY_PREFIX}:gen:{block}'
+
+    @staticmethod
+    def _new_tokens(keys: Iterable[str]) -> Dict[str, str]:
+        return {key: uuid.uuid4().hex for key in keys}
+
+    @staticmethod
+    def _entry_key(start: datetime, end: datetime, bucket: Optional[str], block_keys: List[str],
+                   tokens: Dict[str, str]) -> str:
+        normalized = [
+            start.astimezone(dt_timezone.utc).isoformat(),
+            end.astimezone(dt_timezone.utc).isoformat(),
+            bucket or '',
+        ]
+        normalized.extend(tokens[key] for key in block_keys)
+        return f"{KEY_PREFIX}:{hashlib.sha1('|'.join(normalized).encode()).hexdigest()}"
+
+    def key(self, start: datetime, end: datetime, bucket: Optional[str] = None) -> str:
+        """Ключ записи для периода с текущими токенами поколений."""
+        block_keys = [self._block_key(block) for block in range_blocks(start, end)]
+        tokens = self.cache.get_many(block_keys)
+        missing = [key for key in block_keys if key not in tokens]
+        if missing:
+            # Вытесненный или еще не созданный токен заменяется новым,
+            # поэтому старая запись не может снова совпасть по ключу.
+            created = self._new_tokens(missing)
+            self.cache.set_many(created, timeout=None)
+            tokens.update(created)
+        return self._entry_key(start, end, bucket, block_keys, tokens)
+
+    async def akey(self, start: datetime, end: datetime, bucket: Optional[str] = None) -> str:
+        """Асинхронный вариант key()."""
+        block_keys = [self._block_key(block) for block in range_blocks(start, end)]
+        tokens = await self.cache.aget_many(block_keys)
+        missing = [key for key in block_keys if key not in tokens]
+        if missing:
+            created = self._new_tokens(missing)
+            await self.cache.aset_many(created, timeout=None)
+            tokens.update(created)
+        return self._entry_key(start, end, bucket, block_keys, tokens)
+
+    def get_or_compute(self, start: datetime, end: datetime, bucket: Optional[str],
+                       compute: Callable[[], Any]) -> Any:
+        """Значение из кэша или результат compute(), сохраненный в кэш."""
+        if self.alias is None:
+            return compute()
+        key = self.key(start, end, bucket)
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count(hit=True)
+            return value
+        self._count(hit=False)
+        value = compute()
+        self.cache.set(key, value, self.timeout)
+        return value
+
+    async def aget_or_compute(self, start: datetime, end: datetime, bucket: Optional[str],
+                              compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Асинхронный вариант get_or_compute()."""
+        if self.alias is None:
+            return await compute()
+        key = await self.akey(start, end, bucket)
+        value = await self.cache.aget(key, _MISSING)
+        if value is not _MISSING:
+            self._count(hit=True)
+            return value
+        self._count(hit=False)
+        value = await compute()
+        await self.cache.aset(key, value, self.timeout)
+        return value
+
+    def invalidate(self, moments: Iterable[Optional[datetime]], using: Optional[str] = None) -> None:
+        """Сбрасывает отчеты, чьи периоды включают часы указанных моментов оплаты.
+
+        Сброс выполняется сразу и еще раз после фиксации транзакции: отчет,
+        посчитанный другим запросом до фиксации, иначе остался бы в кэше.
+        """
+        blocks = {block for moment in moments if moment is not None for block in hour_blocks(moment)}
+        self._invalidate_blocks(blocks, using)
+
+    def invalidate_all(self, using: Optional[str] = None) -> None:
+        """Сбрасывает все отчеты о выручке."""
+        self._invalidate_blocks({ALL_BLOCK}, using)
+
+    def _invalidate_blocks(self, blocks, using: Optional[str]) -> None:
+        if not blocks or self.alias is None:
+            return
+        keys = [self._block_key(block) for block in sorted(blocks)]
+        with self._lock:
+            self.invalidations += 1
+
+        def bump():
+            self.cache.set_many(self._new_tokens(keys), timeout=None)
+
+        bump()
+        transaction.on_commit(bump, using=using)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        """Счетчики попаданий, промахов и сбросов в текущем процессе."""
+        with self._lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        lookups = hits + misses
+        return {
+            'backend': self.alias,
+            'hits': hits,
+            'misses': misses,
+            'invalidations': invalidations,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+
+revenue_cache = RevenueCache()
@@ -0,0 +1,173 @@
+"""Чтение отчетов и списков заказов с реплик базы данных.
+
+Реплики перечисляются в ORDERS_READ_REPLICAS (псевдонимы из DATABASES).
+На реплику идут только чтения моделей приложения orders внутри
+представлений, помеченных read_from_replica: отчеты о выручке, список и
+карточка заказа. Запрос выбирает одну реплику и читает только с нее,
+поэтому ETag и основной запрос видят одни и те же данные. Запись и все
+последующие чтения того же запроса идут в основную базу; PrimaryPinMiddleware (orders/middleware.py) на несколько
+секунд закрепляет за основной базой и следующие запросы клиента, который
+только что писал, чтобы он видел свои изменения, пока реплика догоняет.
+"""
+import functools
+import logging
+import random
+import sqlite3
+import time
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('orders.db')
+
+_replica: ContextVar[Optional['ReplicaScope']] = ContextVar('orders_replica', default=None)
+_pin: ContextVar[Optional['PrimaryPin']] = ContextVar('orders_primary_pin', default=None)
+
+
+def read_replicas() -> List[str]:
+    """Псевдонимы реплик для чтения."""
+    return list(getattr(settings, 'ORDERS_READ_REPLICAS', []))
+
+
+class ReplicaScope:
+    """Реплика, выбранная для запроса; после записи в запросе — None (основная база).
+
+    Изменяемый объект, а не значение contextvar: запись в потоке
+    sync_to_async должна быть видна и остальному коду запроса.
+    """
+    __slots__ = ('alias',)
+
+    def __init__(self, alias: Optional[str]):
+        self.alias = alias
+
+
+class PrimaryPin:
+    """Закреплен ли запрос за основной базой (запись или недавняя запись клиента)."""
+    __slots__ = ('pinned',)
+
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+
+
+@contextmanager
+def replica_reads():
+    """Разрешает чтение с одной случайной реплики в пределах блока.
+
+    Во вложенном блоке остается реплика внешнего.
+    """
+    if _replica.get() is not None:
+        yield
+        return
+    replicas = read_replicas()
+    token = _replica.set(ReplicaScope(random.choice(replicas) if replicas else None))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Читает в пределах блока из основной базы, даже внутри replica_reads."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def read_from_replica(view):
+    """Декоратор представления (синхронного или асинхронного), читающего с реплики."""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_pin(pinned: bool = False):
+    """Область запроса: закреплен ли он за основной базой (запись или недавняя запись клиента)."""
+    token = _pin.set(PrimaryPin(pinned))
+    try:
+        yield
+    finally:
+        _pin.reset(token)
+
+
+def is_pinned_to_primary() -> bool:
+    pin = _pin.get()
+    return pin is not None and pin.pinned
+
+
+class ReplicaRouter:
+    """Направляет разрешенные чтения на реплику запроса, остальное — в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        scope = _replica.get()
+        if scope is None or scope.alias is None or is_pinned_to_primary() or model._meta.app_label != 'orders':
+            return None
+        return scope.alias
+
+    def db_for_write(self, model, **hints):
+        # Запись меняет только объекты текущей области, сам contextvar не трогается.
+        scope, pin = _replica.get(), _pin.get()
+        if scope is not None:
+            scope.alias = None
+        if pin is not None:
+            pin.pinned = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *read_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема и данные попадают на реплику репликацией (или sync_sqlite_replica).
+        return False if db in read_replicas() else None
+
+
+def sync_sqlite_replica(replica: str, source: str = DEFAULT_DB_ALIAS) -> None:
+    """Копирует базу SQLite source в файл реплики через backup API.
+
+    Нужна, чтобы проверять чтение с реплики локально на двух файлах SQLite.
+    """
+    source_connection = connections[source]
+    source_connection.ensure_connection()
+    connections[replica].close()
+    target = sqlite3.connect(connections[replica].settings_dict['NAME'])
+    try:
+        source_connection.connection.backup(target)
+    finally:
+        target.close()
+
+
+def log_query(execute, sql, params, many, context):
+    """Пишет в лог orders.db псевдоним базы, выполнившей запрос, и его длительность."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        logger.debug('%s %.1fms %s', context['connection'].alias, (time.perf_counter() - started) * 1000, sql)
+
+
+@receiver(connection_created)
+def install_query_logging(sender, connection, **kwargs):
+    """Включает log_query для нового соединения, если лог orders.db пишет DEBUG."""
+    if logger.isEnabledFor(logging.DEBUG) and log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_query)
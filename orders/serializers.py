@@ -1,16 +1,62 @@
 """Сериализаторы для API управления заказами."""
+from datetime import timezone as dt_timezone
+from operator import attrgetter
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import QuerySet
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Order, Dish
+from .menu import MenuSnapshot, menu_catalog
+from .models import Order
+
+
+# Поля заказа в ответах API по умолчанию и поля, которые отдаются
+# только по запросу (?expand= или явно в ?fields=).
+ORDER_DEFAULT_FIELDS = ('id', 'table_number', 'dishes', 'total_price', 'status', 'created_at', 'paid_at', 'dish_names')
+ORDER_EXPANSIONS = ('line_items',)
+ORDER_FIELDS = ORDER_DEFAULT_FIELDS + ORDER_EXPANSIONS
+
+
+def _names(params, param: str) -> List[str]:
+    return [name.strip() for name in params.get(param, '').split(',') if name.strip()]
+
+
+def parse_fieldset(params) -> Tuple[str, ...]:
+    """Поля ответа по ?fields=, ?exclude= и ?expand= в порядке ORDER_FIELDS.
+
+    Без параметров — ORDER_DEFAULT_FIELDS. При неизвестном поле
+    выбрасывается ValueError.
+    """
+    fields, exclude, expand = _names(params, 'fields'), _names(params, 'exclude'), _names(params, 'expand')
+    unknown = [name for name in fields + exclude if name not in ORDER_FIELDS]
+    unknown += [name for name in expand if name not in ORDER_EXPANSIONS]
+    if unknown:
+        raise ValueError(f"Неизвестные поля: {', '.join(unknown)}.")
+    selected = set(fields or ORDER_DEFAULT_FIELDS).difference(exclude).union(expand)
+    return tuple(name for name in ORDER_FIELDS if name in selected)
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    """Сериализатор для модели Order."""
+    """Сериализатор для модели Order.
+
+    Аргумент fields ограничивает поля ответа (см. parse_fieldset); по
+    умолчанию — ORDER_DEFAULT_FIELDS.
+    """
     dish_names = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'table_number', 'dishes', 'total_price', 'status', 'created_at', 'paid_at', 'dish_names']
-        read_only_fields = ['id', 'total_price', 'created_at', 'paid_at', 'dish_names']
+        fields = list(ORDER_FIELDS)
+        read_only_fields = ['id', 'total_price', 'created_at', 'paid_at', 'dish_names', 'line_items']
+        # Занятость стола проверяет ограничение базы при сохранении.
+        extra_kwargs = {'table_number': {'validators': []}}
+
+    def __init__(self, *args, fields: Sequence[str] = ORDER_DEFAULT_FIELDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in set(self.fields).difference(fields):
+            self.fields.pop(name)
 
     def get_dish_names(self, obj):
         """Получение названий блюд для заказа."""
@@ -20,29 +66,24 @@ class OrderSerializer(serializers.ModelSerializer):
         """Проверка номера стола."""
         if value <= 0:
             raise serializers.ValidationError("Номер стола должен быть положительным числом.")
-        instance = self.instance if self.instance else None
-        if Order.objects.filter(
-            table_number=value,
-            status__in=['waiting', 'ready']
-        ).exclude(pk=instance.pk if instance else None).exists():
+        active_tables = self.context.get('active_tables')
+        if active_tables is not None and value in active_tables:
             raise serializers.ValidationError("Этот номер стола уже используется в активном заказе.")
         return value
 
     def validate_dishes(self, value):
         """Проверка ID блюд."""
-        valid_ids = {str(dish.id) for dish in Dish.load_dishes()}
         if value:
-            invalid_ids = set(str(dish_id) for dish_id in value) - valid_ids
+            menu = self.context.get('menu') or menu_catalog.snapshot()
+            invalid_ids = menu.invalid_ids(value)
             if invalid_ids:
                 raise serializers.ValidationError(f"Некорректные ID блюд: {', '.join(invalid_ids)}")
         return value
 
     def create(self, validated_data):
-        """Создание нового заказа."""
-        order = Order.objects.create(**validated_data)
-        order.calculate_total_price()
-        if order.status == 'paid':
-            order.mark_as_paid()
+        """Создание нового заказа; стоимость и дата оплаты считаются в Order.save."""
+        order = Order(**validated_data)
+        self._save(order)
         return order
 
     def update(self, instance, validated_data):
@@ -50,8 +91,85 @@ class OrderSerializer(serializers.ModelSerializer):
         instance.table_number = validated_data.get('table_number', instance.table_number)
         instance.dishes = validated_data.get('dishes', instance.dishes)
         instance.status = validated_data.get('status', instance.status)
-        instance.save()
-        instance.calculate_total_price()
-        if instance.status == 'paid' and not instance.paid_at:
-            instance.mark_as_paid()
+        self._save(instance)
         return instance
+
+    @staticmethod
+    def _save(order):
+        try:
+            order.save()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.message_dict)
+
+
+# Столбцы, которые нужны полю ответа. pk и created_at выбираются всегда:
+# по ним строятся курсоры пагинации (row.pk, row.created_at).
+ORDER_FIELD_COLUMNS = {
+    'id': ('pk',),
+    'table_number': ('table_number',),
+    'dishes': ('dishes',),
+    'total_price': ('total_price',),
+    'status': ('status',),
+    'created_at': ('created_at',),
+    'paid_at': ('paid_at',),
+    'dish_names': ('dish_names', 'dishes'),
+    'line_items': ('line_items',),
+}
+
+
+def order_columns(fields: Sequence[str] = ORDER_DEFAULT_FIELDS) -> Tuple[str, ...]:
+    """Столбцы заказа для полей ответа, для values_list() и only()."""
+    columns = ['pk', 'created_at']
+    for field in fields:
+        columns.extend(column for column in ORDER_FIELD_COLUMNS[field] if column not in columns)
+    return tuple(columns)
+
+
+def order_rows(queryset: QuerySet, fields: Sequence[str] = ORDER_DEFAULT_FIELDS) -> QuerySet:
+    """Заказы именованными кортежами values_list только со столбцами полей fields."""
+    return queryset.values_list(*order_columns(fields), named=True)
+
+
+def iso_datetime(value, tz) -> Optional[str]:
+    """Дата и время так же, как их выводит DateTimeField в DRF."""
+    if not value:
+        return None
+    if tz is not None:
+        value = value.astimezone(tz)
+    elif timezone.is_aware(value):
+        value = timezone.make_naive(value, dt_timezone.utc)
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def order_rows_data(rows: Iterable, fields: Sequence[str] = ORDER_DEFAULT_FIELDS,
+                    menu: Optional[MenuSnapshot] = None) -> List[dict]:
+    """То же, что OrderSerializer(many=True, fields=fields).data, для строк order_rows.
+
+    Только для чтения: словари собираются напрямую, без полей
+    сериализатора на каждую строку; названия блюд заказов без снимка
+    берутся из одного снимка меню на весь ответ.
+    """
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+    snapshot = [menu]
+
+    def dish_names(row):
+        if row.dish_names:
+            return row.dish_names
+        if snapshot[0] is None:
+            snapshot[0] = menu_catalog.snapshot()
+        return snapshot[0].dish_names(row.dishes)
+
+    getters = {
+        'id': attrgetter('pk'),
+        'table_number': attrgetter('table_number'),
+        'dishes': attrgetter('dishes'),
+        'total_price': lambda row: f'{row.total_price:f}',
+        'status': attrgetter('status'),
+        'created_at': lambda row: iso_datetime(row.created_at, tz),
+        'paid_at': lambda row: iso_datetime(row.paid_at, tz),
+        'dish_names': dish_names,
+        'line_items': attrgetter('line_items'),
+    }
+    selected = [(field, getters[field]) for field in fields]
+    return [{field: get(row) for field, get in selected} for row in rows]
@@ -0,0 +1,90 @@
+"""Обработчики сигналов, поддерживающие производные данные заказов."""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .events import CREATED, DELETED, STATUS_CHANGED, UPDATED, publish_on_commit
+from .models import REVENUE_FIELDS, Order, RevenueRollup, TableVersion
+from .revenue_cache import revenue_cache
+
+_UNKNOWN = object()
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_revenue(sender, instance: Order, raw=False, using=None, **kwargs):
+    """Запоминает прежние вклад заказа в выручку и статус, если они не известны с загрузки."""
+    if raw:
+        return
+    if instance._state.adding:
+        instance._previous_revenue = instance._previous_status = None
+        return
+    previous = getattr(instance, '_loaded_revenue', _UNKNOWN)
+    previous_status = getattr(instance, '_loaded_status', _UNKNOWN)
+    if previous is _UNKNOWN or previous_status is _UNKNOWN:
+        stored = sender.objects.using(using).filter(pk=instance.pk).values('status', 'paid_at', 'total_price').first()
+        if previous is _UNKNOWN:
+            previous = Order(**stored).revenue_contribution() if stored else None
+        if previous_status is _UNKNOWN:
+            previous_status = stored['status'] if stored else None
+    instance._previous_revenue = previous
+    instance._previous_status = previous_status
+
+
+@receiver(post_save, sender=Order)
+def update_revenue_rollup(sender, instance: Order, raw=False, using=None, update_fields=None, **kwargs):
+    """Переносит изменение оплаты или суммы заказа в часовую сводку выручки.
+
+    Кэш отчетов сбрасывается для часов прежней и новой оплаты. Вклад
+    хранит только час, поэтому без update_fields оплаченный заказ
+    считается измененным: paid_at мог сдвинуться внутри часа.
+    """
+    if raw:
+        return
+    previous = instance.__dict__.pop('_previous_revenue', None)
+    current = instance.revenue_contribution()
+    RevenueRollup.apply([(previous, current)], using=using)
+    if (previous or current) and (previous != current or update_fields is None
+                                  or REVENUE_FIELDS.intersection(update_fields)):
+        revenue_cache.invalidate([c[0] for c in (previous, current) if c], using=using)
+    instance._loaded_revenue = current
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_revenue_rollup(sender, instance: Order, using=None, **kwargs):
+    """Вычитает удаленный оплаченный заказ из сводки выручки."""
+    previous = getattr(instance, '_loaded_revenue', _UNKNOWN)
+    if previous is _UNKNOWN:
+        previous = instance.revenue_contribution()
+    RevenueRollup.apply([(previous, None)], using=using)
+    if previous:
+        revenue_cache.invalidate([previous[0]], using=using)
+
+
+@receiver(post_save, sender=Order)
+def publish_order_saved(sender, instance: Order, created=False, raw=False, using=None, **kwargs):
+    """Публикует событие создания, смены статуса или изменения заказа."""
+    if raw:
+        return
+    previous_status = instance.__dict__.pop('_previous_status', None)
+    if created:
+        event_type = CREATED
+    elif previous_status is not None and previous_status != instance.status:
+        event_type = STATUS_CHANGED
+    else:
+        event_type = UPDATED
+    publish_on_commit(event_type, [instance], previous_status if event_type == STATUS_CHANGED else None, using)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def publish_order_deleted(sender, instance: Order, using=None, **kwargs):
+    """Публикует событие удаления заказа."""
+    publish_on_commit(DELETED, [instance], using=using)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def bump_orders_version(sender, instance: Order, raw=False, using=None, **kwargs):
+    """Увеличивает версию таблицы заказов для условных GET-запросов."""
+    if raw:
+        return
+    TableVersion.bump(using=using)
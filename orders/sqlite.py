@@ -0,0 +1,78 @@
+"""Профиль SQLite для рабочей нагрузки: прагмы на каждом соединении и проверка целостности.
+
+Django открывает новое соединение на каждый запрос (или поток), а
+большинство прагм действует только в пределах соединения, поэтому они
+выполняются в обработчике connection_created. Набор прагм задается
+настройкой ORDERS_SQLITE_PRAGMAS (значения по умолчанию — в
+cafe_management/settings.py, там же их переопределение переменными
+окружения). Проверка целостности читает всю базу, поэтому в обработчик
+не входит: ее выполняет команда check_sqlite_integrity.
+"""
+import logging
+import re
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Прагмы, которые разрешено задавать через настройки, в порядке применения.
+# journal_mode идет первым: смена режима журнала требует, чтобы в
+# соединении еще не было открытой транзакции.
+SUPPORTED_PRAGMAS = ('journal_mode', 'busy_timeout', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+INTEGRITY_CHECKS = {'quick': 'quick_check', 'full': 'integrity_check'}
+
+_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    """Прагмы из ORDERS_SQLITE_PRAGMAS; пустые значения пропускаются."""
+    configured = getattr(settings, 'ORDERS_SQLITE_PRAGMAS', {}) or {}
+    unknown = set(configured) - set(SUPPORTED_PRAGMAS)
+    if unknown:
+        raise ValueError(f'Неподдерживаемые прагмы SQLite: {", ".join(sorted(unknown))}.')
+    pragmas = {}
+    for name in SUPPORTED_PRAGMAS:
+        value = configured.get(name)
+        if value in (None, ''):
+            continue
+        value = str(value)
+        if not _VALUE_RE.match(value):
+            raise ValueError(f'Некорректное значение прагмы {name}: {value!r}.')
+        pragmas[name] = value
+    return pragmas
+
+
+def apply_pragmas(cursor, pragmas: Dict[str, str]) -> Dict[str, str]:
+    """Выполняет прагмы и возвращает установленные значения."""
+    applied = {}
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.execute(f'PRAGMA {name}')
+        row = cursor.fetchone()
+        applied[name] = str(row[0]) if row else ''
+    journal_mode = pragmas.get('journal_mode')
+    if journal_mode and applied.get('journal_mode', '').lower() not in (journal_mode.lower(), 'memory'):
+        logger.warning('SQLite journal_mode=%s не применился, действует %s.', journal_mode, applied['journal_mode'])
+    return applied
+
+
+def check_integrity(cursor, mode: str = 'quick') -> List[str]:
+    """Результат PRAGMA quick_check/integrity_check: пустой список, если база цела."""
+    cursor.execute(f'PRAGMA {INTEGRITY_CHECKS[mode]}')
+    rows = [str(row[0]) for row in cursor.fetchall()]
+    return [] if rows == ['ok'] else rows
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Применяет профиль SQLite к новому соединению."""
+    if connection.vendor != 'sqlite':
+        return
+    cursor = connection.connection.cursor()
+    try:
+        apply_pragmas(cursor, sqlite_pragmas())
+    finally:
+        cursor.close()
@@ -57,4 +57,14 @@ def sample_order(dishes_json):
     """Фикстура для создания тестового заказа."""
     order = Order.objects.create(table_number=1, dishes=[1, 2], status='waiting')
     order.calculate_total_price()
-    return order
\ No newline at end of file
+    return order
+
+
+@pytest.fixture(autouse=True)
+def clear_revenue_cache():
+    """Очищает кэш отчетов о выручке: база между тестами откатывается без сброса поколений."""
+    from django.core.cache import cache
+    from orders.revenue_cache import revenue_cache
+    cache.clear()
+    revenue_cache.reset_stats()
+    yield
@@ -1,6 +1,8 @@
 import pytest
 from django.urls import reverse
-from orders.models import Order
+from django.utils import timezone
+from orders.models import ACTIVE_TABLE_MESSAGE, Order
+from orders.serializers import OrderSerializer
 
 
 @pytest.mark.django_db
@@ -58,8 +60,298 @@ def test_api_revenue_report(api_client_with_token, sample_order):
     sample_order.status = 'paid'
     sample_order.mark_as_paid()
     sample_order.save()
-    url = reverse('orders:order-revenue') + '?start_date=2025-02-20&end_date=2025-02-20&start_time=00:00&end_time=23:59'
+    today = timezone.localdate().isoformat()
+    url = reverse('orders:order-revenue') + f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59'
     response = api_client_with_token.get(url)
     assert response.status_code == 200
     assert float(response.json()['total_revenue']) == 25.50
-    assert len(response.json()['orders']) == 1
\ No newline at end of file
+    assert len(response.json()['orders']) == 1
+
+
+@pytest.mark.django_db
+def test_api_bulk_create_orders(api_client_with_token, dishes_json):
+    url = reverse('orders:order-bulk-create')
+    data = [
+        {'table_number': 1, 'dishes': [1, 2], 'status': 'waiting'},
+        {'table_number': 2, 'dishes': [2, 2], 'status': 'paid'},
+    ]
+    response = api_client_with_token.post(url, data, format='json')
+    assert response.status_code == 201
+    assert [float(item['total_price']) for item in response.json()] == [25.50, 21.00]
+    assert Order.objects.count() == 2
+    assert Order.objects.get(table_number=2).paid_at is not None
+
+
+@pytest.mark.django_db
+def test_api_bulk_create_reports_errors_per_item(api_client_with_token, sample_order):
+    url = reverse('orders:order-bulk-create')
+    data = [
+        {'table_number': 3, 'dishes': [1], 'status': 'waiting'},
+        {'table_number': 1, 'dishes': [1], 'status': 'waiting'},
+        {'table_number': 3, 'dishes': [999], 'status': 'ready'},
+    ]
+    response = api_client_with_token.post(url, data, format='json')
+    assert response.status_code == 400
+    errors = response.json()['errors']
+    assert errors[0] == {}
+    assert 'table_number' in errors[1]
+    assert set(errors[2]) == {'table_number', 'dishes'}
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_api_bulk_create_table_taken_concurrently(api_client_with_token, sample_order, monkeypatch):
+    # Проверка по снимку активных столов не видит заказ параллельного запроса.
+    monkeypatch.setattr(OrderSerializer, 'validate_table_number', lambda self, value: value)
+    data = [
+        {'table_number': 3, 'dishes': [1], 'status': 'waiting'},
+        {'table_number': 1, 'dishes': [1], 'status': 'ready'},
+    ]
+    response = api_client_with_token.post(reverse('orders:order-bulk-create'), data, format='json')
+    assert response.status_code == 400
+    assert response.json() == {'errors': [{}, {'table_number': [ACTIVE_TABLE_MESSAGE]}]}
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_api_list_orders_keyset_pagination(api_client_with_token, dishes_json):
+    for table_number in range(1, 6):
+        Order.objects.create(table_number=table_number, dishes=[1], status='paid')
+    url = reverse('orders:order-list') + '?page_size=2'
+    seen = []
+    while url:
+        response = api_client_with_token.get(url)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen.extend(item['table_number'] for item in response.json())
+        links = response.headers.get('Link', '')
+        url = next((part.split(';')[0].strip(' <>') for part in links.split(',') if 'rel="next"' in part), None)
+    assert seen == [5, 4, 3, 2, 1]
+
+
+@pytest.mark.django_db
+def test_api_list_orders_previous_page_and_bad_cursor(api_client_with_token, dishes_json):
+    for table_number in range(1, 6):
+        Order.objects.create(table_number=table_number, dishes=[1], status='paid')
+    first = api_client_with_token.get(reverse('orders:order-list') + '?page_size=2')
+    next_url = first.headers['Link'].split(';')[0].strip('<>')
+    second = api_client_with_token.get(next_url)
+    prev_url = next(part.split(';')[0].strip(' <>') for part in second.headers['Link'].split(',') if 'rel="prev"' in part)
+    previous = api_client_with_token.get(prev_url)
+    assert [item['id'] for item in previous.json()] == [item['id'] for item in first.json()]
+
+    response = api_client_with_token.get(reverse('orders:order-list') + '?cursor=garbage')
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_api_revenue_aggregates_and_buckets(api_client_with_token, dishes_json):
+    for table_number, dishes in ((1, [1, 2]), (2, [2]), (3, [1])):
+        order = Order.objects.create(table_number=table_number, dishes=dishes, status='paid')
+        order.calculate_total_price()
+        order.mark_as_paid()
+    Order.objects.create(table_number=4, dishes=[1], status='waiting')
+    today = timezone.localdate().isoformat()
+    url = reverse('orders:order-revenue') + f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59'
+
+    response = api_client_with_token.get(url + '&bucket=day&orders=0')
+    assert response.status_code == 200
+    data = response.json()
+    assert float(data['total_revenue']) == 51.00
+    assert data['order_count'] == 3
+    assert float(data['average_ticket']) == 17.00
+    assert len(data['buckets']) == 1 and data['buckets'][0]['order_count'] == 3
+    assert 'orders' not in data
+
+    response = api_client_with_token.get(url + '&page_size=2')
+    assert len(response.json()['orders']) == 2
+    assert 'rel="next"' in response.headers['Link']
+
+    response = api_client_with_token.get(url + '&bucket=month')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_dish_sales_and_dish_filter(api_client_with_token, dishes_json):
+    for table_number, dishes, order_status in ((1, [1, 1, 2], 'paid'), (2, [2], 'paid'), (3, [2, 2], 'waiting')):
+        Order.objects.create(table_number=table_number, dishes=dishes, status=order_status)
+    today = timezone.localdate().isoformat()
+    url = reverse('orders:order-dish-sales') + f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59'
+
+    response = api_client_with_token.get(url)
+    assert response.status_code == 200
+    dishes = response.json()['dishes']
+    assert [(d['dish_id'], d['name'], d['quantity'], float(d['revenue']), d['order_count']) for d in dishes] == [
+        (1, 'Pizza', 2, 30.00, 1),
+        (2, 'Coffee', 2, 21.00, 2),
+    ]
+    revenue = api_client_with_token.get(reverse('orders:order-revenue') + url[url.index('?'):] + '&orders=0').json()
+    assert sum(float(d['revenue']) for d in dishes) == float(revenue['total_revenue'])
+
+    response = api_client_with_token.get(url + '&status=waiting')
+    assert [(d['dish_id'], d['quantity']) for d in response.json()['dishes']] == [(2, 2)]
+
+    response = api_client_with_token.get(url + '&ordering=quantity&limit=1')
+    assert [(d['dish_id'], d['quantity']) for d in response.json()['dishes']] == [(1, 2)]
+
+    response = api_client_with_token.get(url + '&ordering=price')
+    assert response.status_code == 400
+
+    response = api_client_with_token.get(reverse('orders:order-list') + '?dish=1')
+    assert [order['table_number'] for order in response.json()] == [1]
+
+
+def order_writes(queries):
+    return [q['sql'].split(' "orders_order"')[0] for q in queries
+            if q['sql'].startswith(('INSERT INTO "orders_order" ', 'UPDATE "orders_order" '))]
+
+
+@pytest.mark.django_db
+def test_api_create_and_update_write_order_once(api_client_with_token, dishes_json, django_assert_num_queries,
+                                                django_capture_on_commit_callbacks):
+    # INSERT заказа, сводка выручки (UPDATE + INSERT нового часа),
+    # строки заказа, точки сохранения транзакции и версия таблицы после COMMIT.
+    with django_assert_num_queries(9) as captured, django_capture_on_commit_callbacks(execute=True):
+        response = api_client_with_token.post(
+            reverse('orders:order-list'), {'table_number': 2, 'dishes': [1, 2], 'status': 'paid'}, format='json'
+        )
+    assert response.status_code == 201
+    assert order_writes(captured.captured_queries) == ['INSERT INTO']
+    order = Order.objects.get()
+    assert float(order.total_price) == 25.50 and order.paid_at is not None
+
+    url = reverse('orders:order-detail', args=[order.id])
+    # Загрузка заказа, UPDATE заказа, сводка выручки, замена строк заказа,
+    # точки сохранения и версия таблицы.
+    with django_assert_num_queries(8) as captured, django_capture_on_commit_callbacks(execute=True):
+        response = api_client_with_token.put(url, {'table_number': 3, 'dishes': [2], 'status': 'paid'}, format='json')
+    assert response.status_code == 200
+    assert order_writes(captured.captured_queries) == ['UPDATE']
+    assert float(response.json()['total_price']) == 10.50
+
+
+@pytest.mark.django_db
+def test_api_active_table_enforced_by_database(api_client_with_token, sample_order):
+    url = reverse('orders:order-list')
+    response = api_client_with_token.post(url, {'table_number': 1, 'dishes': [2], 'status': 'waiting'}, format='json')
+    assert response.status_code == 400
+    assert response.json() == {'table_number': ['Этот номер стола уже используется в активном заказе.']}
+
+    other = Order.objects.create(table_number=2, dishes=[1], status='paid')
+    response = api_client_with_token.patch(
+        reverse('orders:order-detail', args=[other.id]), {'table_number': 1, 'status': 'ready'}, format='json'
+    )
+    assert response.status_code == 400
+    assert 'table_number' in response.json()
+
+    response = api_client_with_token.post(url, {'table_number': 1, 'dishes': [2], 'status': 'paid'}, format='json')
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db
+def test_api_conditional_get(api_client_with_token, sample_order, django_assert_num_queries,
+                             django_capture_on_commit_callbacks):
+    url = reverse('orders:order-list')
+    response = api_client_with_token.get(url)
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    with django_assert_num_queries(1):
+        response = api_client_with_token.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304 and not response.content
+
+    detail_url = reverse('orders:order-detail', args=[sample_order.id])
+    detail_etag = api_client_with_token.get(detail_url).headers['ETag']
+    with django_assert_num_queries(1):
+        assert api_client_with_token.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 304
+
+    revenue_url = reverse('orders:order-revenue')
+    revenue_etag = api_client_with_token.get(revenue_url).headers['ETag']
+    assert api_client_with_token.get(revenue_url, HTTP_IF_NONE_MATCH=revenue_etag).status_code == 304
+
+    sample_order.status = 'paid'
+    with django_capture_on_commit_callbacks(execute=True):
+        sample_order.save()
+    assert api_client_with_token.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    assert api_client_with_token.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag).status_code == 200
+    assert api_client_with_token.get(revenue_url, HTTP_IF_NONE_MATCH=revenue_etag).status_code == 200
+
+    etag = api_client_with_token.get(url).headers['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.filter(pk=sample_order.pk).delete()
+    assert api_client_with_token.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_api_etag_depends_on_query_and_format(api_client_with_token, sample_order):
+    url = reverse('orders:order-list')
+    etag = api_client_with_token.get(url, {'status': 'waiting', 'fields': 'id'}).headers['ETag']
+    same = api_client_with_token.get(url, {'fields': 'id', 'status': 'waiting'}, HTTP_IF_NONE_MATCH=etag)
+    assert same.status_code == 304
+    for params in ({'status': 'paid', 'fields': 'id'}, {'status': 'waiting'}):
+        response = api_client_with_token.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response.headers['ETag'] != etag
+    browsable = api_client_with_token.get(
+        url, {'status': 'waiting', 'fields': 'id'}, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='text/html'
+    )
+    assert browsable.status_code == 200 and browsable['Content-Type'].startswith('text/html')
+
+    detail_url = reverse('orders:order-detail', args=[sample_order.id])
+    detail_etag = api_client_with_token.get(detail_url).headers['ETag']
+    assert api_client_with_token.get(detail_url, {'fields': 'id'}, HTTP_IF_NONE_MATCH=detail_etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_api_list_fast_path_matches_serializer(api_client_with_token, dishes_json):
+    from rest_framework.renderers import JSONRenderer
+    from orders.serializers import OrderSerializer
+
+    Order.objects.create(table_number=1, dishes=[1, 2, 2], status='paid')
+    legacy = Order.objects.create(table_number=2, dishes=[2, 99], status='waiting')
+    Order.objects.filter(pk=legacy.pk).update(dish_names='')
+    orders = Order.objects.order_by('-created_at', 'id')
+    expected = JSONRenderer().render(OrderSerializer(orders, many=True).data)
+
+    response = api_client_with_token.get(reverse('orders:order-list'))
+    assert response.content == expected
+    today = timezone.localdate().isoformat()
+    response = api_client_with_token.get(
+        reverse('orders:order-revenue') + f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59'
+    )
+    paid = OrderSerializer(orders.filter(status='paid'), many=True).data
+    assert response.content.endswith(b'"orders":' + JSONRenderer().render(paid) + b'}')
+
+
+@pytest.mark.django_db
+def test_api_sparse_fieldsets_narrow_columns(api_client_with_token, sample_order):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    url = reverse('orders:order-list')
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client_with_token.get(url + '?fields=id,table_number,status')
+    assert response.json() == [{'id': sample_order.id, 'table_number': 1, 'status': 'waiting'}]
+    select = next(q['sql'] for q in queries.captured_queries if 'FROM "orders_order"' in q['sql'] and 'LIMIT' in q['sql'])
+    assert '"dish_names"' not in select and '"total_price"' not in select
+
+    data = api_client_with_token.get(url + '?exclude=dish_names,dishes&expand=line_items').json()[0]
+    assert 'dish_names' not in data and 'dishes' not in data
+    assert [item['name'] for item in data['line_items']] == ['Pizza', 'Coffee']
+    response = api_client_with_token.get(url + '?fields=id,secret&expand=status')
+    assert response.status_code == 400 and 'secret' in response.json()['error'] and 'status' in response.json()['error']
+
+    detail_url = reverse('orders:order-detail', args=[sample_order.id])
+    response = api_client_with_token.get(detail_url + '?fields=id,dish_names')
+    assert response.json() == {'id': sample_order.id, 'dish_names': sample_order.get_dish_names()}
+    assert 'line_items' in api_client_with_token.get(detail_url + '?expand=line_items').json()
+    assert api_client_with_token.get(detail_url + '?exclude=nope').status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_revenue_orders_fieldset(api_client_with_token, dishes_json):
+    order = Order.objects.create(table_number=3, dishes=[1], status='paid')
+    today = timezone.localdate().isoformat()
+    url = reverse('orders:order-revenue') + f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59'
+    data = api_client_with_token.get(url + '&fields=id,total_price').json()
+    assert data['orders'] == [{'id': order.id, 'total_price': '15.00'}]
+    assert float(data['total_revenue']) == 15.00
@@ -0,0 +1,67 @@
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from orders.models import Order
+
+
+@pytest.mark.django_db
+def test_async_list_and_detail_match_api(client, dishes_json):
+    for table_number in range(1, 4):
+        Order.objects.create(table_number=table_number, dishes=[1, 2], status='paid')
+
+    response = client.get(reverse('orders:async-order-list') + '?page_size=2&status=paid')
+    api_response = client.get(reverse('orders:order-list') + '?page_size=2&status=paid')
+    assert response.status_code == 200
+    assert response.content == api_response.content
+    assert 'rel="next"' in response.headers['Link']
+
+    order = Order.objects.first()
+    response = client.get(reverse('orders:async-order-detail', args=[order.id]))
+    assert response.content == client.get(reverse('orders:order-detail', args=[order.id])).content
+    assert client.get(reverse('orders:async-order-detail', args=[999])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_create_order(client, dishes_json):
+    url = reverse('orders:async-order-list')
+    response = client.post(url, {'table_number': 2, 'dishes': [1, 2], 'status': 'paid'}, content_type='application/json')
+    assert response.status_code == 201
+    data = response.json()
+    assert float(data['total_price']) == 25.50 and data['paid_at'] is not None
+    assert Order.objects.get().dish_names == 'Pizza - 15.00, Coffee - 10.50'
+
+    response = client.post(url, {'table_number': 2, 'dishes': [2], 'status': 'waiting'}, content_type='application/json')
+    assert response.status_code == 201
+    response = client.post(url, {'table_number': 2, 'dishes': [1], 'status': 'ready'}, content_type='application/json')
+    assert response.json() == {'table_number': ['Этот номер стола уже используется в активном заказе.']}
+    response = client.post(url, {'table_number': 3, 'dishes': [999]}, content_type='application/json')
+    assert 'dishes' in response.json()
+    response = client.post(url, '{broken', content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_revenue_matches_api(client, dishes_json):
+    for table_number, dishes in ((1, [1, 2]), (2, [2])):
+        Order.objects.create(table_number=table_number, dishes=dishes, status='paid')
+    today = timezone.localdate().isoformat()
+    query = f'?start_date={today}&end_date={today}&start_time=00:00&end_time=23:59&bucket=hour&page_size=1'
+
+    response = client.get(reverse('orders:async-order-revenue') + query)
+    api_response = client.get(reverse('orders:order-revenue') + query)
+    assert response.status_code == 200
+    assert response.content == api_response.content
+    assert float(response.json()['total_revenue']) == 36.00
+    assert client.get(reverse('orders:async-order-revenue') + '?bucket=month').status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_views_sparse_fieldsets(client, sample_order):
+    query = '?fields=id,status&expand=line_items'
+    response = client.get(reverse('orders:async-order-list') + query)
+    assert response.content == client.get(reverse('orders:order-list') + query).content
+    assert set(response.json()[0]) == {'id', 'status', 'line_items'}
+
+    detail = reverse('orders:async-order-detail', args=[sample_order.id]) + '?exclude=dish_names'
+    assert 'dish_names' not in client.get(detail).json()
+    assert client.get(reverse('orders:async-order-list') + '?fields=bogus').status_code == 400
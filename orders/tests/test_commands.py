@@ -0,0 +1,114 @@
+import json
+import pytest
+from decimal import Decimal
+from django.core.management import call_command
+from orders.models import Order, RevenueRollup
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(record if isinstance(record, str) else json.dumps(record))
+            f.write('\n')
+
+
+@pytest.mark.django_db
+def test_import_orders(tmp_path, dishes_json, capsys):
+    path = tmp_path / 'orders.jsonl'
+    write_jsonl(path, [
+        {'table_number': 1, 'dishes': [1, 2], 'status': 'paid',
+         'created_at': '2025-02-20T12:00:00', 'paid_at': '2025-02-20T12:30:00+00:00'},
+        {'table_number': 2, 'dishes': [2], 'status': 'waiting'},
+        {'table_number': 2, 'dishes': [1], 'status': 'ready'},
+        {'table_number': 3, 'dishes': [999]},
+        '{broken',
+        '',
+        {'table_number': 4, 'dishes': [1, 1], 'status': 'paid'},
+    ])
+    call_command('import_orders', str(path), chunk_size=2)
+    captured = capsys.readouterr()
+    assert 'Импортировано заказов: 3, ошибок: 3' in captured.out
+    assert 'Строка 3' in captured.err and 'Строка 5' in captured.err
+
+    assert Order.objects.count() == 3
+    historic = Order.objects.get(table_number=1)
+    assert float(historic.total_price) == 25.50
+    assert historic.created_at.isoformat() == '2025-02-20T12:00:00+00:00'
+    assert historic.paid_at.isoformat() == '2025-02-20T12:30:00+00:00'
+    fresh = Order.objects.get(table_number=4)
+    assert fresh.paid_at == fresh.created_at
+
+
+@pytest.mark.django_db
+def test_import_paid_order_without_paid_at_uses_created_at(tmp_path, dishes_json):
+    path = tmp_path / 'orders.jsonl'
+    write_jsonl(path, [{'table_number': 1, 'dishes': [1], 'status': 'paid', 'created_at': '2024-12-31T21:15:00+00:00'}])
+    call_command('import_orders', str(path))
+    order = Order.objects.get()
+    assert order.paid_at.isoformat() == '2024-12-31T21:15:00+00:00'
+    assert list(RevenueRollup.objects.values_list('bucket_start', flat=True)) == [order.paid_at.replace(minute=0)]
+
+
+@pytest.mark.django_db
+def test_import_orders_keeps_recorded_total_price(tmp_path, dishes_json, capsys):
+    path = tmp_path / 'orders.jsonl'
+    write_jsonl(path, [
+        {'table_number': 1, 'dishes': [1, 2], 'status': 'paid', 'total_price': '19.99',
+         'created_at': '2025-02-20T12:00:00+00:00'},
+        {'table_number': 2, 'dishes': [1, 2], 'status': 'paid', 'total_price': 0},
+        {'table_number': 3, 'dishes': [1, 2], 'status': 'paid'},
+        {'table_number': 4, 'dishes': [1], 'total_price': 'free'},
+        {'table_number': 5, 'dishes': [1], 'total_price': -1},
+    ])
+    call_command('import_orders', str(path))
+    assert 'ошибок: 2' in capsys.readouterr().out
+    totals = dict(Order.objects.values_list('table_number', 'total_price'))
+    assert totals == {1: Decimal('19.99'), 2: Decimal('0.00'), 3: Decimal('25.50')}
+    assert RevenueRollup.objects.get(bucket_start__year=2025).revenue == Decimal('19.99')
+
+
+@pytest.mark.django_db
+def test_import_orders_dry_run(tmp_path, dishes_json):
+    path = tmp_path / 'orders.jsonl'
+    write_jsonl(path, [{'table_number': 1, 'dishes': [1]}])
+    call_command('import_orders', str(path), dry_run=True)
+    assert Order.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_backfill_order_snapshots(dishes_json, capsys):
+    orders = [Order.objects.create(table_number=n, dishes=[1, 2]) for n in (1, 2, 3)]
+    Order.objects.filter(pk__in=[o.pk for o in orders[:2]]).update(line_items=[], dish_names='')
+    call_command('backfill_order_snapshots', batch_size=1)
+    assert 'Снимок позиций заполнен у заказов: 2' in capsys.readouterr().out
+    for order in Order.objects.all():
+        assert order.dish_names == 'Pizza - 15.00, Coffee - 10.50'
+        assert [item['id'] for item in order.line_items] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_generate_traffic_replays_against_api(tmp_path, dishes_json):
+    from datetime import date
+    from rest_framework.test import APIClient
+    from orders.management.commands.generate_traffic import resolve_path
+
+    path = tmp_path / 'traffic.jsonl'
+    options = dict(output=str(path), duration=120, tables=3, screens=2, screen_interval=10,
+                   retrieve_rate=0.5, revenue_interval=30, seed=7)
+    call_command('generate_traffic', **options)
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [r['at'] for r in records] == sorted(r['at'] for r in records)
+    assert {'create', 'set_ready', 'list_waiting', 'list_ready', 'retrieve', 'revenue'} <= {r['endpoint'] for r in records}
+
+    call_command('generate_traffic', **{**options, 'output': str(tmp_path / 'again.jsonl')})
+    assert (tmp_path / 'again.jsonl').read_text(encoding='utf-8') == path.read_text(encoding='utf-8')
+
+    client = APIClient()
+    values = {'today': date.today().isoformat()}
+    for record in records:
+        response = client.generic(record['method'], resolve_path(record['path'], values),
+                                  json.dumps(record.get('body', {})), content_type='application/json')
+        assert response.status_code < 400, (record, response.content)
+        if record.get('ref'):
+            values[record['ref']] = response.json()['id']
+    assert Order.objects.filter(status='paid').exists()
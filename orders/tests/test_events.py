@@ -0,0 +1,129 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from orders import async_views
+from orders.events import EventHub, order_events
+from orders.models import Order
+
+
+@pytest.fixture
+def listened_hub(monkeypatch):
+    """Хаб, на который уже подписывались: записи публикуют события."""
+    monkeypatch.setattr(order_events, '_listened', True)
+    return order_events
+
+
+@pytest.mark.django_db
+def test_order_saves_publish_events(dishes_json, listened_hub, django_capture_on_commit_callbacks):
+    start = order_events.last_id
+    with django_capture_on_commit_callbacks(execute=True):
+        order = Order.objects.create(table_number=1, dishes=[1], status='waiting')
+    with django_capture_on_commit_callbacks(execute=True):
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'ready'
+        order.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        order.dishes = [1, 2]
+        order.save()
+    with django_capture_on_commit_callbacks(execute=True):
+        order.delete()
+
+    events = [event for event in order_events._history if event.id > start]
+    assert [event.type for event in events] == ['created', 'status_changed', 'updated', 'deleted']
+    assert events[1].previous_status == 'waiting' and events[1].status == 'ready'
+    assert json.loads(events[2].data)['dish_names'] == 'Pizza - 15.00, Coffee - 10.50'
+    assert json.loads(events[3].data) == {'id': events[0].order_id, 'table_number': 1, 'status': 'ready'}
+
+
+@pytest.mark.django_db
+def test_rolled_back_save_publishes_nothing(dishes_json, listened_hub, django_capture_on_commit_callbacks):
+    start = order_events.last_id
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        Order.objects.create(table_number=1, dishes=[1])
+        with pytest.raises(Exception):
+            Order.objects.create(table_number=1, dishes=[2])
+    # Событие и версия таблицы только от первого заказа.
+    assert len(callbacks) == 2
+    assert order_events.last_id == start + 1
+
+
+@pytest.mark.django_db
+def test_writes_skip_events_until_someone_subscribes(dishes_json, monkeypatch, django_capture_on_commit_callbacks):
+    monkeypatch.setattr(order_events, '_listened', False)
+    monkeypatch.setattr('orders.events.order_data', lambda order: pytest.fail('serialized without subscribers'))
+    start = order_events.last_id
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        order = Order.objects.create(table_number=1, dishes=[1])
+        order.status = 'ready'
+        order.save()
+    # Только увеличение версии таблицы после каждой из двух записей.
+    assert len(callbacks) == 2
+    assert order_events.last_id == start
+
+
+@pytest.mark.django_db
+def test_large_bulk_create_publishes_reset(dishes_json, settings, listened_hub, django_capture_on_commit_callbacks):
+    settings.ORDERS_EVENTS_BULK_LIMIT = 2
+    start = order_events.last_id
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.bulk_create(Order.prepare_for_bulk_create([Order(table_number=n, dishes=[1]) for n in (1, 2)]))
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.bulk_create(Order.prepare_for_bulk_create([Order(table_number=n, dishes=[1]) for n in (3, 4, 5)]))
+    events = [event for event in order_events._history if event.id > start]
+    assert [event.type for event in events] == ['created', 'created', 'reset']
+    assert json.loads(events[-1].data) == {'count': 3}
+
+
+def test_hub_resume_reset_and_overflow():
+    async def scenario():
+        hub = EventHub(history_size=2)
+        for order_id in (1, 2, 3):
+            hub.publish('created', order_id, order_id, 'waiting', None, '{}')
+
+        with hub.subscribe(last_event_id=2) as resumed:
+            assert [event.id for event in resumed.backlog] == [3] and not resumed.reset
+        with hub.subscribe(last_event_id=0) as stale:
+            assert stale.reset and stale.start_id == 3
+        with hub.subscribe(table_number=5, queue_size=1) as slow:
+            hub.publish('created', 4, 4, 'waiting', None, '{}')
+            for order_id in (5, 6):
+                hub.publish('created', order_id, 5, 'waiting', None, '{}')
+            await asyncio.sleep(0)
+            assert await slow.get() is None
+        assert hub.subscriber_count == 0
+
+    async_to_sync(scenario)()
+
+
+def test_event_stream_filters_and_resumes(settings):
+    settings.ORDERS_EVENTS_HEARTBEAT = 0.05
+    settings.ORDERS_EVENTS_MAX_AGE = 0.3
+
+    async def scenario():
+        base = order_events.last_id
+        order_events.publish('created', 101, 7, 'waiting', None, '{"id": 101}')
+        order_events.publish('created', 102, 8, 'paid', None, '{"id": 102}')
+        request = RequestFactory().get('/events/', {'status': 'waiting,ready'}, HTTP_LAST_EVENT_ID=str(base))
+        response = await async_views.order_event_stream(request)
+        assert response['Content-Type'] == 'text/event-stream'
+
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.1, order_events.publish, 'status_changed', 101, 7, 'paid', 'waiting', '{"id": 101}')
+        loop.call_later(0.1, order_events.publish, 'created', 103, 9, 'paid', None, '{"id": 103}')
+        return ''.join([chunk.decode() async for chunk in response.streaming_content]), base
+
+    body, base = async_to_sync(scenario)()
+    assert body.startswith('retry: 3000\n\n')
+    assert f'id: {base + 1}\nevent: created\ndata: {{"id": 101}}\n\n' in body
+    assert f'id: {base + 3}\nevent: status_changed\n' in body
+    assert f'id: {base + 2}\n' not in body and f'id: {base + 4}\n' not in body
+    assert ': ping\n\n' in body
+    assert order_events.subscriber_count == 0
+
+
+def test_event_stream_rejects_bad_filters():
+    request = RequestFactory().get('/events/', {'status': 'cooking'})
+    response = async_to_sync(async_views.order_event_stream)(request)
+    assert response.status_code == 400
@@ -1,4 +1,5 @@
 import pytest
+from django.core.exceptions import ValidationError
 from orders.forms import OrderForm
 from orders.models import Order
 
@@ -27,8 +28,12 @@ def test_order_form_duplicate_table_number(dishes_json):
     Order.objects.create(table_number=1, dishes=[1], status='waiting')
     form_data = {'table_number': 1, 'dishes': ['2'], 'status': 'waiting'}
     form = OrderForm(data=form_data)
-    assert not form.is_valid()
-    assert 'table_number' in form.errors
+    # Занятость стола проверяет ограничение базы при сохранении.
+    assert form.is_valid()
+    with pytest.raises(ValidationError):
+        form.save()
+    assert form.errors['table_number'] == ['Этот номер стола уже используется в активном заказе.']
+    assert Order.objects.count() == 1
 
 
 @pytest.mark.django_db
@@ -36,4 +41,19 @@ def test_order_form_invalid_dishes(dishes_json):
     form_data = {'table_number': 1, 'dishes': ['999'], 'status': 'waiting'}
     form = OrderForm(data=form_data)
     assert not form.is_valid()
-    assert 'dishes' in form.errors
\ No newline at end of file
+    assert 'dishes' in form.errors
+
+
+@pytest.mark.django_db
+def test_order_form_save_is_single_write(dishes_json, django_assert_num_queries, django_capture_on_commit_callbacks):
+    form = OrderForm(data={'table_number': 1, 'dishes': ['1', '2'], 'status': 'paid'})
+    with django_assert_num_queries(0):
+        assert form.is_valid()
+    # INSERT заказа, сводка выручки (UPDATE + INSERT нового часа),
+    # строки заказа, точки сохранения транзакции и версия таблицы после COMMIT.
+    with django_assert_num_queries(9) as captured, django_capture_on_commit_callbacks(execute=True):
+        order = form.save()
+    assert [q['sql'].split(' (')[0] for q in captured.captured_queries if '"orders_order" ' in q['sql']] == [
+        'INSERT INTO "orders_order"'
+    ]
+    assert float(order.total_price) == 25.50 and order.paid_at is not None
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+from decimal import Decimal
+from orders.menu import Dish, MenuCatalog, MenuSnapshot
+
+
+def write_menu(path, dishes):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dishes, f)
+
+
+def test_catalog_parses_file_once(tmp_path):
+    path = tmp_path / "dishes.json"
+    write_menu(path, [{"id": 1, "name": "Pizza", "price": 15.00}])
+    catalog = MenuCatalog(str(path))
+    for _ in range(10):
+        dishes = catalog.dishes()
+    assert [dish.name for dish in dishes] == ["Pizza"]
+    assert catalog.load_count == 1
+
+
+def test_catalog_reloads_on_file_change(tmp_path):
+    path = tmp_path / "dishes.json"
+    write_menu(path, [{"id": 1, "name": "Pizza", "price": 15.00}])
+    catalog = MenuCatalog(str(path))
+    catalog.dishes()
+    write_menu(path, [{"id": 1, "name": "Pizza", "price": 15.00}, {"id": 2, "name": "Coffee", "price": 10.50}])
+    os.utime(path, ns=(0, 10 ** 9))
+    assert len(catalog.dishes()) == 2
+    assert catalog.load_count == 2
+
+
+def test_catalog_explicit_reload(tmp_path):
+    path = tmp_path / "dishes.json"
+    write_menu(path, [{"id": 1, "name": "Pizza", "price": 15.00}])
+    catalog = MenuCatalog(str(path))
+    catalog.dishes()
+    catalog.reload()
+    assert catalog.load_count == 2
+
+
+def test_catalog_missing_or_broken_file(tmp_path):
+    path = tmp_path / "dishes.json"
+    catalog = MenuCatalog(str(path))
+    assert catalog.dishes() == ()
+    path.write_text('{not json', encoding='utf-8')
+    assert catalog.dishes() == ()
+    assert catalog.load_count == 1
+
+
+def test_catalog_skips_rows_with_bad_id_or_price(tmp_path):
+    path = tmp_path / "dishes.json"
+    write_menu(path, [
+        {"id": 1, "name": "Pizza", "price": 15.00},
+        {"id": 2, "name": "Soup", "price": None},
+        {"id": 3, "name": "Tea", "price": "abc"},
+        {"id": "4", "name": "Cake", "price": 5.00},
+        {"id": 5, "name": "Juice", "price": 3.50, "size": "L"},
+    ])
+    catalog = MenuCatalog(str(path))
+    assert [dish.id for dish in catalog.dishes()] == [1]
+    assert catalog.snapshot().price_total([1, 2, 4]) == Decimal('15.00')
+    assert catalog.load_count == 1
+
+
+def test_catalog_concurrent_reads(tmp_path):
+    path = tmp_path / "dishes.json"
+    write_menu(path, [{"id": i, "name": f"Dish {i}", "price": 1.0} for i in range(100)])
+    catalog = MenuCatalog(str(path))
+    results = []
+
+    def read():
+        for _ in range(50):
+            results.append(len(catalog.dishes()))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(results) == {100}
+    assert catalog.load_count == 1
+
+
+def test_snapshot_index_and_pricing():
+    menu = MenuSnapshot([Dish(1, "Pizza", 15.00), Dish(2, "Coffee", 10.50)])
+    assert menu.get(2).name == "Coffee"
+    assert menu.get(3) is None
+    assert menu.price_total([1, 2, 2, "1", 999, "x", None]) == 51.00
+    assert menu.dish_names([1, 2, 999]) == "Pizza - 15.00, Coffee - 10.50"
+    assert menu.dish_names([]) == "Нет блюд"
+    assert menu.invalid_ids(["1", 3, "3", "abc"]) == ["3", "abc"]
+
+
+def test_snapshot_fixed_point_totals():
+    menu = MenuSnapshot([Dish(1, "Tea", 0.10), Dish(2, "Sugar", 0.20), Dish(3, "Cake", "3.335")])
+    assert menu.prices == [10, 20, 334]
+    assert menu.price_total([1, 2]) == Decimal('0.30')
+    assert menu.batch_totals_cents([[1, 2], [3, 3], [], [999], [[1]]]) == [30, 668, 0, 0, 0]
+    assert not hasattr(menu.get(1), '__dict__')
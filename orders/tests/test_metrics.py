@@ -0,0 +1,72 @@
+import pytest
+from django.urls import reverse
+from orders.menu import menu_catalog
+from orders.metrics import Histogram, finish_request, request_metrics, start_request
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    request_metrics.reset()
+    yield
+    request_metrics.reset()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [('0.1', 2), ('1.0', 3), ('+Inf', 4)]
+    assert histogram.count == 4 and histogram.sum == pytest.approx(3.65)
+
+
+@pytest.mark.django_db
+def test_menu_loads_counted_for_current_request(dishes_json):
+    timer, token = start_request()
+    try:
+        menu_catalog.reload()
+    finally:
+        finish_request(token)
+    assert timer.menu_loads == 1
+    menu_catalog.reload()
+    assert timer.menu_loads == 1
+
+
+@pytest.mark.django_db
+def test_html_view_reports_server_timing_and_metrics(client, sample_order):
+    response = client.get(reverse('orders:order_list'))
+    timing = response['Server-Timing']
+    assert timing.startswith('app;dur=') and 'db;dur=' in timing and 'tpl;dur=' in timing
+    assert 'queries"' in timing and 'menu;desc=' in timing
+
+    response = client.get(reverse('orders:metrics'))
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.content.decode()
+    assert 'orders_http_requests_total{view="order_list",method="GET",status="2xx"} 1' in text
+    assert 'orders_http_request_duration_seconds_count{view="order_list"} 1' in text
+    assert 'orders_http_request_duration_seconds_bucket{view="order_list",le="+Inf"} 1' in text
+    queries = next(line for line in text.splitlines() if line.startswith('orders_db_queries_total{view="order_list"}'))
+    assert int(queries.split()[-1]) > 0
+    template = next(
+        line for line in text.splitlines() if line.startswith('orders_template_render_seconds_total{view="order_list"}')
+    )
+    assert float(template.split()[-1]) > 0
+    assert 'orders_revenue_cache_lookups_total{result="hit"}' in text
+
+
+@pytest.mark.django_db
+def test_api_views_labelled_by_url_name(client, sample_order):
+    client.get(reverse('orders:order-detail', args=[sample_order.pk]))
+    client.get(reverse('orders:order-detail', args=[999999]))
+    text = request_metrics.render()
+    assert 'orders_http_requests_total{view="order-detail",method="GET",status="2xx"} 1' in text
+    assert 'orders_http_requests_total{view="order-detail",method="GET",status="4xx"} 1' in text
+    assert 'orders_db_duration_seconds_count{view="order-detail"} 2' in text
+
+
+@pytest.mark.django_db
+def test_metrics_can_be_disabled(client, settings, sample_order):
+    settings.ORDERS_METRICS = False
+    response = client.get(reverse('orders:order_list'))
+    assert 'Server-Timing' not in response
+    assert 'order_list' not in request_metrics.render()
@@ -1,6 +1,11 @@
+import json
 import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
 from django.utils import timezone
-from orders.models import Order
+from types import SimpleNamespace
+from django.db import IntegrityError
+from orders.models import Order, OrderLine, RevenueRollup, TableVersion, is_active_table_violation
 
 
 @pytest.mark.django_db
@@ -35,10 +40,140 @@ def test_get_dish_names(dishes_json):
     assert dish_names == "Pizza - 15.00, Coffee - 10.50"
 
 
+@pytest.mark.django_db
+def test_dish_names_snapshot_survives_menu_change(dishes_json):
+    order = Order.objects.create(table_number=1, dishes=[1, 2])
+    assert order.line_items == [
+        {'id': 1, 'name': 'Pizza', 'price': '15.00'},
+        {'id': 2, 'name': 'Coffee', 'price': '10.50'},
+    ]
+    menu_path = settings.BASE_DIR / "static" / "orders" / "dishes.json"
+    with open(menu_path, 'w', encoding='utf-8') as f:
+        json.dump([{"id": 1, "name": "Pizza Grande", "price": 19.00}, {"id": 2, "name": "Coffee", "price": 10.50}], f)
+
+    order = Order.objects.get(pk=order.pk)
+    order.status = 'ready'
+    order.save()
+    assert Order.objects.get(pk=order.pk).get_dish_names() == "Pizza - 15.00, Coffee - 10.50"
+
+    order.dishes = [1]
+    order.save()
+    assert Order.objects.get(pk=order.pk).get_dish_names() == "Pizza Grande - 19.00"
+
+
+@pytest.mark.django_db
+def test_legacy_order_keeps_stored_total_price(dishes_json):
+    order = Order.objects.create(table_number=1, dishes=[1, 2])
+    OrderLine.objects.filter(order=order).delete()
+    Order.objects.filter(pk=order.pk).update(total_price=99.00, dish_names='', line_items=[])
+
+    order = Order.objects.get(pk=order.pk)
+    order.status = 'ready'
+    order.save()
+    order = Order.objects.get(pk=order.pk)
+    assert float(order.total_price) == 99.00
+    assert order.dish_names == "Pizza - 15.00, Coffee - 10.50"
+    assert OrderLine.objects.filter(order=order).count() == 2
+
+    order.dishes = [1]
+    order.save()
+    assert float(Order.objects.get(pk=order.pk).total_price) == 15.00
+
+
 @pytest.mark.django_db
 def test_is_table_number_unique(dishes_json):
     Order.objects.create(table_number=1, dishes=[1], status='waiting')
     order = Order(table_number=1, dishes=[2], status='ready')
     assert not order.is_table_number_unique()
     order.table_number = 2
-    assert order.is_table_number_unique()
\ No newline at end of file
+    assert order.is_table_number_unique()
+
+
+def integrity_error(message, constraint_name=None):
+    error = IntegrityError(message)
+    if constraint_name is not None:
+        cause = Exception(message)
+        cause.diag = SimpleNamespace(constraint_name=constraint_name)
+        error.__cause__ = cause
+    return error
+
+
+def test_is_active_table_violation():
+    assert is_active_table_violation(integrity_error('UNIQUE constraint failed: orders_order.table_number'))
+    assert not is_active_table_violation(integrity_error('UNIQUE constraint failed: orders_tableversion.name'))
+    assert is_active_table_violation(integrity_error('повторяющееся значение ключа', 'order_active_table_uniq'))
+    assert not is_active_table_violation(integrity_error('order_active_table_uniq', 'orders_tableversion_name_key'))
+
+
+def rollup_rows():
+    return [(row.bucket_start.hour, float(row.revenue), row.order_count) for row in RevenueRollup.objects.all()]
+
+
+@pytest.mark.django_db
+def test_revenue_rollup_follows_order_changes(dishes_json):
+    paid_at = datetime(2025, 2, 20, 10, 15, tzinfo=dt_timezone.utc)
+    order = Order.objects.create(table_number=1, dishes=[1, 2], status='waiting')
+    order.calculate_total_price()
+    assert rollup_rows() == []
+
+    order.status = 'paid'
+    order.paid_at = paid_at
+    order.save()
+    assert rollup_rows() == [(10, 25.50, 1)]
+
+    order = Order.objects.get(pk=order.pk)
+    order.dishes = [1]
+    order.calculate_total_price()
+    assert rollup_rows() == [(10, 15.00, 1)]
+
+    order.paid_at = paid_at + timedelta(hours=1)
+    order.save()
+    assert rollup_rows() == [(10, 0.00, 0), (11, 15.00, 1)]
+
+    Order.objects.filter(pk=order.pk).delete()
+    assert rollup_rows() == [(10, 0.00, 0), (11, 0.00, 0)]
+
+
+@pytest.mark.django_db
+def test_revenue_rollup_bulk_create_and_rebuild(dishes_json):
+    paid_at = datetime(2025, 2, 20, 10, 15, tzinfo=dt_timezone.utc)
+    Order.objects.bulk_create(Order.prepare_for_bulk_create([
+        Order(table_number=1, dishes=[1], status='paid', paid_at=paid_at),
+        Order(table_number=2, dishes=[2], status='paid', paid_at=paid_at),
+        Order(table_number=3, dishes=[2], status='waiting'),
+    ]))
+    assert rollup_rows() == [(10, 25.50, 2)]
+    RevenueRollup.objects.all().delete()
+    assert RevenueRollup.rebuild() == 1
+    assert rollup_rows() == [(10, 25.50, 2)]
+
+
+@pytest.mark.django_db
+def test_order_lines_follow_order_dishes(dishes_json):
+    def lines(order):
+        return sorted(OrderLine.objects.filter(order=order).values_list('dish_id', 'quantity', 'unit_price'))
+
+    order = Order.objects.create(table_number=1, dishes=[2, 1, 2])
+    assert [(d, q, float(p)) for d, q, p in lines(order)] == [(1, 1, 15.00), (2, 2, 10.50)]
+
+    order.status = 'ready'
+    order.save()
+    order.dishes = [1]
+    order.save()
+    assert [(d, q) for d, q, _ in lines(order)] == [(1, 1)]
+
+    bulk = Order.objects.bulk_create(Order.prepare_for_bulk_create([Order(table_number=2, dishes=[2, 2])]))
+    assert [(d, q) for d, q, _ in lines(bulk[0])] == [(2, 2)]
+
+    order.delete()
+    assert OrderLine.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_table_version_bumped_after_commit(dishes_json, django_capture_on_commit_callbacks):
+    version = TableVersion.current()[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.create(table_number=1, dishes=[1])
+        Order.objects.filter(table_number=1).update(status='ready')
+        assert TableVersion.current()[0] == version
+    assert TableVersion.current()[0] == version + 2
@@ -0,0 +1,80 @@
+import os
+import pstats
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from orders.profiling import list_profiles
+
+
+@pytest.fixture
+def profile_settings(settings, tmp_path):
+    settings.ORDERS_PROFILE_DIR = str(tmp_path / 'profiles')
+    settings.ORDERS_PROFILE_RATES = {}
+    return settings
+
+
+@pytest.mark.django_db
+def test_header_profiles_only_staff(client, django_user_model, profile_settings, sample_order):
+    user = django_user_model.objects.create_user(username='manager', password='pass')
+    client.force_login(user)
+    response = client.get(reverse('orders:order_list'), HTTP_X_ORDERS_PROFILE='1')
+    assert 'X-Orders-Profile' not in response
+    assert list_profiles() == []
+
+    user.is_staff = True
+    user.save()
+    response = client.get(reverse('orders:order_list'), HTTP_X_ORDERS_PROFILE='1')
+    [info] = list_profiles()
+    assert response['X-Orders-Profile'] == os.path.basename(info.path)
+    assert info.view == 'order_list' and info.method == 'GET' and info.duration_ms > 0
+
+
+@pytest.mark.django_db
+def test_sampling_rate_and_rotation(client, profile_settings, sample_order):
+    profile_settings.ORDERS_PROFILE_RATES = {'order-detail': 1.0}
+    profile_settings.ORDERS_PROFILE_MAX_FILES = 2
+    client.get(reverse('orders:order_list'))
+    assert list_profiles() == []
+    for _ in range(3):
+        client.get(reverse('orders:order-detail', args=[sample_order.pk]))
+    profiles = list_profiles()
+    assert len(profiles) == 2 and {info.view for info in profiles} == {'order-detail'}
+
+
+@pytest.mark.django_db
+def test_profiles_command_summarizes(client, profile_settings, sample_order, capsys):
+    profile_settings.ORDERS_PROFILE_RATES = {'order-detail': 1.0, 'order_list': 1.0}
+    client.get(reverse('orders:order-detail', args=[sample_order.pk]))
+    client.get(reverse('orders:order_list'))
+
+    call_command('profiles', view='order_list', top=50)
+    out = capsys.readouterr().out
+    assert 'Профилей: 1' in out and 'order_list' in out
+    assert 'cumtime s' in out and 'orders/views.py' in out
+
+    with pytest.raises(CommandError):
+        call_command('profiles', view='revenue_report')
+
+
+def profiled_functions(info):
+    return {(os.path.relpath(filename, settings.BASE_DIR), name) for filename, _, name in pstats.Stats(info.path).stats}
+
+
+@pytest.mark.django_db
+def test_async_client_profiles_view_thread(async_client, django_user_model, profile_settings, sample_order):
+    user = django_user_model.objects.create_user(username='manager', password='pass', is_staff=True)
+    async_client.force_login(user)
+
+    async def scenario():
+        for name in ('orders:order_list', 'orders:async-order-list'):
+            response = await async_client.get(reverse(name), headers={'X-Orders-Profile': '1'})
+            assert response.status_code == 200 and response['X-Orders-Profile']
+
+    async_to_sync(scenario)()
+
+    sync_info, async_info = list_profiles()
+    assert ('orders/views.py', 'order_list') in profiled_functions(sync_info)
+    assert ('orders/async_views.py', 'order_list') in profiled_functions(async_info)
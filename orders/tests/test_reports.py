@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from orders.models import Order
+from orders.reports import revenue_summary, split_by_whole_hours
+
+
+def utc(day, hour, minute=0):
+    return datetime(2025, 2, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def paid_history(dishes_json):
+    moments = [utc(20, 8, 59), utc(20, 9, 0), utc(20, 9, 30), utc(20, 12, 10), utc(20, 16, 59), utc(20, 17, 0),
+               utc(20, 17, 1), utc(21, 10, 0)]
+    for table_number, paid_at in enumerate(moments, start=1):
+        order = Order.objects.create(table_number=table_number, dishes=[1, 2], status='paid', paid_at=paid_at)
+        order.calculate_total_price()
+    return moments
+
+
+def test_split_by_whole_hours():
+    assert split_by_whole_hours(utc(20, 9, 15), utc(20, 17, 0)) == (utc(20, 10), utc(20, 17))
+    assert split_by_whole_hours(utc(20, 9, 15), utc(20, 10, 5)) is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('start,end', [
+    (utc(20, 9), utc(20, 17)),
+    (utc(20, 9, 15), utc(20, 16, 59)),
+    (utc(20, 0), utc(21, 23, 59)),
+    (utc(20, 9, 10), utc(20, 9, 40)),
+])
+def test_revenue_summary_matches_raw_orders(paid_history, start, end):
+    expected = [order for order in Order.objects.filter(status='paid', paid_at__range=(start, end))]
+    summary = revenue_summary(start, end)
+    assert summary.order_count == len(expected)
+    assert summary.total_revenue == sum((order.total_price for order in expected), Decimal('0.00'))
+
+
+@pytest.mark.django_db
+def test_revenue_summary_buckets_in_one_query(paid_history):
+    with CaptureQueriesContext(connection) as queries:
+        summary = revenue_summary(utc(20, 0), utc(21, 23, 59), bucket='day')
+    assert len(queries) == 1
+    assert [(b['start'].day, b['order_count']) for b in summary.buckets] == [(20, 7), (21, 1)]
+    assert summary.total_revenue == Decimal('204.00')
+    assert summary.average_ticket == Decimal('25.50')
+
+
+@pytest.mark.django_db
+def test_bulk_update_keeps_rollup_in_sync(paid_history):
+    start, end = utc(20, 0), utc(21, 23, 59)
+    waiting = Order.objects.create(table_number=50, dishes=[1], status='waiting')
+    Order.objects.filter(pk=waiting.pk).update(status='paid', paid_at=utc(20, 11, 5))
+    Order.objects.filter(paid_at=utc(21, 10, 0)).update(paid_at=utc(20, 13, 30), total_price=Decimal('40.00'))
+    Order.objects.filter(paid_at=utc(20, 12, 10)).update(status='ready', paid_at=None)
+
+    expected = Order.objects.filter(status='paid', paid_at__range=(start, end))
+    summary = revenue_summary(start, end, bucket='day')
+    assert summary.order_count == expected.count() == 8
+    assert summary.total_revenue == sum((order.total_price for order in expected), Decimal('0.00'))
+    assert [(b['start'].day, b['order_count']) for b in summary.buckets] == [(20, 8)]
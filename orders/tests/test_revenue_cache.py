@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.db import connection
+from django.urls import reverse
+from orders.models import Order, RevenueRollup
+from orders.reports import cached_revenue_summary
+from orders.revenue_cache import hour_blocks, range_blocks, revenue_cache
+
+
+def utc(month, day, hour, minute=0):
+    return datetime(2025, month, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def paid_order(dishes_json):
+    return Order.objects.create(table_number=1, dishes=[1, 2], status='paid', paid_at=utc(2, 20, 10, 30))
+
+
+def test_range_blocks_cover_months_days_and_hours():
+    assert range_blocks(utc(2, 20, 9, 15), utc(2, 20, 11, 0)) == ['all', 'h2025022009', 'h2025022010', 'h2025022011']
+    assert range_blocks(utc(1, 31, 23), utc(3, 1, 0, 30)) == ['all', 'h2025013123', 'm202502', 'h2025030100']
+    assert range_blocks(utc(2, 20, 0), utc(2, 21, 23, 59)) == ['all', 'd20250220', 'd20250221']
+    assert hour_blocks(utc(2, 20, 10, 30)) == ['h2025022010', 'd20250220', 'm202502']
+
+
+@pytest.mark.django_db
+def test_cached_summary_hits_until_write_in_range(paid_order, django_assert_num_queries):
+    start, end = utc(2, 20, 9), utc(2, 20, 17)
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('25.50')
+    with django_assert_num_queries(0):
+        assert cached_revenue_summary(start, end).order_count == 1
+    assert revenue_cache.stats()['hits'] == 1 and revenue_cache.stats()['misses'] == 1
+
+    Order.objects.create(table_number=2, dishes=[1], status='paid', paid_at=utc(2, 20, 12))
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('40.50')
+    assert revenue_cache.stats()['misses'] == 2
+
+
+@pytest.mark.django_db
+def test_write_outside_range_keeps_entry(paid_order, django_assert_num_queries):
+    start, end = utc(2, 20, 9), utc(2, 20, 17)
+    cached_revenue_summary(start, end)
+    Order.objects.create(table_number=2, dishes=[1], status='paid', paid_at=utc(2, 21, 12))
+    Order.objects.create(table_number=3, dishes=[1], status='waiting')
+    with django_assert_num_queries(0):
+        assert cached_revenue_summary(start, end).total_revenue == Decimal('25.50')
+
+
+@pytest.mark.django_db
+def test_paid_at_moved_or_deleted_invalidates_both_ranges(paid_order):
+    morning, evening = (utc(2, 20, 9), utc(2, 20, 11)), (utc(2, 20, 18), utc(2, 20, 20))
+    assert cached_revenue_summary(*morning).order_count == 1
+    assert cached_revenue_summary(*evening).order_count == 0
+
+    paid_order.paid_at = utc(2, 20, 19)
+    paid_order.save(update_fields=['paid_at'])
+    assert cached_revenue_summary(*morning).order_count == 0
+    assert cached_revenue_summary(*evening).order_count == 1
+
+    paid_order.delete()
+    assert cached_revenue_summary(*evening).order_count == 0
+
+
+@pytest.mark.django_db
+def test_bulk_update_corrects_cached_summaries(paid_order):
+    start, end = utc(2, 20, 9), utc(2, 20, 17)
+    other_day = (utc(2, 21, 0), utc(2, 21, 23, 59))
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('25.50')
+    cached_revenue_summary(*other_day)
+
+    Order.objects.filter(pk=paid_order.pk).update(total_price=Decimal('1.00'))
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('1.00')
+
+    waiting = Order.objects.create(table_number=2, dishes=[1], status='waiting')
+    Order.objects.filter(pk=waiting.pk).update(status='paid', paid_at=utc(2, 20, 12))
+    summary = cached_revenue_summary(start, end)
+    assert (summary.order_count, summary.total_revenue) == (2, Decimal('16.00'))
+    hits = revenue_cache.stats()['hits']
+    cached_revenue_summary(*other_day)
+    assert revenue_cache.stats()['hits'] == hits + 1
+
+
+@pytest.mark.django_db
+def test_rebuild_invalidates_everything(paid_order):
+    start, end = utc(2, 20, 9), utc(2, 20, 17)
+    cached_revenue_summary(start, end)
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE orders_order SET total_price = 1 WHERE id = %s', [paid_order.pk])
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('25.50')
+    RevenueRollup.rebuild()
+    assert cached_revenue_summary(start, end).total_revenue == Decimal('1.00')
+
+
+@pytest.mark.django_db
+def test_async_revenue_shares_entries(client, paid_order):
+    params = {'start_date': '2025-02-20', 'end_date': '2025-02-20', 'orders': '0'}
+    sync_data = client.get(reverse('orders:order-revenue'), params).json()
+    assert client.get(reverse('orders:async-order-revenue'), params).json() == sync_data
+    assert revenue_cache.stats()['hits'] == 1
+    assert cached_revenue_summary(utc(2, 20, 9), utc(2, 20, 17)).order_count == 1
+
+
+@pytest.mark.django_db
+def test_api_revenue_cache_stats(api_client_with_token, paid_order):
+    url = reverse('orders:order-revenue')
+    params = {'start_date': '2025-02-20', 'end_date': '2025-02-20', 'orders': '0'}
+    api_client_with_token.get(url, params)
+    api_client_with_token.get(url, params)
+
+    response = api_client_with_token.get(reverse('orders:order-revenue-cache-stats'))
+    assert response.status_code == 200
+    assert response.data['hits'] == 1 and response.data['misses'] == 1
+    assert response.data['hit_ratio'] == 0.5
@@ -0,0 +1,96 @@
+import logging
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+from orders.models import Order
+from orders.reports import cached_revenue_summary, paid_orders
+from orders.routers import ReplicaRouter, is_pinned_to_primary, primary_pin, replica_reads, sync_sqlite_replica
+
+
+@pytest.fixture
+def replica_db(tmp_path, settings):
+    """Вторая база SQLite в файле, подключенная как реплика."""
+    connections.settings['replica'] = {
+        **connections['default'].settings_dict, 'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.ORDERS_READ_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+def test_router_reads_replica_only_when_allowed(settings):
+    settings.ORDERS_READ_REPLICAS = ['replica']
+    router = ReplicaRouter()
+    with primary_pin():
+        assert router.db_for_read(Order) is None
+        with replica_reads():
+            assert router.db_for_read(Order) == 'replica'
+            assert router.db_for_read(User) is None
+            assert router.db_for_write(Order) is None
+            assert router.db_for_read(Order) is None
+    with primary_pin(pinned=True), replica_reads():
+        assert router.db_for_read(Order) is None
+    assert router.allow_migrate('replica', 'orders') is False
+
+
+def test_router_pins_one_replica_and_does_not_leak_writes(settings):
+    settings.ORDERS_READ_REPLICAS = ['replica1', 'replica2', 'replica3']
+    router = ReplicaRouter()
+    for _ in range(10):
+        with replica_reads():
+            alias = router.db_for_read(Order)
+            with replica_reads():
+                assert {router.db_for_read(Order) for _ in range(20)} == {alias}
+
+    assert router.db_for_write(Order) is None
+    assert not is_pinned_to_primary()
+    with replica_reads():
+        assert router.db_for_read(Order) in settings.ORDERS_READ_REPLICAS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_revenue_computed_on_primary(replica_db, dishes_json):
+    Order.objects.create(table_number=1, dishes=[1], status='paid')
+    sync_sqlite_replica(replica_db)
+    latest = Order.objects.create(table_number=2, dishes=[2], status='paid')
+    start, end = latest.paid_at - timedelta(minutes=5), latest.paid_at
+    with replica_reads():
+        assert paid_orders(start, end).count() == 1
+        assert cached_revenue_summary(start, end).order_count == 2
+        assert cached_revenue_summary(start, end).order_count == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lists_read_replica_until_client_writes(replica_db, dishes_json, caplog):
+    caplog.set_level(logging.DEBUG, logger='orders.db')
+    synced = Order.objects.create(table_number=1, dishes=[1], status='paid')
+    sync_sqlite_replica(replica_db)
+    Order.objects.create(table_number=2, dishes=[2], status='waiting')
+
+    client = APIClient()
+    response = client.get(reverse('orders:order-list'))
+    assert [order['id'] for order in response.json()] == [synced.id]
+    assert client.get(reverse('orders:order-revenue'), {'orders': '0'}).status_code == 200
+    assert any(record.getMessage().startswith('replica ') for record in caplog.records)
+
+    response = client.post(reverse('orders:order-list'), {'table_number': 3, 'dishes': [1]}, format='json')
+    assert response.status_code == 201
+    assert 'orders_primary' in response.cookies
+    assert len(client.get(reverse('orders:order-list')).json()) == 3
+    assert len(APIClient().get(reverse('orders:order-list')).json()) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sync_sqlite_replicas_command(replica_db, dishes_json):
+    Order.objects.create(table_number=1, dishes=[1, 2], status='paid')
+    out = StringIO()
+    call_command('sync_sqlite_replicas', stdout=out)
+    assert 'default -> replica' in out.getvalue()
+    assert Order.objects.using(replica_db).get().dish_names == 'Pizza - 15.00, Coffee - 10.50'
@@ -0,0 +1,48 @@
+import pytest
+import sqlite3
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.db import connection
+from orders import sqlite
+
+
+@pytest.mark.django_db
+def test_connection_uses_sqlite_profile():
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA busy_timeout')
+        assert cursor.fetchone()[0] == 5000
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone()[0] == 1
+        cursor.execute('PRAGMA temp_store')
+        assert cursor.fetchone()[0] == 2
+
+
+def test_file_database_switches_to_wal(tmp_path):
+    raw = sqlite3.connect(tmp_path / 'db.sqlite3')
+    applied = sqlite.apply_pragmas(raw.cursor(), sqlite.sqlite_pragmas())
+    assert applied['journal_mode'] == 'wal'
+    assert applied['cache_size'] == str(-64 * 1024)
+    assert sqlite.check_integrity(raw.cursor()) == []
+    raw.close()
+
+
+def test_sqlite_pragmas_from_settings(settings):
+    settings.ORDERS_SQLITE_PRAGMAS = {'busy_timeout': 100, 'journal_mode': ''}
+    assert sqlite.sqlite_pragmas() == {'busy_timeout': '100'}
+    settings.ORDERS_SQLITE_PRAGMAS = {'busy_timeout': '1; DROP TABLE orders_order'}
+    with pytest.raises(ValueError):
+        sqlite.sqlite_pragmas()
+    settings.ORDERS_SQLITE_PRAGMAS = {'locking_mode': 'exclusive'}
+    with pytest.raises(ValueError):
+        sqlite.sqlite_pragmas()
+
+
+@pytest.mark.django_db
+def test_check_sqlite_integrity_command(monkeypatch):
+    out = StringIO()
+    call_command('check_sqlite_integrity', stdout=out)
+    assert out.getvalue().strip() == 'default: ok'
+    monkeypatch.setattr('orders.management.commands.check_sqlite_integrity.check_integrity',
+                        lambda cursor, mode: ['*** in database main ***'])
+    with pytest.raises(CommandError, match='повреждена'):
+        call_command('check_sqlite_integrity', full=True)
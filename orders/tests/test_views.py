@@ -1,5 +1,6 @@
 import pytest
 from django.urls import reverse
+from django.utils import timezone
 from orders.models import Order
 
 
@@ -11,6 +12,29 @@ def test_order_list_view(auth_client, sample_order):
     assert len(response.context['orders_with_dishes']) == 1
 
 
+@pytest.mark.django_db
+def test_order_list_view_not_modified(auth_client, sample_order, django_capture_on_commit_callbacks):
+    url = reverse('orders:order_list')
+    etag = auth_client.get(url).headers['ETag']
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    with django_capture_on_commit_callbacks(execute=True):
+        Order.objects.create(table_number=2, dishes=[1])
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_order_list_view_paginates(auth_client, dishes_json):
+    for table_number in range(1, 4):
+        Order.objects.create(table_number=table_number, dishes=[1], status='paid')
+    response = auth_client.get(reverse('orders:order_list'), {'page_size': 2})
+    assert [item['order'].table_number for item in response.context['orders_with_dishes']] == [3, 2]
+    assert response.context['previous_cursor'] is None
+    response = auth_client.get(reverse('orders:order_list'), {'page_size': 2, 'cursor': response.context['next_cursor']})
+    assert [item['order'].table_number for item in response.context['orders_with_dishes']] == [1]
+    assert response.context['next_cursor'] is None
+
+
 @pytest.mark.django_db
 def test_order_create_view_get(auth_client):
     response = auth_client.get(reverse('orders:order_create'))
@@ -26,6 +50,16 @@ def test_order_create_view_post_valid(auth_client, dishes_json):
     assert Order.objects.count() == 1
 
 
+@pytest.mark.django_db
+def test_order_create_view_post_busy_table(auth_client, sample_order):
+    data = {'table_number': 1, 'dishes': ['2'], 'status': 'waiting'}
+    response = auth_client.post(reverse('orders:order_create'), data)
+    assert response.status_code == 200
+    errors = [str(m) for m in response.context['messages']]
+    assert 'Ошибка в поле "Номер стола": Этот номер стола уже используется в активном заказе.' in errors
+    assert Order.objects.count() == 1
+
+
 @pytest.mark.django_db
 def test_order_update_view_post_valid(auth_client, sample_order):
     data = {'table_number': 2, 'dishes': ['2'], 'status': 'ready'}
@@ -49,12 +83,35 @@ def test_revenue_report_view(auth_client, sample_order):
     sample_order.status = 'paid'
     sample_order.mark_as_paid()
     sample_order.save()
+    today = timezone.localdate().isoformat()
     response = auth_client.get(reverse('orders:revenue_report'), {
-        'start_date': '2025-02-20',
-        'end_date': '2025-02-20',
+        'start_date': today,
+        'end_date': today,
         'start_time': '00:00',
         'end_time': '23:59'
     })
     assert response.status_code == 200
     assert 'total_revenue' in response.context
     assert float(response.context['total_revenue']) == 25.50
+
+    assert response.context['order_count'] == 1
+    assert len(response.context['paid_orders_with_dishes']) == 1
+
+
+@pytest.mark.django_db
+def test_revenue_report_view_buckets_without_orders(auth_client, sample_order):
+    sample_order.status = 'paid'
+    sample_order.mark_as_paid()
+    today = timezone.localdate().isoformat()
+    response = auth_client.get(reverse('orders:revenue_report'), {
+        'start_date': today,
+        'end_date': today,
+        'start_time': '00:00',
+        'end_time': '23:59',
+        'bucket': 'hour',
+        'orders': '0',
+    })
+    assert response.status_code == 200
+    assert len(response.context['buckets']) == 1
+    assert float(response.context['buckets'][0]['total_revenue']) == 25.50
+    assert response.context['paid_orders_with_dishes'] == []
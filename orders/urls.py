@@ -1,7 +1,7 @@
 """URL-маршруты для приложения orders."""
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views, api_views
+from . import views, api_views, async_views
 
 router = DefaultRouter()
 router.register(r'orders', api_views.OrderViewSet)
@@ -14,5 +14,10 @@ urlpatterns = [
     path('delete/<int:order_id>/', views.order_delete, name='order_delete'),
     path('update/<int:order_id>/', views.order_update, name='order_update'),
     path('revenue/', views.revenue_report, name='revenue_report'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/async/orders/', async_views.order_list, name='async-order-list'),
+    path('api/async/orders/<int:order_id>/', async_views.order_detail, name='async-order-detail'),
+    path('api/async/orders/revenue/', async_views.revenue, name='async-order-revenue'),
+    path('api/async/orders/events/', async_views.order_event_stream, name='async-order-events'),
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,15 +1,37 @@
 """Представления для управления заказами в кафе."""
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.views.decorators.http import condition, require_GET
+from .conditional import order_list_page_etag, order_list_page_last_modified
 from .models import Order
 from .forms import OrderForm
-from datetime import datetime, date, time
-from django.utils import timezone
+from .metrics import render_metrics
+from .pagination import InvalidCursor, get_page_size, paginate_keyset
+from .reports import (
+    InvalidRangeOrder, cached_revenue_summary, default_revenue_range, paid_orders, parse_bucket, parse_revenue_range,
+)
+from .routers import read_from_replica
+
+
+def add_form_errors(request, form) -> None:
+    """Показывает ошибки формы сообщениями, как для невалидной формы."""
+    for field, errors in form.errors.items():
+        for error in errors:
+            label = form.fields[field].label if field in form.fields else 'Форма'
+            messages.error(
+                request,
+                f'Ошибка в поле "{label}": {error}'
+            )
 
 
+@condition(etag_func=order_list_page_etag, last_modified_func=order_list_page_last_modified)
 def order_list(request):
-    """Отображение списка всех заказов с возможностью поиска по номеру стола или статусу."""
+    """Отображение списка заказов постранично с возможностью поиска по номеру стола или статусу.
+
+    Если заказы не менялись, браузер получает 304 без запроса и рендеринга.
+    """
     query = request.GET.get('q', '')
     status = request.GET.get('status', '')
     orders = Order.objects.all()
@@ -18,8 +40,15 @@ def order_list(request):
     if status:
         orders = orders.filter(status=status)
 
+    page_size = get_page_size(request.GET.get('page_size'))
+    try:
+        page = paginate_keyset(orders, request.GET.get('cursor'), page_size)
+    except InvalidCursor:
+        messages.error(request, 'Некорректная ссылка на страницу, показана первая страница.')
+        page = paginate_keyset(orders, None, page_size)
+
     orders_with_dishes = [
-        {'order': order, 'dish_names': order.get_dish_names()} for order in orders
+        {'order': order, 'dish_names': order.get_dish_names()} for order in page.items
     ]
     messages.info(
         request,
@@ -28,7 +57,14 @@ def order_list(request):
     return render(
         request,
         'orders/order_list.html',
-        {'orders_with_dishes': orders_with_dishes, 'query': query, 'status': status}
+        {
+            'orders_with_dishes': orders_with_dishes,
+            'query': query,
+            'status': status,
+            'page_size': page_size,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
     )
 
 
@@ -46,18 +82,15 @@ def order_create(request):
                     f'{order.status}, paid_at: {order.paid_at}'
                 )
                 return redirect('orders:order_list')
+            except ValidationError:
+                add_form_errors(request, form)
             except Exception as e:
                 messages.error(
                     request,
                     f'Неизвестная ошибка при создании заказа: {str(e)}'
                 )
         else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(
-                        request,
-                        f'Ошибка в поле "{form.fields[field].label}": {error}'
-                    )
+            add_form_errors(request, form)
     else:
         form = OrderForm()
     messages.info(request, 'Готов к созданию нового заказа.')
@@ -109,18 +142,15 @@ def order_update(request, order_id: int):
                     f'paid_at: {order.paid_at}'
                 )
                 return redirect('orders:order_list')
+            except ValidationError:
+                add_form_errors(request, form)
             except Exception as e:
                 messages.error(
                     request,
                     f'Неизвестная ошибка при обновлении заказа: {str(e)}'
                 )
         else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(
-                        request,
-                        f'Ошибка в поле "{form.fields[field].label}": {error}'
-                    )
+            add_form_errors(request, form)
     else:
         form = OrderForm(instance=order)
     messages.info(request, f'Редактирование заказа #{order.id}.')
@@ -131,92 +161,80 @@ def order_update(request, order_id: int):
     )
 
 
+@read_from_replica
 def revenue_report(request):
-    """Отчет о выручке за указанный диапазон времени для заказов со статусом 'оплачено'."""
-    start_date_str = request.GET.get('start_date', '')
-    start_time_str = request.GET.get('start_time', '09:00')
-    end_date_str = request.GET.get('end_date', '')
-    end_time_str = request.GET.get('end_time', '17:00')
+    """Отчет о выручке за указанный диапазон времени для заказов со статусом 'оплачено'.
 
+    Итоги считаются агрегатами в базе; список оплаченных заказов выводится
+    постранично и может быть отключен параметром orders=0.
+    """
     try:
-        if start_date_str and end_date_str:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-            start_time = datetime.strptime(start_time_str, '%H:%M').time()
-            end_time = datetime.strptime(end_time_str, '%H:%M').time()
-
-            start_datetime = datetime.combine(start_date, start_time)
-            end_datetime = datetime.combine(end_date, end_time)
-
-            if start_datetime > end_datetime:
-                messages.error(
-                    request,
-                    'Дата и время начала должны быть раньше даты и времени окончания.'
-                )
-                start_datetime = datetime.combine(date.today(), time(9, 0))
-                end_datetime = datetime.combine(date.today(), time(17, 0))
-        else:
-            start_datetime = datetime.combine(date.today(), time(9, 0))
-            end_datetime = datetime.combine(date.today(), time(17, 0))
-
-        start_datetime = timezone.make_aware(start_datetime)
-        end_datetime = timezone.make_aware(end_datetime)
-
-        paid_orders = Order.objects.filter(
-            status='paid',
-            paid_at__range=(start_datetime, end_datetime)
-        )
-        total_revenue = sum(order.total_price for order in paid_orders)
-
-        paid_orders_with_dishes = [
-            {'order': order, 'dish_names': order.get_dish_names()} for order in paid_orders
-        ]
-
-        messages.info(
-            request,
-            f'Отчет о выручке за период с {start_datetime} по {end_datetime}: '
-            f'{len(paid_orders)} оплаченных заказов.'
-        )
-        return render(
+        start_datetime, end_datetime = parse_revenue_range(request.GET)
+    except InvalidRangeOrder:
+        messages.error(
             request,
-            'orders/revenue_report.html',
-            {
-                'total_revenue': total_revenue,
-                'paid_orders_with_dishes': paid_orders_with_dishes,
-                'start_datetime': start_datetime,
-                'end_datetime': end_datetime,
-                'start_date': start_datetime.date().isoformat(),
-                'start_time': start_datetime.strftime('%H:%M'),
-                'end_date': end_datetime.date().isoformat(),
-                'end_time': end_datetime.strftime('%H:%M'),
-            }
+            'Дата и время начала должны быть раньше даты и времени окончания.'
         )
+        start_datetime, end_datetime = default_revenue_range()
     except ValueError as e:
         messages.error(
             request,
             f'Некорректный формат даты или времени: {str(e)}'
         )
-        start_datetime = timezone.make_aware(datetime.combine(date.today(), time(9, 0)))
-        end_datetime = timezone.make_aware(datetime.combine(date.today(), time(17, 0)))
-        paid_orders = Order.objects.filter(
-            status='paid',
-            paid_at__range=(start_datetime, end_datetime)
-        )
-        total_revenue = sum(order.total_price for order in paid_orders)
+        start_datetime, end_datetime = default_revenue_range()
+
+    try:
+        bucket = parse_bucket(request.GET.get('bucket'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        bucket = None
+
+    summary = cached_revenue_summary(start_datetime, end_datetime, bucket)
+
+    page_size = get_page_size(request.GET.get('page_size'))
+    show_orders = request.GET.get('orders', '1') not in ('0', 'false')
+    paid_orders_with_dishes = []
+    next_cursor = previous_cursor = None
+    if show_orders and summary.order_count:
+        try:
+            page = paginate_keyset(paid_orders(start_datetime, end_datetime), request.GET.get('cursor'), page_size)
+        except InvalidCursor:
+            page = paginate_keyset(paid_orders(start_datetime, end_datetime), None, page_size)
         paid_orders_with_dishes = [
-            {'order': order, 'dish_names': order.get_dish_names()} for order in paid_orders
+            {'order': order, 'dish_names': order.get_dish_names()} for order in page.items
         ]
-        return render(
-            request,
-            'orders/revenue_report.html',
-            {
-                'total_revenue': total_revenue,
-                'paid_orders_with_dishes': paid_orders_with_dishes,
-                'start_datetime': start_datetime,
-                'end_datetime': end_datetime,
-                'start_date': start_datetime.date().isoformat(),
-                'start_time': start_datetime.strftime('%H:%M'),
-                'end_date': end_datetime.date().isoformat(),
-                'end_time': end_datetime.strftime('%H:%M'),
-            }
-        )
+        next_cursor, previous_cursor = page.next_cursor, page.previous_cursor
+
+    messages.info(
+        request,
+        f'Отчет о выручке за период с {start_datetime} по {end_datetime}: '
+        f'{summary.order_count} оплаченных заказов.'
+    )
+    return render(
+        request,
+        'orders/revenue_report.html',
+        {
+            'total_revenue': summary.total_revenue,
+            'order_count': summary.order_count,
+            'average_ticket': summary.average_ticket,
+            'buckets': summary.buckets,
+            'bucket': bucket or '',
+            'show_orders': show_orders,
+            'paid_orders_with_dishes': paid_orders_with_dishes,
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'previous_cursor': previous_cursor,
+            'start_datetime': start_datetime,
+            'end_datetime': end_datetime,
+            'start_date': start_datetime.date().isoformat(),
+            'start_time': start_datetime.strftime('%H:%M'),
+            'end_date': end_datetime.date().isoformat(),
+            'end_time': end_datetime.strftime('%H:%M'),
+        }
+    )
+
+
+@require_GET
+def metrics(request):
+    """Метрики производительности в текстовом формате Prometheus."""
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')